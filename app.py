@@ -1,13 +1,17 @@
 import os
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session, send_file
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from flask_migrate import Migrate
-from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
-from datetime import datetime, timedelta
-from functools import wraps
-import json
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from werkzeug.middleware.proxy_fix import ProxyFix
+from datetime import datetime
+from functools import lru_cache, wraps
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import sys
+import tempfile
+import time
 
 app = Flask(__name__)
 
@@ -17,11 +21,95 @@ app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:/
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
+app.config['IMAGE_EXTENSIONS'] = {'.png', '.jpg', '.jpeg', '.gif', '.webp'}
+app.config['VIDEO_EXTENSIONS'] = {'.mp4', '.webm', '.mov'}
+app.config['FILE_EXTENSIONS'] = {'.pdf', '.stl', '.obj', '.sb3', '.zip', '.txt', '.py'}
+app.config['THUMBNAIL_SIZE'] = (400, 400)
+app.config['DISPLAY_IMAGE_SIZE'] = (1600, 1600)
+app.config['PAGE_SIZE'] = int(os.environ.get('PAGE_SIZE', 24))
+app.config['ASSERT_NO_LAZY_LOADS'] = os.environ.get('ASSERT_NO_LAZY_LOADS') == '1'  # enabled by the tests
+app.config['ROSTER_CHUNK_SIZE'] = int(os.environ.get('ROSTER_CHUNK_SIZE', 1000))  # rows per bulk insert / export fetch
+app.config['BULK_PROGRESS_MAX_ROWS'] = int(os.environ.get('BULK_PROGRESS_MAX_ROWS', 500))
+app.config['SLOW_QUERY_MS'] = float(os.environ.get('SLOW_QUERY_MS', 200))
+app.config['METRICS_WINDOW'] = int(os.environ.get('METRICS_WINDOW', 1000))  # requests kept per route
+app.config['COUNTER_FLUSH_INTERVAL'] = float(os.environ.get('COUNTER_FLUSH_INTERVAL', 10))  # seconds
+app.config['COUNTER_MAX_PENDING'] = int(os.environ.get('COUNTER_MAX_PENDING', 1000))
+app.config['CACHE_BACKEND'] = os.environ.get('CACHE_BACKEND', 'memory')  # memory, filesystem
+app.config['CACHE_DIR'] = os.environ.get('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'barnum_stem_cache'))
+app.config['CACHE_DEFAULT_TTL'] = int(os.environ.get('CACHE_DEFAULT_TTL', 300))  # seconds
+app.config['CACHE_MAX_ENTRIES'] = int(os.environ.get('CACHE_MAX_ENTRIES', 512))
+app.config['PUBLIC_PAGE_MAX_AGE'] = int(os.environ.get('PUBLIC_PAGE_MAX_AGE', 30))  # seconds browsers/CDNs may reuse a public page
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 2))  # job threads in each web process; 0 leaves jobs to `flask run-jobs`
+app.config['JOB_POLL_INTERVAL'] = float(os.environ.get('JOB_POLL_INTERVAL', 2))  # seconds
+app.config['JOB_MAX_ATTEMPTS'] = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+app.config['JOB_RETRY_DELAY'] = float(os.environ.get('JOB_RETRY_DELAY', 30))  # seconds, doubled after every failed attempt
+app.config['JOB_LEASE_SECONDS'] = int(os.environ.get('JOB_LEASE_SECONDS', 600))  # running jobs older than this are retried
+app.config['JOB_RETENTION_DAYS'] = int(os.environ.get('JOB_RETENTION_DAYS', 7))  # finished jobs are deleted after this
+app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 5))  # connections kept open per worker process
+app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', 5))  # extra connections allowed under load
+app.config['DB_POOL_TIMEOUT'] = float(os.environ.get('DB_POOL_TIMEOUT', 10))  # seconds to wait for a free connection
+app.config['DB_POOL_RECYCLE'] = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # seconds before a connection is replaced
+app.config['DB_POOL_PRE_PING'] = os.environ.get('DB_POOL_PRE_PING', '1') == '1'
+app.config['DB_STATEMENT_TIMEOUT_MS'] = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000))  # PostgreSQL only, 0 disables
+app.config['SQLITE_WAL'] = os.environ.get('SQLITE_WAL', '1') == '1'
+app.config['SQLITE_SYNCHRONOUS'] = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')  # FULL, NORMAL or OFF
+app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+app.config['USER_CACHE_SIZE'] = int(os.environ.get('USER_CACHE_SIZE', 1024))  # signed-in users kept per worker
+app.config['USER_CACHE_TTL'] = float(os.environ.get('USER_CACHE_TTL', 60))  # seconds before a cached user is re-read
+app.config['SESSION_BACKEND'] = os.environ.get('SESSION_BACKEND', 'cookie')  # cookie, filesystem, database
+app.config['SESSION_DIR'] = os.environ.get('SESSION_DIR', os.path.join(tempfile.gettempdir(), 'barnum_stem_sessions'))
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')  # werkzeug method; older hashes are upgraded at sign-in
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))  # passwords hashed at once per worker process
+app.config['PASSWORD_HASH_TIMEOUT'] = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))  # seconds a sign-in waits for a hashing thread
+app.config['RATE_LIMIT_ENABLED'] = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+app.config['RATE_LIMIT_STORAGE'] = os.environ.get('RATE_LIMIT_STORAGE', 'memory')  # memory (per worker), database (shared)
+app.config['RATE_LIMIT_MAX_KEYS'] = int(os.environ.get('RATE_LIMIT_MAX_KEYS', 10000))  # buckets kept per worker with memory storage
+app.config['RATE_LIMITS'] = {  # "requests/seconds" token buckets per route
+    'like': os.environ.get('RATE_LIMIT_LIKE', '60/60'),  # likes per client address
+    'like_repeat': os.environ.get('RATE_LIMIT_LIKE_REPEAT', '1/86400'),  # likes of one item counted per visitor; repeats are acknowledged, not counted
+    'login': os.environ.get('RATE_LIMIT_LOGIN', '10/300'),  # sign-in attempts per client address and username
+    'login_address': os.environ.get('RATE_LIMIT_LOGIN_ADDRESS', '100/300'),  # sign-in attempts per client address
+}
+app.config['PROXY_FIX_X_FOR'] = int(os.environ.get('PROXY_FIX_X_FOR', 0))  # trusted proxies in front of the app; 1 on Render
+app.config['TRENDING_HALF_LIFE_HOURS'] = float(os.environ.get('TRENDING_HALF_LIFE_HOURS', 48))  # engagement counts half as much after this
+app.config['TRENDING_LIKE_WEIGHT'] = float(os.environ.get('TRENDING_LIKE_WEIGHT', 3))
+app.config['TRENDING_VIEW_WEIGHT'] = float(os.environ.get('TRENDING_VIEW_WEIGHT', 1))
+app.config['TRENDING_MIN_WEIGHT'] = float(os.environ.get('TRENDING_MIN_WEIGHT', 0.5))  # items decayed below this leave the ranking
+app.config['PROGRESS_FEED_POLL_INTERVAL'] = float(os.environ.get('PROGRESS_FEED_POLL_INTERVAL', 2))  # seconds between checks for changes made by other processes
+app.config['PROGRESS_FEED_LOOKBACK'] = float(os.environ.get('PROGRESS_FEED_LOOKBACK', 5))  # seconds; catches rows committed after their timestamp
+app.config['PROGRESS_FEED_QUEUE_SIZE'] = int(os.environ.get('PROGRESS_FEED_QUEUE_SIZE', 200))  # events buffered per connected client
+app.config['PROGRESS_STREAM_HEARTBEAT'] = float(os.environ.get('PROGRESS_STREAM_HEARTBEAT', 15))  # seconds between keep-alive comments
+app.config['PROGRESS_STREAM_SECONDS'] = int(os.environ.get('PROGRESS_STREAM_SECONDS', 300))  # clients reconnect after this
+app.config['PROGRESS_STREAM_MAX_CLIENTS'] = int(os.environ.get('PROGRESS_STREAM_MAX_CLIENTS', 4))  # open streams per worker; keep well below gunicorn --threads
+app.config['PROGRESS_STREAM_REPLAY_LIMIT'] = int(os.environ.get('PROGRESS_STREAM_REPLAY_LIMIT', 100))  # missed events resent on reconnect
+
+if app.config['PROXY_FIX_X_FOR']:
+    # Rate limits are keyed by client address, which is the proxy's unless X-Forwarded-For is trusted
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'], x_proto=app.config['PROXY_FIX_X_FOR'])
 
 # Handle PostgreSQL URL format for render
 if app.config['SQLALCHEMY_DATABASE_URI'].startswith('postgres://'):
     app.config['SQLALCHEMY_DATABASE_URI'] = app.config['SQLALCHEMY_DATABASE_URI'].replace('postgres://', 'postgresql://', 1)
 
+def engine_options(database_uri):
+    """Connection pool and timeout options for the configured database, from the DB_* settings"""
+    if database_uri.startswith('sqlite'):
+        # SQLAlchemy's default SQLite pools fit a single file; see configure_sqlite_connection
+        return {}
+    options = {
+        'pool_size': app.config['DB_POOL_SIZE'],
+        'max_overflow': app.config['DB_MAX_OVERFLOW'],
+        'pool_timeout': app.config['DB_POOL_TIMEOUT'],
+        'pool_recycle': app.config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': app.config['DB_POOL_PRE_PING']
+    }
+    if database_uri.startswith('postgresql') and app.config['DB_STATEMENT_TIMEOUT_MS']:
+        # Cancels runaway queries server-side instead of letting them hold a connection
+        options['connect_args'] = {'options': f"-c statement_timeout={app.config['DB_STATEMENT_TIMEOUT_MS']}"}
+    return options
+
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+
 # Initialize extensions
 db = SQLAlchemy(app)
 migrate = Migrate(app, db)
@@ -35,7 +123,7 @@ class User(UserMixin, db.Model):
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
-    role = db.Column(db.String(20), default='student')  # teacher, student, parent, admin
+    role = db.Column(db.String(20), default='student', index=True)  # teacher, student, parent, admin
     
     # Personal info
     first_name = db.Column(db.String(50), nullable=False)
@@ -87,7 +175,7 @@ class LessonPlan(db.Model):
     difficulty_level = db.Column(db.String(20))  # Beginner, Intermediate, Advanced
     
     # Metadata
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
@@ -97,6 +185,12 @@ class LessonPlan(db.Model):
         return f'<LessonPlan {self.title}>'
 
 class StudentProgress(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'lesson_id', name='uq_student_progress_student_lesson'),
+        db.Index('ix_student_progress_class_student', 'class_id', 'student_id'),
+        db.Index('ix_student_progress_last_updated', 'last_updated'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     lesson_id = db.Column(db.Integer, db.ForeignKey('lesson_plan.id'), nullable=False)
@@ -125,6 +219,12 @@ class StudentProgress(db.Model):
         return f'<StudentProgress {self.student.first_name} - {self.lesson_plan.title}>'
 
 class Project(db.Model):
+    __table_args__ = (
+        db.Index('ix_project_public_quarter_created', 'is_public', 'quarter', 'created_at'),
+        db.Index('ix_project_featured_public', 'is_featured', 'is_public'),
+        db.Index('ix_project_public_created', 'is_public', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
@@ -164,7 +264,7 @@ class Expo(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     quarter = db.Column(db.String(10), nullable=False)  # Q1, Q2, Q3, Q4
-    date = db.Column(db.Date, nullable=False)
+    date = db.Column(db.Date, nullable=False, index=True)
     description = db.Column(db.Text)
     
     # Expo details
@@ -201,6 +301,7 @@ class Room(db.Model):
     # Room settings
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     students = db.relationship('StudentCodenames', backref='room', lazy=True, cascade='all, delete-orphan')
@@ -210,6 +311,10 @@ class Room(db.Model):
 
 class StudentCodenames(db.Model):
     """Student codenames organized by room with Greek letter system"""
+    __table_args__ = (
+        db.Index('ix_student_codenames_room_public_code', 'room_id', 'is_public', 'greek_code'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     room_id = db.Column(db.Integer, db.ForeignKey('room.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)  # Optional link to user account
@@ -230,6 +335,7 @@ class StudentCodenames(db.Model):
     
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     last_active = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -240,6 +346,10 @@ class StudentCodenames(db.Model):
 
 class PortfolioItem(db.Model):
     """Individual portfolio items for each student"""
+    __table_args__ = (
+        db.Index('ix_portfolio_item_student_public_created', 'student_id', 'is_public', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('student_codenames.id'), nullable=False)
     
@@ -275,13 +385,226 @@ class PortfolioItem(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    @property
+    def current_likes_count(self):
+        """Stored likes plus increments still waiting in the write-behind buffer"""
+        return (self.likes_count or 0) + portfolio_counters.pending(self.id, 'likes_count')
+    
+    @property
+    def current_views_count(self):
+        """Stored views plus increments still waiting in the write-behind buffer"""
+        return (self.views_count or 0) + portfolio_counters.pending(self.id, 'views_count')
+    
     def __repr__(self):
         return f'<PortfolioItem {self.title}>'
 
-# Login manager
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
+class Tag(db.Model):
+    """A subject area or skill parsed out of the comma-separated project and portfolio fields"""
+    __table_args__ = (
+        db.UniqueConstraint('normalized_name', 'kind', name='uq_tag_normalized_name_kind'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # subject, skill
+    name = db.Column(db.String(100), nullable=False)  # As first written, e.g. "3D Design"
+    normalized_name = db.Column(db.String(100), nullable=False)  # Lowercased with single spaces, e.g. "3d design"
+
+    def __repr__(self):
+        return f'<Tag {self.kind}:{self.name}>'
+
+# Association tables are kept in step with subject_areas/skills_used by model events
+project_tag = db.Table(
+    'project_tag',
+    db.Column('project_id', db.Integer, db.ForeignKey('project.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_project_tag_tag_project', 'tag_id', 'project_id')
+)
+
+portfolio_item_tag = db.Table(
+    'portfolio_item_tag',
+    db.Column('portfolio_item_id', db.Integer, db.ForeignKey('portfolio_item.id', ondelete='CASCADE'),
+              primary_key=True),
+    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_portfolio_item_tag_tag_item', 'tag_id', 'portfolio_item_id')
+)
+
+class SearchDocument(db.Model):
+    """Searchable text of a project, portfolio item or lesson plan, kept in sync by model events"""
+    __table_args__ = (
+        db.UniqueConstraint('doc_type', 'doc_id', name='uq_search_document_doc'),
+        db.Index('ix_search_document_facets', 'is_public', 'quarter', 'project_type', 'grade_level'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    doc_type = db.Column(db.String(20), nullable=False)  # project, portfolio_item, lesson
+    doc_id = db.Column(db.Integer, nullable=False)
+    title = db.Column(db.String(200))
+    body = db.Column(db.Text)
+    
+    # Facets
+    quarter = db.Column(db.String(10))
+    project_type = db.Column(db.String(50))
+    grade_level = db.Column(db.String(20))
+    is_public = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime)
+
+# The full-text index itself is dialect specific: an external-content FTS5 table
+# fed by triggers on SQLite, and a weighted tsvector GIN expression index on PostgreSQL.
+SEARCH_INDEX_DDL = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE search_document_fts USING fts5("
+        "title, body, content='search_document', content_rowid='id', tokenize='porter unicode61')",
+        "CREATE TRIGGER search_document_ai AFTER INSERT ON search_document BEGIN "
+        "INSERT INTO search_document_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+        "CREATE TRIGGER search_document_ad AFTER DELETE ON search_document BEGIN "
+        "INSERT INTO search_document_fts(search_document_fts, rowid, title, body) "
+        "VALUES ('delete', old.id, old.title, old.body); END",
+        "CREATE TRIGGER search_document_au AFTER UPDATE ON search_document BEGIN "
+        "INSERT INTO search_document_fts(search_document_fts, rowid, title, body) "
+        "VALUES ('delete', old.id, old.title, old.body); "
+        "INSERT INTO search_document_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    ],
+    'postgresql': [
+        "CREATE INDEX ix_search_document_fts ON search_document USING gin (("
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(body, '')), 'B')))",
+    ],
+}
+
+for _dialect, _statements in SEARCH_INDEX_DDL.items():
+    for _statement in _statements:
+        db.event.listen(SearchDocument.__table__, 'after_create', db.DDL(_statement).execute_if(dialect=_dialect))
+db.event.listen(SearchDocument.__table__, 'before_drop',
+                db.DDL('DROP TABLE IF EXISTS search_document_fts').execute_if(dialect='sqlite'))
+
+class StudentStats(db.Model):
+    """Per-student progress totals, kept in step with StudentProgress by refresh_progress_stats"""
+    # No foreign key: the row is rebuilt after the user's progress is deleted, not before
+    student_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    total_lessons = db.Column(db.Integer, nullable=False, default=0)
+    completed_lessons = db.Column(db.Integer, nullable=False, default=0)
+    needs_help = db.Column(db.Integer, nullable=False, default=0)
+    completion_sum = db.Column(db.Integer, nullable=False, default=0)
+    completion_count = db.Column(db.Integer, nullable=False, default=0)
+    last_activity = db.Column(db.DateTime)
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @property
+    def avg_completion(self):
+        return round(self.completion_sum / self.completion_count, 1) if self.completion_count else 0
+
+class ClassStats(db.Model):
+    """Per-class progress totals, kept in step with StudentProgress by refresh_progress_stats"""
+    class_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    student_count = db.Column(db.Integer, nullable=False, default=0)
+    progress_count = db.Column(db.Integer, nullable=False, default=0)
+    not_started = db.Column(db.Integer, nullable=False, default=0)
+    in_progress = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    needs_help = db.Column(db.Integer, nullable=False, default=0)
+    completion_sum = db.Column(db.Integer, nullable=False, default=0)
+    completion_count = db.Column(db.Integer, nullable=False, default=0)
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @property
+    def avg_completion(self):
+        return round(self.completion_sum / self.completion_count, 1) if self.completion_count else 0
+
+class TrendingScore(db.Model):
+    """Time-decayed engagement of a portfolio item, updated as likes and views are flushed.
+
+    `score` is the log2 of the decayed weight scaled to a fixed epoch (see
+    trending_exponent), so scores written at different times compare directly
+    and never need rewriting as they age. Only items with recent engagement
+    have a row.
+    """
+    __table_args__ = (
+        db.Index('ix_trending_score_room_score', 'room_id', 'score'),
+        db.Index('ix_trending_score_score', 'score'),
+    )
+
+    portfolio_item_id = db.Column(db.Integer, db.ForeignKey('portfolio_item.id', ondelete='CASCADE'), primary_key=True,
+                                  autoincrement=False)
+    room_id = db.Column(db.Integer, db.ForeignKey('room.id', ondelete='CASCADE'), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class Job(db.Model):
+    """Background job run by the job worker outside of the request that queued it"""
+    __table_args__ = (
+        db.Index('ix_job_status_priority_run_at', 'status', 'priority', 'run_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)  # Key in JOB_TASKS
+    payload = db.Column(db.Text)  # JSON keyword arguments
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    priority = db.Column(db.Integer, nullable=False, default=0)  # Higher runs first
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id', name='fk_job_created_by_user', ondelete='SET NULL'))  # None for system jobs
+
+    # Retries
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Not claimed before this
+    last_error = db.Column(db.Text)
+    result = db.Column(db.Text)  # JSON return value
+
+    # Claim
+    locked_by = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime)
+
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.name} {self.status}>'
+
+class UserSession(db.Model):
+    """Server-side session data for SESSION_BACKEND=database, keyed by the id in the session cookie"""
+    __table_args__ = (
+        db.Index('ix_user_session_user_id', 'user_id'),
+        db.Index('ix_user_session_expires_at', 'expires_at'),
+    )
+
+    id = db.Column(db.String(80), primary_key=True)
+    user_id = db.Column(db.Integer)  # No foreign key: sessions of a deleted user are revoked, not cascaded
+    data = db.Column(db.Text, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+class RateLimitBucket(db.Model):
+    """Token bucket shared by every worker for RATE_LIMIT_STORAGE=database"""
+    __table_args__ = (
+        db.Index('ix_rate_limit_bucket_full_at', 'full_at'),
+    )
+
+    key = db.Column(db.String(255), primary_key=True)
+    tokens = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.Float, nullable=False)  # Unix time of the last take
+    full_at = db.Column(db.Float, nullable=False)  # Unix time the bucket is full again and can be pruned
+
+# Portfolio totals
+def portfolio_stats(*criteria):
+    """Item count and like/view totals for the portfolio items matching criteria.
+
+    Totals come from SQL plus any increments still in the write-behind buffer.
+    """
+    total_items, total_likes, total_views = db.session.query(
+        db.func.count(PortfolioItem.id),
+        db.func.coalesce(db.func.sum(PortfolioItem.likes_count), 0),
+        db.func.coalesce(db.func.sum(PortfolioItem.views_count), 0)
+    ).filter(*criteria).one()
+    
+    pending_ids = portfolio_counters.pending_row_ids()
+    if pending_ids:
+        matching_ids = [row_id for (row_id,) in db.session.query(PortfolioItem.id).filter(
+            PortfolioItem.id.in_(pending_ids), *criteria
+        )]
+        total_likes += portfolio_counters.pending_total(matching_ids, 'likes_count')
+        total_views += portfolio_counters.pending_total(matching_ids, 'views_count')
+    
+    return {'total_items': total_items, 'total_likes': total_likes, 'total_views': total_views}
 
 # Decorators
 def teacher_required(f):
@@ -302,23 +625,60 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# Upserts
+UPSERT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+@lru_cache(maxsize=None)
+def has_unique_key(table_name, columns):
+    """Whether the live database has a unique constraint or index on exactly these columns.
+
+    ON CONFLICT needs one; a database built before the migration that added it
+    does not have it until `flask db upgrade` runs.
+    """
+    inspector = db.inspect(db.engine)
+    keys = [constraint['column_names'] for constraint in inspector.get_unique_constraints(table_name)]
+    keys += [index['column_names'] for index in inspector.get_indexes(table_name) if index['unique']]
+    found = any(set(key) == set(columns) for key in keys)
+    if not found:
+        app.logger.warning(f'{table_name} has no unique key on {", ".join(columns)}; run `flask db upgrade`. '
+                           'Falling back to saving rows one at a time.')
+    return found
+
+# Subsystems register their routes, model events and commands when imported, so they
+# are imported once the models and decorators above exist
+if __name__ == '__main__':
+    # Run as a script this module is __main__; give the subsystems' `from app import ...` this copy
+    sys.modules['app'] = sys.modules[__name__]
+from services.counters import portfolio_counters
+from services.caching import SHOWCASE_QUARTERS, cached, expo_snapshot, project_snapshot
+from services.conditional import conditional_page, latest, version_columns
+from services.pagination import keyset_page
+from services.instrumentation import pool_stats, route_metrics
+import services.jobs
+import services.sessions
+from services.passwords import hash_password, verify_password
+from services.rate_limits import (client_address, rate_limit, rate_limit_rejections, take_rate_limit,
+                                  visitor_key)
+from services.progress import (PROGRESS_SORT_KEYS, bulk_save_progress, class_performance_rollup,
+                               save_progress, student_progress_query, student_progress_row,
+                               student_progress_totals)
+from services.progress_feed import progress_event_id
+import services.media
+import services.assets
+from services.roster import AVATAR_COLORS, greek_code_for
+import services.gradebook
+import services.search
+from services.tags import tagged_ids
+from services.trending import trending_items, trending_version
+
 # Routes
 @app.route('/')
 def index():
     """Public homepage showcasing student work"""
-    featured_projects = Project.query.filter_by(is_featured=True, is_public=True).limit(6).all()
-    recent_projects = Project.query.filter_by(is_public=True).order_by(Project.created_at.desc()).limit(8).all()
-    
-    # Calculate stats
-    stats = {
-        'total_students': User.query.filter_by(role='student').count(),
-        'total_projects': Project.query.filter_by(is_public=True).count(),
-        'active_classes': STEMClass.query.count(),
-        'lesson_plans': LessonPlan.query.count()
-    }
-    
-    # Get upcoming expo
-    upcoming_expo = Expo.query.filter(Expo.date >= datetime.now().date()).order_by(Expo.date).first()
+    featured_projects = cached('home:featured', load_featured_projects)
+    recent_projects = cached('home:recent', load_recent_projects)
+    stats = cached('home:stats', load_homepage_stats)
+    upcoming_expo = cached('home:expo', load_upcoming_expo)
     
     return render_template('index.html', 
                          featured_projects=featured_projects,
@@ -329,15 +689,74 @@ def index():
 @app.route('/showcase')
 def showcase():
     """Project showcase organized by quarters"""
-    # Get projects by quarter
-    quarters = {
-        'Q1': {'name': '3D Design & Treehouses', 'projects': Project.query.filter_by(quarter='Q1', is_public=True).all()},
-        'Q2': {'name': 'Game Development', 'projects': Project.query.filter_by(quarter='Q2', is_public=True).all()},
-        'Q3': {'name': 'Unreal Engine', 'projects': Project.query.filter_by(quarter='Q3', is_public=True).all()},
-        'Q4': {'name': 'Robotics', 'projects': Project.query.filter_by(quarter='Q4', is_public=True).all()}
+    # The first page of each quarter is cached; deeper pages of the selected quarter are not
+    selected_quarter = request.args.get('quarter')
+    cursor = request.args.get('cursor')
+    counts = cached('showcase:counts', load_showcase_counts)
+    
+    quarters = {}
+    for quarter, name in SHOWCASE_QUARTERS.items():
+        if quarter == selected_quarter and cursor:
+            page = load_showcase_projects(quarter, cursor)
+        else:
+            page = cached(f'showcase:{quarter}', lambda: load_showcase_projects(quarter))
+        quarters[quarter] = {
+            'name': name,
+            'projects': page['projects'],
+            'next_cursor': page['next_cursor'],
+            'total': counts.get(quarter, 0)
+        }
+    active_quarter = selected_quarter if selected_quarter in SHOWCASE_QUARTERS else 'Q1'
+    
+    # The page is rendered from the cached snapshots alone, so they are its version
+    return conditional_page(
+        (active_quarter, quarters),
+        lambda: render_template('showcase.html', quarters=quarters, active_quarter=active_quarter)
+    )
+
+# Cached homepage and showcase loaders; results are plain dicts so any cache backend can store them
+def load_featured_projects():
+    projects = Project.query.options(db.joinedload(Project.creator)).filter_by(
+        is_featured=True, is_public=True
+    ).limit(6).all()
+    return [project_snapshot(project) for project in projects]
+
+def load_recent_projects():
+    projects = Project.query.options(db.joinedload(Project.creator)).filter_by(
+        is_public=True
+    ).order_by(Project.created_at.desc()).limit(8).all()
+    return [project_snapshot(project) for project in projects]
+
+def load_homepage_stats():
+    def count(model, *criteria):
+        return db.select(db.func.count(model.id)).where(*criteria).scalar_subquery()
+    
+    total_students, total_projects, active_classes, lesson_plans = db.session.query(
+        count(User, User.role == 'student'),
+        count(Project, Project.is_public == True),
+        count(STEMClass),
+        count(LessonPlan)
+    ).one()
+    return {
+        'total_students': total_students,
+        'total_projects': total_projects,
+        'active_classes': active_classes,
+        'lesson_plans': lesson_plans
     }
-    
-    return render_template('showcase.html', quarters=quarters)
+
+def load_upcoming_expo():
+    expo = Expo.query.filter(Expo.date >= datetime.now().date()).order_by(Expo.date).first()
+    return expo_snapshot(expo) if expo else None
+
+def load_showcase_projects(quarter, cursor=None):
+    query = Project.query.options(db.joinedload(Project.creator)).filter_by(quarter=quarter, is_public=True)
+    projects, next_cursor = keyset_page(query, Project, cursor)
+    return {'projects': [project_snapshot(project) for project in projects], 'next_cursor': next_cursor}
+
+def load_showcase_counts():
+    return dict(db.session.query(Project.quarter, db.func.count(Project.id)).filter(
+        Project.is_public == True
+    ).group_by(Project.quarter).all())
 
 @app.route('/curriculum')
 def curriculum():
@@ -350,14 +769,29 @@ def about():
     return render_template('about.html')
 
 # Authentication routes
+LOGIN_RATE_LIMIT_MESSAGE = 'Too many sign-in attempts. Please wait a few minutes and try again.'
+
 @app.route('/login', methods=['GET', 'POST'])
+@rate_limit('login_address', client_address, methods=('POST',),
+            message=LOGIN_RATE_LIMIT_MESSAGE, template='login.html')
+@rate_limit('login', lambda: f"{client_address()}:{request.form.get('username', '').strip().lower()}", methods=('POST',),
+            message=LOGIN_RATE_LIMIT_MESSAGE, template='login.html')
 def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
         user = User.query.filter_by(username=username).first()
         
-        if user and check_password_hash(user.password_hash, password):
+        try:
+            valid = verify_password(user, password)
+        except FutureTimeoutError:
+            flash('Sign-in is busy right now. Please try again in a moment.', 'error')
+            return render_template('login.html'), 503, {'Retry-After': '5'}
+        
+        if valid:
+            if user in db.session.dirty:
+                # The hash was upgraded, which also signs the user out of their other sessions
+                db.session.commit()
             login_user(user)
             next_page = request.args.get('next')
             if next_page:
@@ -386,20 +820,18 @@ def student_dashboard():
         return redirect(url_for('index'))
     
     # Get student's progress and projects
-    progress = StudentProgress.query.filter_by(student_id=current_user.id).all()
+    progress = StudentProgress.query.options(db.joinedload(StudentProgress.lesson_plan)).filter_by(
+        student_id=current_user.id
+    ).all()
     projects = Project.query.filter_by(creator_id=current_user.id).all()
-    
-    # Calculate stats
-    completed_lessons = len([p for p in progress if p.status == 'completed'])
-    total_lessons = len(progress)
-    avg_completion = sum([p.completion_percentage for p in progress]) / len(progress) if progress else 0
+    stats = db.session.get(StudentStats, current_user.id)
     
     return render_template('student_dashboard.html',
                          progress=progress,
                          projects=projects,
-                         completed_lessons=completed_lessons,
-                         total_lessons=total_lessons,
-                         avg_completion=round(avg_completion, 1))
+                         completed_lessons=stats.completed_lessons if stats else 0,
+                         total_lessons=stats.total_lessons if stats else 0,
+                         avg_completion=stats.avg_completion if stats else 0)
 
 # Teacher routes
 @app.route('/teacher-toolkit')
@@ -414,14 +846,20 @@ def teacher_toolkit():
     total_projects = Project.query.count()
     
     # Recent activity
-    recent_progress = StudentProgress.query.order_by(StudentProgress.last_updated.desc()).limit(10).all()
+    recent_progress = StudentProgress.query.options(
+        db.joinedload(StudentProgress.student),
+        db.joinedload(StudentProgress.lesson_plan)
+    ).order_by(StudentProgress.last_updated.desc()).limit(10).all()
+    # The live feed picks up after the newest change shown
+    stream_since = progress_event_id(recent_progress[0].last_updated, recent_progress[0].id) if recent_progress else ''
     
     return render_template('teacher_toolkit.html',
                          total_students=total_students,
                          total_classes=total_classes,
                          total_lessons=total_lessons,
                          total_projects=total_projects,
-                         recent_progress=recent_progress)
+                         recent_progress=recent_progress,
+                         stream_since=stream_since)
 
 @app.route('/teacher-dashboard')
 @login_required
@@ -434,22 +872,16 @@ def teacher_dashboard():
     total_projects = Project.query.count()
     
     # Recent activity
-    recent_progress = StudentProgress.query.order_by(StudentProgress.last_updated.desc()).limit(10).all()
-    recent_projects = Project.query.order_by(Project.updated_at.desc()).limit(5).all()
+    recent_progress = StudentProgress.query.options(
+        db.joinedload(StudentProgress.student),
+        db.joinedload(StudentProgress.lesson_plan)
+    ).order_by(StudentProgress.last_updated.desc()).limit(10).all()
+    recent_projects = Project.query.options(db.joinedload(Project.creator)).order_by(
+        Project.updated_at.desc()
+    ).limit(5).all()
     
     # Class performance summary
-    classes = STEMClass.query.all()
-    class_performance = []
-    
-    for cls in classes:
-        students_in_class = db.session.query(StudentProgress.student_id).filter_by(class_id=cls.id).distinct().count()
-        avg_completion = db.session.query(db.func.avg(StudentProgress.completion_percentage)).filter_by(class_id=cls.id).scalar()
-        
-        class_performance.append({
-            'class': cls,
-            'student_count': students_in_class,
-            'avg_completion': round(avg_completion or 0, 1)
-        })
+    class_performance = class_performance_rollup()
     
     return render_template('teacher_dashboard.html',
                          total_students=total_students,
@@ -464,7 +896,17 @@ def teacher_dashboard():
 @login_required
 @teacher_required
 def manage_classes():
-    classes = STEMClass.query.all()
+    lesson_counts = db.session.query(
+        LessonPlan.class_id, db.func.count(LessonPlan.id).label('lesson_count')
+    ).group_by(LessonPlan.class_id).subquery()
+    
+    classes = db.session.query(
+        STEMClass,
+        db.func.coalesce(lesson_counts.c.lesson_count, 0),
+        db.func.coalesce(ClassStats.progress_count, 0)
+    ).outerjoin(lesson_counts, lesson_counts.c.class_id == STEMClass.id).outerjoin(
+        ClassStats, ClassStats.class_id == STEMClass.id
+    ).order_by(STEMClass.id).all()
     return render_template('manage_classes.html', classes=classes)
 
 @app.route('/create-class', methods=['GET', 'POST'])
@@ -490,8 +932,10 @@ def create_class():
 @login_required
 @teacher_required
 def manage_lessons():
-    lessons = LessonPlan.query.order_by(LessonPlan.created_at.desc()).all()
-    return render_template('manage_lessons.html', lessons=lessons)
+    lessons, next_cursor = keyset_page(LessonPlan.query.options(db.joinedload(LessonPlan.stem_class)),
+                                       LessonPlan, request.args.get('cursor'))
+    return render_template('manage_lessons.html', lessons=lessons, next_cursor=next_cursor,
+                         is_first_page=not request.args.get('cursor'))
 
 @app.route('/create-lesson', methods=['GET', 'POST'])
 @login_required
@@ -523,24 +967,37 @@ def create_lesson():
 @login_required
 @teacher_required
 def view_student_progress():
-    students = User.query.filter_by(role='student').all()
-    progress_data = []
-    
-    for student in students:
-        progress = StudentProgress.query.filter_by(student_id=student.id).all()
-        completed = len([p for p in progress if p.status == 'completed'])
-        total = len(progress)
-        avg_completion = sum([p.completion_percentage for p in progress]) / len(progress) if progress else 0
-        
-        progress_data.append({
-            'student': student,
-            'completed_lessons': completed,
-            'total_lessons': total,
-            'avg_completion': round(avg_completion, 1),
-            'recent_activity': progress[-1].last_updated if progress else None
-        })
-    
-    return render_template('student_progress.html', progress_data=progress_data)
+    filters = {
+        'class_id': request.args.get('class_id', type=int),
+        'grade_level': request.args.get('grade', ''),
+        'sort': request.args.get('sort', 'name'),
+        'direction': 'desc' if request.args.get('dir') == 'desc' else 'asc'
+    }
+    if filters['sort'] not in PROGRESS_SORT_KEYS:
+        filters['sort'] = 'name'
+
+    query = student_progress_query(**filters)
+    pagination = query.paginate(page=request.args.get('page', 1, type=int),
+                                per_page=min(request.args.get('per_page', 50, type=int), 200),
+                                error_out=False)
+    progress_data = [student_progress_row(row) for row in pagination.items]
+
+    totals = student_progress_totals(query)
+    top_row = query.order_by(None).order_by(db.desc('avg_completion'), User.id).first()
+    totals['top_performer'] = student_progress_row(top_row) if top_row else None
+
+    classes = STEMClass.query.order_by(STEMClass.class_name).all()
+    grade_levels = [grade for (grade,) in db.session.query(User.grade_level).filter(
+        User.role == 'student', User.grade_level.isnot(None)
+    ).distinct().order_by(User.grade_level)]
+
+    return render_template('student_progress.html',
+                         progress_data=progress_data,
+                         pagination=pagination,
+                         totals=totals,
+                         filters=filters,
+                         classes=classes,
+                         grade_levels=grade_levels)
 
 @app.route('/create-project', methods=['GET', 'POST'])
 @login_required
@@ -576,34 +1033,45 @@ def update_progress():
     """API endpoint to update student progress"""
     data = request.get_json()
     
-    progress = StudentProgress.query.filter_by(
-        student_id=data['student_id'],
-        lesson_id=data['lesson_id']
-    ).first()
-    
-    if not progress:
-        progress = StudentProgress(
-            student_id=data['student_id'],
-            lesson_id=data['lesson_id'],
-            class_id=data['class_id']
-        )
-        db.session.add(progress)
+    try:
+        save_progress(data)
+    except IntegrityError:
+        # A concurrent request inserted the same student/lesson pair first and the
+        # unique constraint rejected ours, so apply the update to that row instead.
+        db.session.rollback()
+        save_progress(data)
     
-    # Update fields
-    progress.status = data.get('status', progress.status)
-    progress.completion_percentage = data.get('completion_percentage', progress.completion_percentage)
-    progress.skill_demonstration = data.get('skill_demonstration', progress.skill_demonstration)
-    progress.notes = data.get('notes', progress.notes)
-    progress.teacher_feedback = data.get('teacher_feedback', progress.teacher_feedback)
-    progress.shared_publicly = data.get('shared_publicly', progress.shared_publicly)
+    return jsonify({'success': True, 'message': 'Progress updated successfully'})
+
+@app.route('/api/update-progress/bulk', methods=['POST'])
+@login_required
+@teacher_required
+def bulk_update_progress():
+    """API endpoint applying a batch of progress updates in one transaction"""
+    data = request.get_json(silent=True) or {}
+    updates = data.get('updates')
+    
+    if not isinstance(updates, list) or not updates:
+        return jsonify({'success': False, 'message': 'updates must be a non-empty list'}), 400
+    if len(updates) > app.config['BULK_PROGRESS_MAX_ROWS']:
+        return jsonify({
+            'success': False,
+            'message': f'At most {app.config["BULK_PROGRESS_MAX_ROWS"]} updates per request'
+        }), 400
     
-    if data.get('status') == 'completed' and not progress.completed_at:
-        progress.completed_at = datetime.utcnow()
-    elif data.get('status') == 'in_progress' and not progress.started_at:
-        progress.started_at = datetime.utcnow()
+    try:
+        results = bulk_save_progress(updates)
+    except SQLAlchemyError:
+        db.session.rollback()
+        app.logger.exception('Bulk progress update failed')
+        return jsonify({'success': False, 'message': 'No updates were applied'}), 500
     
-    db.session.commit()
-    return jsonify({'success': True, 'message': 'Progress updated successfully'})
+    return jsonify({
+        'success': True,
+        'applied': sum(1 for result in results if result['result'] != 'error'),
+        'errors': sum(1 for result in results if result['result'] == 'error'),
+        'results': results
+    })
 
 @app.route('/api/featured-project/<int:project_id>', methods=['POST'])
 @login_required
@@ -620,56 +1088,147 @@ def toggle_featured_project(project_id):
         'message': f'Project {"featured" if project.is_featured else "unfeatured"} successfully'
     })
 
+@app.route('/api/class-performance')
+@login_required
+@teacher_required
+def api_class_performance():
+    """API endpoint returning the per-class performance rollup"""
+    rollup = class_performance_rollup(class_id=request.args.get('class_id', type=int))
+    return jsonify({
+        'success': True,
+        'classes': [{
+            'class_id': perf['class'].id,
+            'class_name': perf['class'].class_name,
+            'grade_level': perf['class'].grade_level,
+            'student_count': perf['student_count'],
+            'avg_completion': perf['avg_completion'],
+            'status_distribution': perf['status_distribution'],
+            'needs_help': perf['needs_help']
+        } for perf in rollup]
+    })
+
+@app.route('/admin/metrics')
+@login_required
+@admin_required
+def admin_metrics():
+    """Rolling latency, DB time and query count percentiles per route, and rate-limit rejections"""
+    return jsonify({
+        'success': True,
+        'window': route_metrics.window,
+        'slow_query_ms': app.config['SLOW_QUERY_MS'],
+        'routes': route_metrics.summary(),
+        'rate_limited': dict(rate_limit_rejections)
+    })
+
+@app.route('/healthz')
+def healthz():
+    """Liveness check with database round-trip time and connection pool usage"""
+    pool = pool_stats()
+    start = time.perf_counter()
+    try:
+        with db.engine.connect() as connection:
+            connection.execute(db.text('SELECT 1'))
+    except SQLAlchemyError:
+        # Driver errors can name the host, database and SQL, so they go to the log rather than the public response
+        app.logger.exception('Health check could not reach the database')
+        return jsonify({'status': 'error', 'message': 'database unavailable', 'pool': pool}), 503
+    
+    return jsonify({
+        'status': 'ok',
+        'database': {
+            'dialect': db.engine.dialect.name,
+            'latency_ms': round((time.perf_counter() - start) * 1000, 2)
+        },
+        'pool': pool
+    })
+
 # Portfolio routes
 @app.route('/portfolio')
 def portfolio_home():
     """Portfolio homepage showing all rooms"""
-    rooms = Room.query.filter_by(is_active=True).order_by(Room.room_number).all()
-    return render_template('portfolio_home.html', rooms=rooms)
+    version = db.session.execute(db.select(
+        *version_columns(Room), *version_columns(StudentCodenames), *trending_version()
+    )).one()
+    
+    def render():
+        student_counts = db.session.query(
+            StudentCodenames.room_id, db.func.count(StudentCodenames.id).label('student_count')
+        ).group_by(StudentCodenames.room_id).subquery()
+        rooms = db.session.query(Room, db.func.coalesce(student_counts.c.student_count, 0)).outerjoin(
+            student_counts, student_counts.c.room_id == Room.id
+        ).filter(Room.is_active == True).order_by(Room.room_number).all()
+        return render_template('portfolio_home.html', rooms=rooms, trending=trending_items(limit=8))
+    
+    return conditional_page(tuple(version), render, latest(*version))
 
 @app.route('/portfolio/room/<room_number>')
 def room_portfolio(room_number):
     """Room-specific portfolio showing all students"""
     room = Room.query.filter_by(room_number=room_number, is_active=True).first_or_404()
-    students = StudentCodenames.query.filter_by(room_id=room.id, is_public=True).order_by(StudentCodenames.greek_code).all()
-    
-    # Get recent portfolio items for this room
-    recent_items = db.session.query(PortfolioItem).join(StudentCodenames).filter(
-        StudentCodenames.room_id == room.id,
-        PortfolioItem.is_public == True
-    ).order_by(PortfolioItem.created_at.desc()).limit(12).all()
+    room_students = db.select(StudentCodenames.id).where(StudentCodenames.room_id == room.id)
+    version = db.session.execute(db.select(
+        *version_columns(StudentCodenames, StudentCodenames.room_id == room.id),
+        *version_columns(PortfolioItem, PortfolioItem.student_id.in_(room_students),
+                         totals=(PortfolioItem.likes_count, PortfolioItem.views_count)),
+        *trending_version(TrendingScore.room_id == room.id)
+    )).one()
+    
+    def render():
+        students = StudentCodenames.query.filter_by(room_id=room.id, is_public=True).order_by(StudentCodenames.greek_code).all()
+        
+        # Get recent portfolio items for this room
+        recent_items = db.session.query(PortfolioItem).join(StudentCodenames).options(
+            db.contains_eager(PortfolioItem.student)
+        ).filter(
+            StudentCodenames.room_id == room.id,
+            PortfolioItem.is_public == True
+        ).order_by(PortfolioItem.created_at.desc()).limit(12).all()
+        
+        return render_template('room_portfolio.html', room=room, students=students, recent_items=recent_items,
+                               trending=trending_items(room.id))
     
-    return render_template('room_portfolio.html', room=room, students=students, recent_items=recent_items)
+    # Counter flushes change the totals but not updated_at, so only the ETag can tell this page changed
+    return conditional_page((room.id, room.updated_at, *version), render)
 
 @app.route('/portfolio/student/<int:student_id>')
 def student_portfolio(student_id):
     """Individual student portfolio page"""
-    student = StudentCodenames.query.filter_by(id=student_id, is_public=True).first_or_404()
-    portfolio_items = PortfolioItem.query.filter_by(
-        student_id=student.id, 
-        is_public=True
-    ).order_by(PortfolioItem.created_at.desc()).all()
-    
-    # Get stats
-    total_items = len(portfolio_items)
-    total_likes = sum(item.likes_count for item in portfolio_items)
-    total_views = sum(item.views_count for item in portfolio_items)
-    
-    return render_template('student_portfolio.html', 
-                         student=student, 
-                         portfolio_items=portfolio_items,
-                         total_items=total_items,
-                         total_likes=total_likes,
-                         total_views=total_views)
+    student = StudentCodenames.query.options(db.joinedload(StudentCodenames.room)).filter_by(
+        id=student_id, is_public=True
+    ).first_or_404()
+    version = db.session.execute(db.select(*version_columns(
+        PortfolioItem, PortfolioItem.student_id == student.id, totals=(PortfolioItem.likes_count, PortfolioItem.views_count)
+    ))).one()
+    
+    def render():
+        portfolio_items, next_cursor = keyset_page(
+            PortfolioItem.query.filter_by(student_id=student.id, is_public=True),
+            PortfolioItem,
+            request.args.get('cursor')
+        )
+        
+        # Get stats
+        stats = portfolio_stats(PortfolioItem.student_id == student.id, PortfolioItem.is_public == True)
+        
+        return render_template('student_portfolio.html', 
+                             student=student, 
+                             portfolio_items=portfolio_items,
+                             next_cursor=next_cursor,
+                             is_first_page=not request.args.get('cursor'),
+                             **stats)
+    
+    # Counter flushes change the totals but not updated_at, so only the ETag can tell this page changed
+    return conditional_page((student.id, student.updated_at, student.room.updated_at, *version), render)
 
 @app.route('/portfolio/item/<int:item_id>')
 def portfolio_item_detail(item_id):
     """Individual portfolio item detail page"""
-    item = PortfolioItem.query.filter_by(id=item_id, is_public=True).first_or_404()
+    item = PortfolioItem.query.options(db.joinedload(PortfolioItem.student)).filter_by(
+        id=item_id, is_public=True
+    ).first_or_404()
     
-    # Increment view count
-    item.views_count += 1
-    db.session.commit()
+    # Increment view count, written to the database by the counter flusher
+    portfolio_counters.increment(item.id, 'views_count')
     
     # Get related items from same student
     related_items = PortfolioItem.query.filter(
@@ -681,16 +1240,90 @@ def portfolio_item_detail(item_id):
     return render_template('portfolio_item_detail.html', item=item, related_items=related_items)
 
 @app.route('/api/portfolio/like/<int:item_id>', methods=['POST'])
+@rate_limit('like', lambda item_id: client_address())
 def like_portfolio_item(item_id):
-    """Like a portfolio item"""
+    """Like a portfolio item; liking it again within RATE_LIMIT_LIKE_REPEAT is acknowledged but not counted"""
     item = PortfolioItem.query.get_or_404(item_id)
-    item.likes_count += 1
-    db.session.commit()
+    already_liked = bool(take_rate_limit('like_repeat', f'{visitor_key()}:{item.id}'))
+    if not already_liked:
+        portfolio_counters.increment(item.id, 'likes_count')
     
     return jsonify({
         'success': True,
-        'likes_count': item.likes_count,
-        'message': 'Item liked!'
+        'likes_count': item.current_likes_count,
+        'already_liked': already_liked,
+        'message': 'You already liked this project.' if already_liked else 'Item liked!'
+    })
+
+@app.route('/api/portfolio/student/<int:student_id>/items')
+def api_student_portfolio_items(student_id):
+    """API endpoint returning one page of a student's public portfolio items"""
+    student = StudentCodenames.query.filter_by(id=student_id, is_public=True).first_or_404()
+    items, next_cursor = keyset_page(
+        PortfolioItem.query.filter_by(student_id=student.id, is_public=True),
+        PortfolioItem,
+        request.args.get('cursor'),
+        min(max(request.args.get('limit', app.config['PAGE_SIZE'], type=int), 1), 100)
+    )
+    return jsonify({
+        'success': True,
+        'items': [{
+            'id': item.id,
+            'title': item.title,
+            'description': item.description,
+            'content_type': item.content_type,
+            'project_type': item.project_type,
+            'quarter': item.quarter,
+            'thumbnail_url': url_for('static', filename=item.thumbnail_path) if item.thumbnail_path else None,
+            'likes_count': item.current_likes_count,
+            'views_count': item.current_views_count,
+            'created_at': item.created_at.isoformat(),
+            'url': url_for('portfolio_item_detail', item_id=item.id)
+        } for item in items],
+        'next_cursor': next_cursor
+    })
+
+@app.route('/api/projects')
+def api_projects():
+    """API endpoint returning one page of public projects, optionally for one tag or quarter"""
+    query = Project.query.options(db.joinedload(Project.creator)).filter_by(is_public=True)
+    if request.args.get('tag'):
+        query = query.filter(Project.id.in_(tagged_ids(Project, request.args['tag'], request.args.get('tag_kind'))))
+    if request.args.get('quarter'):
+        query = query.filter_by(quarter=request.args['quarter'])
+    projects, next_cursor = keyset_page(
+        query, Project, request.args.get('cursor'),
+        min(max(request.args.get('limit', app.config['PAGE_SIZE'], type=int), 1), 100)
+    )
+    return jsonify({
+        'success': True,
+        'projects': [dict(project_snapshot(project), created_at=project.created_at.isoformat())
+                     for project in projects],
+        'next_cursor': next_cursor
+    })
+
+@app.route('/api/lessons')
+@login_required
+@teacher_required
+def api_lessons():
+    """API endpoint returning one page of lesson plans, newest first"""
+    lessons, next_cursor = keyset_page(
+        LessonPlan.query, LessonPlan, request.args.get('cursor'),
+        min(max(request.args.get('limit', app.config['PAGE_SIZE'], type=int), 1), 100)
+    )
+    return jsonify({
+        'success': True,
+        'lessons': [{
+            'id': lesson.id,
+            'title': lesson.title,
+            'class_id': lesson.class_id,
+            'subject_area': lesson.subject_area,
+            'quarter': lesson.quarter,
+            'duration_minutes': lesson.duration_minutes,
+            'difficulty_level': lesson.difficulty_level,
+            'created_at': lesson.created_at.isoformat()
+        } for lesson in lessons],
+        'next_cursor': next_cursor
     })
 
 # Initialize database and sample data
@@ -702,7 +1335,7 @@ def create_sample_data():
         admin = User(
             username='teacher',
             email='teacher@barnum.edu',
-            password_hash=generate_password_hash('password123'),
+            password_hash=hash_password('password123'),
             role='teacher',
             first_name='STEM',
             last_name='Teacher'
@@ -744,7 +1377,7 @@ def create_sample_data():
             student = User(
                 username=student_data['username'],
                 email=f"{student_data['username']}@student.barnum.edu",
-                password_hash=generate_password_hash('student123'),
+                password_hash=hash_password('student123'),
                 role='student',
                 first_name=student_data['first_name'],
                 last_name=student_data['last_name'],
@@ -835,10 +1468,6 @@ def create_sample_data():
     
     # Create sample student codenames
     if StudentCodenames.query.count() == 0:
-        greek_letters = ['Alpha', 'Beta', 'Gamma', 'Delta', 'Epsilon', 'Zeta', 'Eta', 'Theta', 
-                        'Iota', 'Kappa', 'Lambda', 'Mu', 'Nu', 'Xi', 'Omicron', 'Pi', 'Rho', 
-                        'Sigma', 'Tau', 'Upsilon', 'Phi', 'Chi', 'Psi', 'Omega']
-        
         student_names = [
             'Emma K', 'Marcus T', 'Sophia L', 'Jayden M', 'Alex R', 'Maya S',
             'Noah P', 'Isabella C', 'Liam D', 'Ava W', 'William B', 'Mia H',
@@ -850,17 +1479,11 @@ def create_sample_data():
         rooms = Room.query.all()
         for room in rooms:
             for i in range(min(25, len(student_names))):
-                greek_letter = greek_letters[i % len(greek_letters)]
-                code_number = f"{i+1:03d}"
-                greek_code = f"{greek_letter}_{code_number}"
+                greek_code = greek_code_for(i)
                 
                 student_name = student_names[i % len(student_names)]
                 first_name, last_name = student_name.split(' ', 1)
                 
-                # Generate avatar colors
-                colors = ['#007bff', '#28a745', '#dc3545', '#ffc107', '#17a2b8', 
-                         '#6f42c1', '#e83e8c', '#fd7e14', '#20c997', '#6c757d']
-                
                 student = StudentCodenames(
                     room_id=room.id,
                     greek_code=greek_code,
@@ -869,7 +1492,7 @@ def create_sample_data():
                     last_name=last_name,
                     grade_level=room.grade_levels.split('-')[0].strip() if room.grade_levels else '3rd Grade',
                     bio=f"STEM enthusiast from {room.room_name}",
-                    avatar_color=colors[i % len(colors)],
+                    avatar_color=AVATAR_COLORS[i % len(AVATAR_COLORS)],
                     is_public=True
                 )
                 db.session.add(student)
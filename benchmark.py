@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Benchmark the public and teacher routes against a large synthetic data set.
+
+The data set is generated once into its own database (never the development
+one) and reused on later runs, so numbers are comparable between commits:
+
+    python benchmark.py                       # default scale, results to stdout
+    python benchmark.py --scale small         # quick run while developing
+    python benchmark.py --json bench.json     # save results
+    python benchmark.py --baseline bench.json # exit 1 if a route's p95 regressed
+    python benchmark.py --logins 100          # sign-in throughput with the current hash settings
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import resource
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+SCALES = {
+    'small': {'rooms': 5, 'students': 250, 'items': 2000, 'lessons': 40, 'progress': 5000},
+    'default': {'rooms': 50, 'students': 5000, 'items': 100000, 'lessons': 200, 'progress': 500000},
+}
+
+GREEK_LETTERS = ['Alpha', 'Beta', 'Gamma', 'Delta', 'Epsilon', 'Zeta', 'Eta', 'Theta',
+                 'Iota', 'Kappa', 'Lambda', 'Mu', 'Nu', 'Xi', 'Omicron', 'Pi', 'Rho',
+                 'Sigma', 'Tau', 'Upsilon', 'Phi', 'Chi', 'Psi', 'Omega']
+FIRST_NAMES = ['Emma', 'Marcus', 'Sophia', 'Jayden', 'Alex', 'Maya', 'Noah', 'Isabella',
+               'Liam', 'Ava', 'William', 'Mia', 'James', 'Charlotte', 'Benjamin', 'Amelia']
+GRADE_LEVELS = ['3rd Grade', '4th Grade', '5th Grade', '6th Grade', '7th Grade', '8th Grade']
+QUARTERS = ['Q1', 'Q2', 'Q3', 'Q4']
+PROJECT_TYPES = ['Tinkercad', 'Scratch', 'Unreal Engine', 'Robotics']
+CONTENT_TYPES = ['image', 'video', '3d_model', 'code', 'document']
+SUBJECT_AREAS = ['Engineering', 'Design', 'Programming', 'Robotics', 'Math', 'Science', 'Art', 'Game Design']
+SKILLS = ['3D Design', 'Problem Solving', 'Logic', 'Creativity', 'Teamwork', 'Soldering', 'Spatial Thinking',
+          'Storytelling', 'Debugging', 'Measurement', 'Mechanical Design', 'Programming Logic']
+STATUSES = ['not_started', 'in_progress', 'completed', 'needs_help']
+COLORS = ['#007bff', '#28a745', '#dc3545', '#ffc107', '#17a2b8',
+          '#6f42c1', '#e83e8c', '#fd7e14', '#20c997', '#6c757d']
+CHUNK_SIZE = 10000
+
+TEACHER_USERNAME = 'bench_teacher'
+TEACHER_PASSWORD = 'bench123'
+
+
+def insert_chunked(model, rows):
+    """Insert an iterable of row dicts in executemany batches"""
+    from app import db
+
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            db.session.execute(db.insert(model), chunk)
+            db.session.commit()
+            chunk = []
+    if chunk:
+        db.session.execute(db.insert(model), chunk)
+        db.session.commit()
+
+
+def generate_data(scale, seed):
+    """Fill an empty database with a deterministic synthetic data set"""
+    from app import (db, User, STEMClass, LessonPlan, StudentProgress, Project,
+                     Room, StudentCodenames, PortfolioItem)
+    from services.progress import refresh_progress_stats
+    from services.search import rebuild_search_index
+    from services.tags import rebuild_tag_index
+    from services.trending import rebuild_trending_scores
+    from services.passwords import hash_password
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+
+    def recent(days=365):
+        return now - timedelta(seconds=rng.randrange(days * 86400))
+
+    db.create_all()
+    db.session.add(User(username=TEACHER_USERNAME, email='bench_teacher@barnum.edu',
+                        password_hash=hash_password(TEACHER_PASSWORD), role='teacher',
+                        first_name='Bench', last_name='Teacher'))
+    db.session.commit()
+
+    print(f"  rooms: {scale['rooms']}")
+    insert_chunked(Room, ({
+        'room_number': f'RM{100 + i}',
+        'room_name': f'STEM Lab {i + 1}',
+        'description': 'Synthetic benchmark room',
+        'capacity': 30,
+        'grade_levels': '3rd-8th Grade',
+        'is_active': True,
+        'created_at': now
+    } for i in range(scale['rooms'])))
+    room_ids = [row.id for row in db.session.query(Room.id).order_by(Room.id)]
+
+    # Each codename gets a linked student account so progress rows have owners
+    print(f"  students: {scale['students']}")
+    password_hash = hash_password('student123')
+    insert_chunked(User, ({
+        'username': f'bench_student_{i}',
+        'email': f'bench_student_{i}@barnum.edu',
+        'password_hash': password_hash,
+        'role': 'student',
+        'first_name': FIRST_NAMES[i % len(FIRST_NAMES)],
+        'last_name': chr(ord('A') + i % 26),
+        'grade_level': GRADE_LEVELS[i % len(GRADE_LEVELS)],
+        'created_at': now
+    } for i in range(scale['students'])))
+    student_ids = [row.id for row in db.session.query(User.id).filter_by(role='student').order_by(User.id)]
+
+    def codename(i):
+        room_index = i % len(room_ids)
+        number = i // len(room_ids) + 1
+        greek_code = f'{GREEK_LETTERS[number % len(GREEK_LETTERS)]}_{number:03d}'
+        first_name = FIRST_NAMES[i % len(FIRST_NAMES)]
+        last_name = chr(ord('A') + i % 26)
+        return {
+            'room_id': room_ids[room_index],
+            'user_id': student_ids[i],
+            'greek_code': greek_code,
+            'display_name': f'{greek_code} - {first_name} {last_name}',
+            'first_name': first_name,
+            'last_name': last_name,
+            'grade_level': GRADE_LEVELS[i % len(GRADE_LEVELS)],
+            'avatar_color': COLORS[i % len(COLORS)],
+            'is_public': rng.random() < 0.95,
+            'created_at': now,
+            'last_active': recent(30)
+        }
+    insert_chunked(StudentCodenames, (codename(i) for i in range(scale['students'])))
+    codename_ids = [row.id for row in db.session.query(StudentCodenames.id).order_by(StudentCodenames.id)]
+
+    print(f"  portfolio items: {scale['items']}")
+    insert_chunked(PortfolioItem, ({
+        'student_id': rng.choice(codename_ids),
+        'title': f'Project {i}',
+        'description': 'Synthetic benchmark portfolio item',
+        'content_type': rng.choice(CONTENT_TYPES),
+        'project_type': rng.choice(PROJECT_TYPES),
+        'quarter': rng.choice(QUARTERS),
+        'subject_areas': ', '.join(rng.sample(SUBJECT_AREAS, rng.randrange(1, 3))),
+        'skills_used': ', '.join(rng.sample(SKILLS, rng.randrange(1, 4))),
+        'is_featured': rng.random() < 0.02,
+        'is_public': rng.random() < 0.9,
+        'likes_count': rng.randrange(50),
+        'views_count': rng.randrange(500),
+        'created_at': recent(),
+        'updated_at': now
+    } for i in range(scale['items'])))
+
+    # Projects mirror a slice of the portfolio so the homepage and showcase have data
+    insert_chunked(Project, ({
+        'title': f'Showcase Project {i}',
+        'description': 'Synthetic benchmark project',
+        'creator_id': rng.choice(student_ids),
+        'project_type': rng.choice(PROJECT_TYPES),
+        'quarter': rng.choice(QUARTERS),
+        'grade_level': rng.choice(GRADE_LEVELS),
+        'subject_areas': ', '.join(rng.sample(SUBJECT_AREAS, rng.randrange(1, 3))),
+        'skills_used': ', '.join(rng.sample(SKILLS, rng.randrange(1, 4))),
+        'is_public': rng.random() < 0.8,
+        'is_featured': rng.random() < 0.02,
+        'created_at': recent(),
+        'updated_at': now
+    } for i in range(max(1, scale['items'] // 10))))
+
+    class_count = max(1, math.ceil(scale['lessons'] / 10))
+    insert_chunked(STEMClass, ({
+        'class_name': f'STEM Class {i + 1}',
+        'teacher_first_name': 'Bench',
+        'grade_level': GRADE_LEVELS[i % len(GRADE_LEVELS)],
+        'description': 'Synthetic benchmark class',
+        'created_at': now
+    } for i in range(class_count)))
+    class_ids = [row.id for row in db.session.query(STEMClass.id).order_by(STEMClass.id)]
+
+    insert_chunked(LessonPlan, ({
+        'title': f'Lesson {i + 1}',
+        'class_id': class_ids[i % len(class_ids)],
+        'subject_area': 'Engineering',
+        'quarter': QUARTERS[i % len(QUARTERS)],
+        'duration_minutes': 45,
+        'learning_objectives': 'Synthetic benchmark lesson objectives',
+        'difficulty_level': 'Beginner',
+        'created_at': recent(),
+        'updated_at': now
+    } for i in range(scale['lessons'])))
+    lessons = db.session.query(LessonPlan.id, LessonPlan.class_id).order_by(LessonPlan.id).all()
+
+    # Every student works through a contiguous run of lessons, keeping (student, lesson) unique
+    per_student = min(len(lessons), math.ceil(scale['progress'] / len(student_ids)))
+    print(f"  progress rows: {per_student * len(student_ids)}")
+
+    def progress_rows():
+        for index, student_id in enumerate(student_ids):
+            offset = index * 7 % len(lessons)
+            for step in range(per_student):
+                lesson_id, class_id = lessons[(offset + step) % len(lessons)]
+                status = rng.choice(STATUSES)
+                started = recent(180) if status != 'not_started' else None
+                yield {
+                    'student_id': student_id,
+                    'lesson_id': lesson_id,
+                    'class_id': class_id,
+                    'status': status,
+                    'completion_percentage': 100 if status == 'completed' else rng.randrange(100),
+                    'time_spent_minutes': rng.randrange(300),
+                    'started_at': started,
+                    'completed_at': started + timedelta(days=rng.randrange(1, 14)) if status == 'completed' else None,
+                    'last_updated': recent(180)
+                }
+    insert_chunked(StudentProgress, progress_rows())
+
+    # Core inserts skip the ORM events, so build the dashboard stats, search, tag and trending indexes in one pass
+    refresh_progress_stats()
+    rebuild_search_index()
+    rebuild_tag_index()
+    rebuild_trending_scores()
+    db.session.commit()
+
+
+def benchmark_routes(rng):
+    """Public and teacher routes to replay, with ids sampled from the data set"""
+    from app import db, Room, StudentCodenames, PortfolioItem, STEMClass
+
+    rooms = [row.room_number for row in db.session.query(Room.room_number)]
+    students = [row.id for row in db.session.query(StudentCodenames.id).filter_by(is_public=True).limit(1000)]
+    items = [row.id for row in db.session.query(PortfolioItem.id).filter_by(is_public=True).limit(1000)]
+    class_id = db.session.query(STEMClass.id).order_by(STEMClass.id).first().id
+
+    public = [
+        ('healthz', lambda: '/healthz'),
+        ('index', lambda: '/'),
+        ('showcase', lambda: '/showcase'),
+        ('showcase_quarter', lambda: f'/showcase?quarter={rng.choice(QUARTERS)}'),
+        ('portfolio_home', lambda: '/portfolio'),
+        ('room_portfolio', lambda: f'/portfolio/room/{rng.choice(rooms)}'),
+        ('student_portfolio', lambda: f'/portfolio/student/{rng.choice(students)}'),
+        ('portfolio_item_detail', lambda: f'/portfolio/item/{rng.choice(items)}'),
+        ('api_projects', lambda: '/api/projects'),
+        ('api_student_items', lambda: f'/api/portfolio/student/{rng.choice(students)}/items'),
+        ('search', lambda: f'/search?q={rng.choice(PROJECT_TYPES).split()[0]}'),
+        ('api_search_faceted', lambda: f'/api/search?q=project&quarter={rng.choice(QUARTERS)}'),
+        ('api_portfolio_items_tag', lambda: f'/api/portfolio/items?tag={rng.choice(SKILLS)}'),
+        ('api_tags_quarter', lambda: f'/api/tags?kind=skill&quarter={rng.choice(QUARTERS)}'),
+        ('api_trending', lambda: '/api/portfolio/trending'),
+        ('api_trending_room', lambda: f'/api/portfolio/trending?room={rng.choice(rooms)}'),
+    ]
+    teacher = [
+        ('teacher_dashboard', lambda: '/teacher-dashboard'),
+        ('student_progress', lambda: '/student-progress'),
+        ('student_progress_page', lambda: f'/student-progress?page={rng.randrange(2, 20)}'),
+        ('student_progress_class', lambda: f'/student-progress?class_id={class_id}'),
+        ('manage_classes', lambda: '/manage-classes'),
+        ('manage_lessons', lambda: '/manage-lessons'),
+        ('api_class_performance', lambda: '/api/class-performance'),
+        ('api_lessons', lambda: '/api/lessons'),
+    ]
+    return public, teacher
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def measure(client, name, make_url, requests):
+    """Replay one route and summarise its latency, query counts and memory"""
+    from services.instrumentation import percentile
+
+    client.get(make_url())  # warm up caches and the connection pool
+    durations = []
+    query_counts = []
+    for _ in range(requests):
+        url = make_url()
+        start = time.perf_counter()
+        response = client.get(url)
+        durations.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise SystemExit(f'{name}: GET {url} returned {response.status_code}')
+        timing = ', '.join(response.headers.getlist('Server-Timing'))
+        match = re.search(r'(\d+) queries', timing)
+        query_counts.append(int(match.group(1)) if match else 0)
+
+    durations.sort()
+    query_counts.sort()
+    return {
+        'requests': requests,
+        'p50_ms': round(percentile(durations, 0.5) * 1000, 2),
+        'p95_ms': round(percentile(durations, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(durations, 0.99) * 1000, 2),
+        'queries_p50': percentile(query_counts, 0.5),
+        'queries_max': query_counts[-1],
+        'peak_rss_mb': round(peak_rss_mb(), 1)
+    }
+
+
+def measure_logins(app, count, threads):
+    """Sign in count times from concurrent clients; logins per second overall and per hashing core"""
+    def sign_in(_):
+        with app.test_client() as client:
+            response = client.post('/login', data={'username': TEACHER_USERNAME, 'password': TEACHER_PASSWORD})
+            if response.status_code != 302:
+                raise SystemExit(f'login returned {response.status_code}')
+
+    sign_in(None)  # warm up, and upgrade the stored hash if the hash settings changed
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(sign_in, range(count)))
+    per_second = count / (time.perf_counter() - start)
+    # Hashing never uses more cores than the machine has or the app's hashing pool allows
+    cores = min(os.cpu_count() or 1, app.config['PASSWORD_HASH_WORKERS'], threads)
+    return {
+        'logins': count,
+        'threads': threads,
+        'hash_method': app.config['PASSWORD_HASH_METHOD'],
+        'hash_workers': app.config['PASSWORD_HASH_WORKERS'],
+        'cores': cores,
+        'logins_per_sec': round(per_second, 2),
+        'logins_per_sec_per_core': round(per_second / cores, 2)
+    }
+
+
+def check_baseline(results, logins, baseline_path, tolerance):
+    """Print routes whose p95 regressed past the tolerance, or a login throughput drop; True if none did"""
+    with open(baseline_path) as f:
+        saved = json.load(f)
+    baseline = saved['routes']
+
+    regressions = []
+    before = saved.get('logins')
+    # A different hash method is an intended cost change, not a regression
+    if logins and before and before['hash_method'] == logins['hash_method']:
+        if logins['logins_per_sec_per_core'] < before['logins_per_sec_per_core'] * (1 - tolerance):
+            regressions.append(f"logins: {before['logins_per_sec_per_core']}/s -> "
+                               f"{logins['logins_per_sec_per_core']}/s per core")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if result['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {result['p95_ms']}ms")
+        if result['queries_max'] > before['queries_max']:
+            regressions.append(f"{name}: queries {before['queries_max']} -> {result['queries_max']}")
+
+    for regression in regressions:
+        print(f'❌ {regression}')
+    return not regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='default')
+    parser.add_argument('--database', default='sqlite:////tmp/barnum_stem_bench.db',
+                        help='database URL for the synthetic data set')
+    parser.add_argument('--regenerate', action='store_true', help='drop and regenerate the data set')
+    parser.add_argument('--requests', type=int, default=50, help='requests per route')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--baseline', help='compare against results saved with --json')
+    parser.add_argument('--log-slow-queries', action='store_true', help='keep the SLOW_QUERY_MS warnings')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed p95 slowdown (default 20%%)')
+    parser.add_argument('--logins', type=int, default=20, help='sign-ins for the login throughput run (0 skips it)')
+    parser.add_argument('--login-threads', type=int, default=4, help='concurrent clients signing in')
+    args = parser.parse_args()
+
+    # The app binds its engine at import time, so point it at the benchmark database first
+    os.environ['DATABASE_URL'] = args.database
+    from app import app, db, Room
+
+    if not args.log_slow_queries:
+        app.config['SLOW_QUERY_MS'] = float('inf')
+    app.config['RATE_LIMIT_ENABLED'] = False  # every benchmark request comes from one address
+
+    scale = SCALES[args.scale]
+    with app.app_context():
+        if args.regenerate:
+            db.drop_all()
+        db.create_all()
+        if not Room.query.first():
+            print(f'🏗️ Generating {args.scale} data set in {args.database}...')
+            start = time.perf_counter()
+            generate_data(scale, args.seed)
+            print(f'✅ Generated in {time.perf_counter() - start:.1f}s')
+
+        rng = random.Random(args.seed)
+        public, teacher = benchmark_routes(rng)
+
+    results = {}
+    print(f"\n{'route':<26}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'max q':>7}{'rss MB':>9}")
+    with app.test_client() as client:
+        for group, routes in (('public', public), ('teacher', teacher)):
+            if group == 'teacher':
+                response = client.post('/login', data={'username': TEACHER_USERNAME, 'password': TEACHER_PASSWORD})
+                if response.status_code != 302:
+                    raise SystemExit('Could not log in as the benchmark teacher')
+            for name, make_url in routes:
+                result = measure(client, name, make_url, args.requests)
+                results[name] = result
+                print(f"{name:<26}{result['p50_ms']:>9}{result['p95_ms']:>9}{result['p99_ms']:>9}"
+                      f"{result['queries_p50']:>9}{result['queries_max']:>7}{result['peak_rss_mb']:>9}")
+
+    logins = None
+    if args.logins:
+        logins = measure_logins(app, args.logins, args.login_threads)
+        print(f"\n🔑 {logins['logins_per_sec']} logins/s, {logins['logins_per_sec_per_core']} per core "
+              f"({logins['hash_method']}, {logins['hash_workers']} hashing threads, {logins['threads']} clients)")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'scale': args.scale, 'requests': args.requests, 'routes': results, 'logins': logins}, f, indent=2)
+        print(f'\n💾 Results written to {args.json}')
+
+    if args.baseline:
+        if not check_baseline(results, logins, args.baseline, args.tolerance):
+            return 1
+        print('\n✅ No regressions against the baseline')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
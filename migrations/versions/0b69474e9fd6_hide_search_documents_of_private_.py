@@ -0,0 +1,35 @@
+"""Hide search documents of private students
+
+Revision ID: 0b69474e9fd6
+Revises: e1869aebe607
+Create Date: 2026-10-17 01:32:33.013051
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b69474e9fd6'
+down_revision = 'e1869aebe607'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Portfolio documents are public only while the student is too; the app keeps them in sync from here on
+    op.execute(
+        "UPDATE search_document SET is_public = FALSE "
+        "WHERE doc_type = 'portfolio_item' AND doc_id IN ("
+        "SELECT portfolio_item.id FROM portfolio_item "
+        "JOIN student_codenames ON portfolio_item.student_id = student_codenames.id "
+        "WHERE NOT student_codenames.is_public)"
+    )
+
+
+def downgrade():
+    op.execute(
+        "UPDATE search_document SET is_public = ("
+        "SELECT portfolio_item.is_public FROM portfolio_item WHERE portfolio_item.id = search_document.doc_id) "
+        "WHERE doc_type = 'portfolio_item'"
+    )
@@ -0,0 +1,146 @@
+"""Fingerprinted, precompressed static files."""
+import os
+from flask import request, send_from_directory
+from werkzeug.security import safe_join
+from functools import lru_cache
+from collections import OrderedDict
+import click
+import gzip
+import hashlib
+import mimetypes
+import re
+import tempfile
+
+try:
+    import brotli
+except ImportError:  # Optional: without it static files are only served gzip-compressed
+    brotli = None
+
+from app import app
+from services.media import UPLOAD_CHUNK_SIZE
+
+FINGERPRINTED_FILENAME = re.compile(r'^(?P<stem>.+)\.(?P<fingerprint>[0-9a-f]{12})(?P<extension>\.\w+)$')
+CONTENT_ADDRESSED_UPLOAD = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{64}')
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.json', '.svg', '.txt', '.html', '.map'}
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Preferred first
+STATIC_ENCODINGS = OrderedDict([('br', '.br'), ('gzip', '.gz')])
+STATIC_COMPRESSORS = {'gzip': lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+if brotli is not None:
+    STATIC_COMPRESSORS['br'] = lambda data: brotli.compress(data, quality=11)
+
+@lru_cache(maxsize=1024)
+def _file_fingerprint(path, mtime_ns, size):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+def static_fingerprint(filename):
+    """Short content hash of a file in the static folder, or None if there is no such file"""
+    path = safe_join(app.static_folder, filename)
+    try:
+        stat = os.stat(path)
+    except (TypeError, OSError):
+        return None
+    # Keyed on mtime and size so an edited file is hashed again
+    return _file_fingerprint(path, stat.st_mtime_ns, stat.st_size)
+
+def is_content_addressed(filename):
+    """Uploads are stored under their content hash (see store_upload), so their URLs never change meaning"""
+    upload_prefix = os.path.relpath(os.path.join(app.root_path, app.config['UPLOAD_FOLDER']), app.static_folder)
+    prefix = upload_prefix.replace(os.sep, '/') + '/'
+    return filename.startswith(prefix) and CONTENT_ADDRESSED_UPLOAD.match(filename[len(prefix):]) is not None
+
+@app.url_defaults
+def fingerprint_static_url(endpoint, values):
+    """Make url_for('static', filename='css/custom.css') point at css/custom.<hash>.css"""
+    if endpoint != 'static' or 'filename' not in values or is_content_addressed(values['filename']):
+        return
+    fingerprint = static_fingerprint(values['filename'])
+    if fingerprint:
+        stem, extension = os.path.splitext(values['filename'])
+        values['filename'] = f'{stem}.{fingerprint}{extension}'
+
+def compressed_variant(filename, encoding):
+    """Filename of a compressed copy of a static file, written next to it on first use.
+
+    Returns None when the copy is missing and cannot be created, e.g. on a
+    read-only deploy without `flask compress-static` having been run.
+    """
+    source = safe_join(app.static_folder, filename)
+    variant = source + STATIC_ENCODINGS[encoding]
+    source_mtime = os.stat(source).st_mtime_ns
+    try:
+        if os.stat(variant).st_mtime_ns >= source_mtime:
+            return filename + STATIC_ENCODINGS[encoding]
+    except FileNotFoundError:
+        pass
+    
+    compress = STATIC_COMPRESSORS.get(encoding)
+    if compress is None:
+        return None
+    try:
+        with open(source, 'rb') as f:
+            data = compress(f.read())
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(variant), suffix='.part')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, variant)
+    except OSError as e:
+        app.logger.warning(f'Could not write {encoding} copy of {filename}: {e}')
+        return None
+    return filename + STATIC_ENCODINGS[encoding]
+
+@app.endpoint('static')
+def static_asset(filename):
+    """Serve a static file, compressed when the client accepts it and cached for a year when its URL is content-addressed"""
+    immutable = is_content_addressed(filename)
+    match = FINGERPRINTED_FILENAME.match(filename)
+    if match and static_fingerprint(filename) is None:
+        # An outdated fingerprint still gets the current file, just without long-lived caching
+        filename = match['stem'] + match['extension']
+        immutable = static_fingerprint(filename) == match['fingerprint']
+    
+    served, encoding = filename, None
+    compressible = os.path.splitext(filename)[1].lower() in COMPRESSIBLE_EXTENSIONS
+    if compressible and static_fingerprint(filename):
+        for candidate in STATIC_ENCODINGS:
+            if request.accept_encodings[candidate]:
+                variant = compressed_variant(filename, candidate)
+                if variant:
+                    served, encoding = variant, candidate
+                    break
+    
+    # send_from_directory answers conditional and Range requests (206) itself
+    response = send_from_directory(
+        app.static_folder, served,
+        mimetype=mimetypes.guess_type(filename)[0],
+        max_age=IMMUTABLE_MAX_AGE if immutable else app.get_send_file_max_age(filename)
+    )
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if compressible:
+        response.vary.add('Accept-Encoding')
+    if immutable:
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    return response
+
+@app.cli.command('compress-static')
+def compress_static_command():
+    """Write gzip (and brotli, if installed) copies of compressible static files."""
+    upload_root = os.path.join(app.root_path, app.config['UPLOAD_FOLDER'])
+    written = 0
+    for root, directories, files in os.walk(app.static_folder):
+        if os.path.abspath(root) == os.path.abspath(upload_root):
+            directories.clear()
+            continue
+        for name in files:
+            if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            filename = os.path.relpath(os.path.join(root, name), app.static_folder).replace(os.sep, '/')
+            written += sum(compressed_variant(filename, encoding) is not None for encoding in STATIC_COMPRESSORS)
+    click.echo(f"✅ {written} compressed static files up to date")
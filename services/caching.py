@@ -0,0 +1,233 @@
+"""Cached public page data, invalidated by model events."""
+import os
+from collections import OrderedDict
+import hashlib
+import pickle
+import tempfile
+import threading
+import time
+
+from app import app, db, Expo, LessonPlan, Project, STEMClass, User
+
+class CacheBackend:
+    """Interface for cache backends; get() returns default for missing or expired keys"""
+
+    def get(self, key, default=None):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def delete_many(self, keys):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+class MemoryCache(CacheBackend):
+    """Per-process cache with a TTL per entry and a least-recently-used size bound"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class FileSystemCache(CacheBackend):
+    """Cache stored as pickle files in a directory shared by every worker on the host.
+
+    Invalidations delete the file, so all gunicorn workers see them at once.
+    The least recently written entries are pruned past max_entries.
+    """
+
+    def __init__(self, directory, max_entries):
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.cache')
+
+    def get(self, key, default=None):
+        try:
+            with open(self._path(key), 'rb') as f:
+                expires_at, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return default
+        if expires_at < time.time():
+            return default
+        return value
+
+    def set(self, key, value, ttl):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump((time.time() + ttl, value), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(key))
+        self._prune()
+
+    def delete_many(self, keys):
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.cache'):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def _prune(self):
+        entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith('.cache')]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+def create_cache_backend(config):
+    if config['CACHE_BACKEND'] == 'filesystem':
+        return FileSystemCache(config['CACHE_DIR'], config['CACHE_MAX_ENTRIES'])
+    return MemoryCache(config['CACHE_MAX_ENTRIES'])
+
+cache = create_cache_backend(app.config)
+_cache_missing = object()
+
+def cached(key, loader, ttl=None):
+    """Return the cached value for key, calling loader() and storing its result on a miss"""
+    value = cache.get(key, _cache_missing)
+    if value is _cache_missing:
+        value = loader()
+        cache.set(key, value, ttl or app.config['CACHE_DEFAULT_TTL'])
+    return value
+
+SHOWCASE_QUARTERS = OrderedDict([
+    ('Q1', '3D Design & Treehouses'),
+    ('Q2', 'Game Development'),
+    ('Q3', 'Unreal Engine'),
+    ('Q4', 'Robotics')
+])
+
+def _attribute_values(target, name):
+    """Current value of an attribute plus the value it had before this flush"""
+    history = db.inspect(target).attrs[name].history
+    return {getattr(target, name), *history.deleted}
+
+def _attribute_changed(target, name):
+    return db.inspect(target).attrs[name].history.has_changes()
+
+def cache_keys_for_change(target, change):
+    """Cache keys whose contents depend on a row that was inserted, updated or deleted"""
+    keys = set()
+    created_or_deleted = change in ('insert', 'delete')
+    
+    if isinstance(target, Project):
+        keys.add('home:recent')
+        keys.update(f'showcase:{quarter}' for quarter in _attribute_values(target, 'quarter') if quarter)
+        if True in _attribute_values(target, 'is_featured'):
+            keys.add('home:featured')
+        if created_or_deleted or _attribute_changed(target, 'is_public'):
+            keys.add('home:stats')
+        if created_or_deleted or _attribute_changed(target, 'is_public') or _attribute_changed(target, 'quarter'):
+            keys.add('showcase:counts')
+    elif isinstance(target, User):
+        if created_or_deleted or _attribute_changed(target, 'role'):
+            keys.add('home:stats')
+        if change == 'update' and (_attribute_changed(target, 'first_name') or _attribute_changed(target, 'last_name')):
+            # Creator names are shown next to projects
+            keys.update(['home:featured', 'home:recent'])
+            keys.update(f'showcase:{quarter}' for quarter in SHOWCASE_QUARTERS)
+    elif isinstance(target, (STEMClass, LessonPlan)):
+        if created_or_deleted:
+            keys.add('home:stats')
+    elif isinstance(target, Expo):
+        keys.add('home:expo')
+    return keys
+
+def _queue_cache_invalidation(change):
+    def listener(mapper, connection, target):
+        session = db.object_session(target)
+        if session is not None:
+            session.info.setdefault('cache_invalidations', set()).update(cache_keys_for_change(target, change))
+    return listener
+
+for _model in (Project, User, STEMClass, LessonPlan, Expo):
+    for _change in ('insert', 'update', 'delete'):
+        db.event.listen(_model, f'after_{_change}', _queue_cache_invalidation(_change))
+
+@db.event.listens_for(db.session, 'after_commit')
+def invalidate_cache_after_commit(session):
+    # Invalidate only once the change is visible to other requests
+    keys = session.info.pop('cache_invalidations', None)
+    if keys:
+        cache.delete_many(keys)
+
+@db.event.listens_for(db.session, 'after_rollback')
+def discard_cache_invalidations(session):
+    session.info.pop('cache_invalidations', None)
+
+def project_snapshot(project):
+    """Plain-dict copy of a Project with what the public templates render"""
+    return {
+        'id': project.id,
+        'title': project.title,
+        'description': project.description,
+        'project_type': project.project_type,
+        'quarter': project.quarter,
+        'grade_level': project.grade_level,
+        'skills_used': project.skills_used,
+        'learning_goals_met': project.learning_goals_met,
+        'tinkercad_link': project.tinkercad_link,
+        'scratch_link': project.scratch_link,
+        'project_url': project.project_url,
+        'image_path': project.image_path,
+        'created_at': project.created_at,
+        'creator': {
+            'first_name': project.creator.first_name,
+            'last_name': project.creator.last_name
+        }
+    }
+
+def expo_snapshot(expo):
+    return {
+        'id': expo.id,
+        'title': expo.title,
+        'quarter': expo.quarter,
+        'date': expo.date,
+        'description': expo.description,
+        'focus_area': expo.focus_area,
+        'location': expo.location
+    }
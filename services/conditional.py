@@ -0,0 +1,65 @@
+"""ETag and Last-Modified validators for rendered pages."""
+from flask import request, session, Response, make_response
+from flask_login import current_user
+from datetime import datetime, timezone
+from functools import lru_cache
+import hashlib
+
+from app import app, db
+
+@lru_cache(maxsize=None)
+def template_version():
+    """Hash of every template's source, so a deploy that changes the markup changes every ETag"""
+    digest = hashlib.sha1()
+    for name in sorted(app.jinja_env.list_templates()):
+        digest.update(name.encode('utf-8'))
+        digest.update(app.jinja_env.loader.get_source(app.jinja_env, name)[0].encode('utf-8'))
+    return digest.hexdigest()
+
+def version_columns(model, *criteria, totals=()):
+    """Row count, latest updated_at and column totals of a model's rows, as scalar subqueries.
+
+    Together they change whenever a row is added, edited or removed; totals
+    cover counters such as likes_count that are written without touching updated_at.
+    """
+    aggregates = [db.func.count(db.inspect(model).primary_key[0]), db.func.max(model.updated_at),
+                  *(db.func.coalesce(db.func.sum(column), 0) for column in totals)]
+    return [db.select(aggregate).where(*criteria).scalar_subquery() for aggregate in aggregates]
+
+def latest(*values):
+    return max((value for value in values if isinstance(value, datetime)), default=None)
+
+def conditional_page(version, render, last_modified=None):
+    """Return 304 when the client already has this version of a public page, otherwise render() it.
+
+    The ETag covers version, the signed-in user (the navbar differs) and the
+    templates. Anonymous responses may be reused by browsers and shared caches
+    for PUBLIC_PAGE_MAX_AGE seconds; signed-in ones are private and revalidated.
+    Only pass last_modified when every part of version moves it forward.
+    """
+    if session.get('_flashes'):
+        # Flash messages are shown once, so a page carrying one must not be reused
+        return make_response(render())
+    
+    etag = hashlib.sha1(repr((template_version(), current_user.get_id(), version)).encode('utf-8')).hexdigest()
+    if last_modified is not None:
+        last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(etag)
+    else:
+        not_modified = (last_modified is not None and request.if_modified_since is not None
+                        and last_modified <= request.if_modified_since)
+    
+    response = Response(status=304) if not_modified else make_response(render())
+    response.set_etag(etag)
+    if last_modified is not None:
+        # Assigning None would stamp the current time instead of leaving the header out
+        response.last_modified = last_modified
+    if current_user.is_authenticated:
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.public = True
+        response.cache_control.max_age = app.config['PUBLIC_PAGE_MAX_AGE']
+    response.vary.add('Cookie')
+    return response
@@ -0,0 +1,117 @@
+"""Write-behind view and like counters for portfolio items."""
+import atexit
+import threading
+
+from app import app, db, PortfolioItem
+from services.threads import BackgroundThread
+
+class CounterBuffer:
+    """In-process buffer of counter increments that are flushed to the database in batches.
+
+    Increments only touch a dict under a lock, so read-heavy pages never open a
+    write transaction. flush() applies the accumulated deltas as atomic
+    ``column = column + n`` UPDATEs, so increments from several workers add up
+    instead of overwriting each other.
+    """
+
+    def __init__(self, model, columns):
+        self.table = model.__table__
+        self.columns = columns
+        self._deltas = {}
+        self._flushing = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flusher = BackgroundThread(self._run_flusher, 'counter-flusher')
+        self._flush_listeners = []
+
+    def on_flush(self, listener):
+        """Register listener(connection, deltas) to run inside each flush's transaction"""
+        self._flush_listeners.append(listener)
+        return listener
+
+    def increment(self, row_id, column, amount=1):
+        """Record an increment without touching the database"""
+        key = (row_id, column)
+        with self._lock:
+            self._deltas[key] = self._deltas.get(key, 0) + amount
+            pending_keys = len(self._deltas)
+        
+        if pending_keys >= app.config['COUNTER_MAX_PENDING']:
+            self._wakeup.set()
+        self._flusher.ensure()
+
+    def pending(self, row_id, column):
+        """Increments recorded for a row that are not committed yet"""
+        key = (row_id, column)
+        with self._lock:
+            return self._deltas.get(key, 0) + self._flushing.get(key, 0)
+
+    def pending_total(self, row_ids, column):
+        """Sum of uncommitted increments across several rows"""
+        with self._lock:
+            return sum(self._deltas.get((row_id, column), 0) + self._flushing.get((row_id, column), 0)
+                       for row_id in row_ids)
+
+    def pending_row_ids(self):
+        """Ids of rows that have uncommitted increments"""
+        with self._lock:
+            return {row_id for row_id, _ in self._deltas} | {row_id for row_id, _ in self._flushing}
+
+    def flush(self):
+        """Write all pending increments in one transaction; returns the number of rows touched"""
+        with self._flush_lock:
+            with self._lock:
+                self._flushing, self._deltas = self._deltas, {}
+                deltas = self._flushing
+            
+            if not deltas:
+                return 0
+            
+            # Keep columns such as updated_at unchanged, a view is not an edit
+            untouched = {column.name: column for column in self.table.c if column.onupdate is not None}
+            try:
+                with db.engine.begin() as connection:
+                    for column in self.columns:
+                        params = [{'row_id': row_id, 'delta': delta}
+                                  for (row_id, name), delta in deltas.items() if name == column and delta]
+                        if not params:
+                            continue
+                        
+                        statement = self.table.update().where(
+                            self.table.c.id == db.bindparam('row_id')
+                        ).values({
+                            column: db.func.coalesce(self.table.c[column], 0) + db.bindparam('delta'),
+                            **untouched
+                        })
+                        connection.execute(statement, params)
+                    for listener in self._flush_listeners:
+                        listener(connection, deltas)
+            except Exception:
+                # Put the deltas back so the next flush retries them
+                with self._lock:
+                    for key, delta in deltas.items():
+                        self._deltas[key] = self._deltas.get(key, 0) + delta
+                    self._flushing = {}
+                raise
+            
+            with self._lock:
+                self._flushing = {}
+            return len(deltas)
+
+    def _run_flusher(self):
+        while True:
+            self._wakeup.wait(app.config['COUNTER_FLUSH_INTERVAL'])
+            self._wakeup.clear()
+            try:
+                with app.app_context():
+                    self.flush()
+            except Exception as e:
+                app.logger.warning(f'Counter flush failed, will retry: {e}')
+
+portfolio_counters = CounterBuffer(PortfolioItem, ['views_count', 'likes_count'])
+
+@atexit.register
+def flush_counters_on_exit():
+    with app.app_context():
+        portfolio_counters.flush()
@@ -0,0 +1,67 @@
+"""Streaming gradebook export."""
+from flask import request, jsonify, Response, stream_with_context
+from flask_login import login_required
+from werkzeug.utils import secure_filename
+from datetime import datetime
+import json
+
+from app import app, db, LessonPlan, STEMClass, StudentProgress, User, teacher_required
+from services.roster import csv_lines
+
+GRADEBOOK_COLUMNS = ['student_id', 'username', 'first_name', 'last_name', 'student_grade_level',
+                     'class_id', 'class_name', 'lesson_id', 'lesson_title', 'quarter', 'subject_area',
+                     'status', 'completion_percentage', 'time_spent_minutes', 'skill_demonstration',
+                     'teacher_feedback', 'started_at', 'completed_at', 'last_updated']
+
+def gradebook_rows(class_id=None, quarter=None):
+    """Yield gradebook rows from a server-side cursor, ROSTER_CHUNK_SIZE rows at a time"""
+    query = db.select(
+        User.id, User.username, User.first_name, User.last_name, User.grade_level,
+        STEMClass.id, STEMClass.class_name,
+        LessonPlan.id, LessonPlan.title, LessonPlan.quarter, LessonPlan.subject_area,
+        StudentProgress.status, StudentProgress.completion_percentage, StudentProgress.time_spent_minutes,
+        StudentProgress.skill_demonstration, StudentProgress.teacher_feedback,
+        StudentProgress.started_at, StudentProgress.completed_at, StudentProgress.last_updated
+    ).select_from(StudentProgress).join(
+        User, StudentProgress.student_id == User.id
+    ).join(
+        LessonPlan, StudentProgress.lesson_id == LessonPlan.id
+    ).join(
+        STEMClass, StudentProgress.class_id == STEMClass.id
+    ).order_by(STEMClass.class_name, User.last_name, User.first_name, User.id, LessonPlan.id)
+    
+    if class_id:
+        query = query.where(StudentProgress.class_id == class_id)
+    if quarter:
+        query = query.where(LessonPlan.quarter == quarter)
+    
+    result = db.session.execute(query.execution_options(yield_per=app.config['ROSTER_CHUNK_SIZE']))
+    for row in result:
+        yield tuple(value.isoformat() if isinstance(value, datetime) else value for value in row)
+
+def jsonl_lines(columns, rows):
+    """Encode rows as JSON objects, one per line"""
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row))) + '\n'
+
+@app.route('/api/gradebook/export')
+@login_required
+@teacher_required
+def api_export_gradebook():
+    """Stream StudentProgress joined with students, lessons and classes as CSV or JSON lines"""
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'jsonl'):
+        return jsonify({'success': False, 'message': 'format must be csv or jsonl'}), 400
+    
+    class_id = request.args.get('class_id', type=int)
+    quarter = request.args.get('quarter') or None
+    rows = gradebook_rows(class_id=class_id, quarter=quarter)
+    
+    filename = '_'.join(['gradebook'] + ([f'class{class_id}'] if class_id else []) + ([quarter] if quarter else []))
+    if export_format == 'csv':
+        body, mimetype = csv_lines(GRADEBOOK_COLUMNS, rows), 'text/csv'
+    else:
+        body, mimetype = jsonl_lines(GRADEBOOK_COLUMNS, rows), 'application/x-ndjson'
+    
+    return Response(stream_with_context(body), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={secure_filename(filename)}.{export_format}'})
@@ -0,0 +1,162 @@
+"""Lazy-load detection, database connection settings and per-route request metrics."""
+from flask import request, jsonify, g, before_render_template, template_rendered, has_request_context
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from collections import Counter, deque
+import sqlite3
+import threading
+import time
+
+from app import app, db
+
+class LazyLoadDuringRender(AssertionError):
+    """Raised when a template triggers a relationship lazy load with ASSERT_NO_LAZY_LOADS enabled"""
+
+@before_render_template.connect_via(app)
+def mark_rendering(sender, template, context, **extra):
+    g.rendering_template = template.name or '<string template>'
+
+@template_rendered.connect_via(app)
+def unmark_rendering(sender, template, context, **extra):
+    g.pop('rendering_template', None)
+
+@db.event.listens_for(db.session, 'do_orm_execute')
+def assert_no_lazy_load_while_rendering(orm_execute_state):
+    # Views must preload every relationship their template walks; a lazy load
+    # here means one extra query per row
+    if not app.config['ASSERT_NO_LAZY_LOADS'] or not orm_execute_state.is_relationship_load:
+        return
+    if has_request_context() and g.get('rendering_template'):
+        raise LazyLoadDuringRender(
+            f'{g.rendering_template} lazy loaded {orm_execute_state.loader_strategy_path} during rendering'
+        )
+
+# Database connections
+database_events = Counter()
+
+@db.event.listens_for(db.Engine, 'connect')
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    """WAL lets readers run alongside a writer; NORMAL sync is safe under WAL and avoids an fsync per commit"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout = {app.config['SQLITE_BUSY_TIMEOUT_MS']:d}")
+    if app.config['SQLITE_WAL']:
+        cursor.execute('PRAGMA journal_mode = WAL')
+    if app.config['SQLITE_SYNCHRONOUS'].upper() in ('FULL', 'NORMAL', 'OFF'):
+        cursor.execute(f"PRAGMA synchronous = {app.config['SQLITE_SYNCHRONOUS'].upper()}")
+    cursor.close()
+
+def pool_stats():
+    """Connection counts of the engine's pool (QueuePool reports all of them, other pools fewer)"""
+    pool = db.engine.pool
+    stats = {'class': type(pool).__name__, 'timeouts': database_events['pool_timeouts']}
+    for name, method in (('size', 'size'), ('checked_out', 'checkedout'), ('checked_in', 'checkedin'),
+                         ('overflow', 'overflow')):
+        if hasattr(pool, method):
+            stats[name] = getattr(pool, method)()
+    if 'overflow' in stats:
+        # QueuePool counts unopened slots as negative overflow
+        stats['overflow'] = max(stats['overflow'], 0)
+    return stats
+
+@app.errorhandler(PoolTimeoutError)
+def database_pool_exhausted(error):
+    database_events['pool_timeouts'] += 1
+    app.logger.warning(f'Database pool exhausted: {pool_stats()}')
+    return jsonify({'success': False, 'message': 'Server busy, please retry'}), 503, {'Retry-After': '1'}
+
+# Request instrumentation
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+class RouteMetrics:
+    """Rolling window of request timings and the slowest SQL statements for each endpoint"""
+
+    def __init__(self, window, slow_statements=5):
+        self.window = window
+        self.slow_statements = slow_statements
+        self._requests = {}
+        self._slowest = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, duration, db_time, query_count, statements):
+        with self._lock:
+            requests = self._requests.setdefault(endpoint, deque(maxlen=self.window))
+            requests.append((duration, db_time, query_count))
+            slowest = self._slowest.setdefault(endpoint, [])
+            slowest.extend(statements)
+            slowest.sort(key=lambda statement: statement[0], reverse=True)
+            del slowest[self.slow_statements:]
+
+    def summary(self):
+        with self._lock:
+            snapshot = {endpoint: (list(requests), list(self._slowest.get(endpoint, [])))
+                        for endpoint, requests in self._requests.items()}
+        
+        summary = {}
+        for endpoint, (requests, slowest) in sorted(snapshot.items()):
+            durations = sorted(duration for duration, _, _ in requests)
+            db_times = sorted(db_time for _, db_time, _ in requests)
+            query_counts = sorted(query_count for _, _, query_count in requests)
+            summary[endpoint] = {
+                'requests': len(requests),
+                'duration_ms': {name: round(percentile(durations, fraction) * 1000, 2)
+                                for name, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99))},
+                'db_ms': {name: round(percentile(db_times, fraction) * 1000, 2)
+                          for name, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99))},
+                'queries': {'p50': percentile(query_counts, 0.5), 'p95': percentile(query_counts, 0.95),
+                            'max': query_counts[-1] if query_counts else 0},
+                'slowest_statements': [{'ms': round(elapsed * 1000, 2), 'statement': statement}
+                                       for elapsed, statement in slowest]
+            }
+        return summary
+
+route_metrics = RouteMetrics(app.config['METRICS_WINDOW'])
+
+@db.event.listens_for(db.Engine, 'before_cursor_execute')
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_times', []).append(time.perf_counter())
+
+@db.event.listens_for(db.Engine, 'after_cursor_execute')
+def record_query_time(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start_times'].pop()
+    
+    if elapsed * 1000 >= app.config['SLOW_QUERY_MS']:
+        endpoint = request.endpoint if has_request_context() else 'background'
+        app.logger.warning(f'Slow query ({elapsed * 1000:.1f}ms) in {endpoint}: {statement}')
+    
+    if has_request_context() and 'query_stats' in g:
+        stats = g.query_stats
+        stats['count'] += 1
+        stats['time'] += elapsed
+        stats['statements'].append((elapsed, statement[:500]))
+
+@db.event.listens_for(db.Engine, 'handle_error')
+def discard_query_timer(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start time so later timings stay paired
+    connection = exception_context.connection
+    if connection is not None and not connection.invalidated:
+        connection.info.pop('query_start_times', None)
+
+@app.before_request
+def start_request_instrumentation():
+    g.request_start_time = time.perf_counter()
+    g.query_stats = {'count': 0, 'time': 0.0, 'statements': []}
+
+@app.after_request
+def finish_request_instrumentation(response):
+    if 'query_stats' not in g:
+        return response
+    
+    duration = time.perf_counter() - g.request_start_time
+    stats = g.query_stats
+    slowest = sorted(stats['statements'], key=lambda statement: statement[0], reverse=True)[:route_metrics.slow_statements]
+    route_metrics.record(request.endpoint or 'unmatched', duration, stats['time'], stats['count'], slowest)
+    
+    response.headers.add('Server-Timing', f'db;dur={stats["time"] * 1000:.1f};desc="{stats["count"]} queries"')
+    response.headers.add('Server-Timing', f'app;dur={duration * 1000:.1f}')
+    return response
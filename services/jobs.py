@@ -0,0 +1,279 @@
+"""Background jobs stored in the job table."""
+import os
+from flask import request, jsonify, abort, has_request_context
+from flask_login import login_required, current_user
+from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import click
+import json
+import socket
+import threading
+import time
+
+from app import app, db, Job, admin_required, teacher_required
+from services.threads import BackgroundThread
+
+JOB_TASKS = {}
+ADMIN_JOB_TASKS = set()
+JOB_MAINTENANCE_INTERVAL = 60  # seconds between stale-lease and retention sweeps
+
+def job_task(name, admin=False):
+    """Register a function as a job task; admin tasks can also be queued through POST /api/jobs"""
+    def decorator(f):
+        JOB_TASKS[name] = f
+        if admin:
+            ADMIN_JOB_TASKS.add(name)
+        return f
+    return decorator
+
+def enqueue_job(name, payload=None, priority=0, delay=0, max_attempts=None, created_by=None):
+    """Add a job to the current session; workers see it once the caller commits"""
+    if name not in JOB_TASKS:
+        raise ValueError(f'Unknown job task: {name}')
+    job = Job(
+        name=name,
+        payload=json.dumps(payload or {}),
+        priority=priority,
+        run_at=datetime.utcnow() + timedelta(seconds=delay),
+        max_attempts=max_attempts or app.config['JOB_MAX_ATTEMPTS'],
+        created_by=created_by
+    )
+    db.session.add(job)
+    db.session.info['jobs_enqueued'] = True
+    return job
+
+@db.event.listens_for(db.session, 'after_commit')
+def wake_job_worker_after_commit(session):
+    if session.info.pop('jobs_enqueued', False):
+        job_worker.wake()
+
+@db.event.listens_for(db.session, 'after_rollback')
+def discard_enqueued_jobs(session):
+    session.info.pop('jobs_enqueued', None)
+
+def claim_jobs(worker_id, limit):
+    """Mark up to limit due jobs as running for this worker and return their ids, highest priority first"""
+    now = datetime.utcnow()
+    candidates = db.select(Job.id).where(Job.status == 'queued', Job.run_at <= now).order_by(
+        Job.priority.desc(), Job.run_at, Job.id
+    ).limit(limit)
+    if db.engine.dialect.name == 'postgresql':
+        candidates = candidates.with_for_update(skip_locked=True)
+    
+    claimed = []
+    for job_id in db.session.scalars(candidates).all():
+        # The status check keeps two workers that read the same candidates from both claiming one
+        result = db.session.execute(db.update(Job).where(Job.id == job_id, Job.status == 'queued').values(
+            status='running', locked_by=worker_id, locked_at=now, started_at=now, attempts=Job.attempts + 1
+        ))
+        if result.rowcount == 1:
+            claimed.append(job_id)
+    db.session.commit()
+    return claimed
+
+def run_job(job_id):
+    """Run a claimed job and record the outcome; failures are retried with exponential backoff"""
+    with app.app_context():
+        job = db.session.get(Job, job_id)
+        try:
+            task = JOB_TASKS.get(job.name)
+            if task is None:
+                raise LookupError(f'Unknown job task: {job.name}')
+            result = task(**json.loads(job.payload or '{}'))
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(Job, job_id)
+            job.last_error = f'{type(e).__name__}: {e}'
+            if job.attempts < job.max_attempts:
+                job.status = 'queued'
+                job.run_at = datetime.utcnow() + timedelta(
+                    seconds=app.config['JOB_RETRY_DELAY'] * 2 ** (job.attempts - 1))
+            else:
+                job.status = 'failed'
+                job.finished_at = datetime.utcnow()
+            app.logger.warning(f'Job {job.id} ({job.name}) attempt {job.attempts} failed: {e}')
+        else:
+            job.status = 'succeeded'
+            job.result = json.dumps(result, default=str)
+            job.finished_at = datetime.utcnow()
+        job.locked_by = job.locked_at = None
+        db.session.commit()
+
+def requeue_stale_jobs():
+    """Retry jobs whose worker stopped without finishing them and delete old finished jobs"""
+    now = datetime.utcnow()
+    stale = (Job.status == 'running', Job.locked_at < now - timedelta(seconds=app.config['JOB_LEASE_SECONDS']))
+    released = {'locked_by': None, 'locked_at': None, 'last_error': 'Worker lease expired'}
+    db.session.execute(db.update(Job).where(*stale, Job.attempts < Job.max_attempts).values(
+        status='queued', run_at=now, **released))
+    db.session.execute(db.update(Job).where(*stale).values(status='failed', finished_at=now, **released))
+    db.session.execute(db.delete(Job).where(
+        Job.status.in_(['succeeded', 'failed']),
+        Job.finished_at < now - timedelta(days=app.config['JOB_RETENTION_DAYS'])
+    ))
+    db.session.commit()
+
+class JobWorker:
+    """Claims due jobs from the job table and runs them on a thread pool.
+
+    Unless JOB_WORKERS is 0, every web process runs one in a daemon thread (the
+    free Render plan has no separate worker service); `flask run-jobs` runs one
+    as a dedicated process. Claims are atomic, so any number of workers can
+    share the table.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = BackgroundThread(self.run, 'job-dispatcher')
+
+    def wake(self):
+        """Look for due jobs now instead of at the next poll"""
+        self._wakeup.set()
+        if embedded_job_worker_enabled():
+            self.start()
+
+    def start(self):
+        if self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread.ensure()
+
+    def stop(self, timeout=None):
+        """Stop claiming jobs and wait for the running ones to finish"""
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
+
+    def run(self, until_idle=False):
+        """Dispatch jobs until stop() is called, or until no due jobs are left when until_idle is set"""
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        running = set()
+        last_maintenance = 0
+        with ThreadPoolExecutor(max_workers=self.size, thread_name_prefix='job-worker') as pool:
+            while not self._stopping.is_set():
+                self._wakeup.clear()
+                running = {future for future in running if not future.done()}
+                claimed = []
+                try:
+                    with app.app_context():
+                        if time.monotonic() - last_maintenance >= JOB_MAINTENANCE_INTERVAL:
+                            requeue_stale_jobs()
+                            last_maintenance = time.monotonic()
+                        if len(running) < self.size:
+                            claimed = claim_jobs(worker_id, self.size - len(running))
+                except SQLAlchemyError as e:
+                    app.logger.warning(f'Claiming jobs failed, will retry: {e}')
+                
+                for job_id in claimed:
+                    future = pool.submit(run_job, job_id)
+                    future.add_done_callback(self._job_done)
+                    running.add(future)
+                if claimed:
+                    continue
+                if until_idle and not running:
+                    return
+                self._wakeup.wait(app.config['JOB_POLL_INTERVAL'])
+
+    def _job_done(self, future):
+        if future.exception() is not None:
+            app.logger.error(f'Job runner crashed: {future.exception()}')
+        self._wakeup.set()
+
+job_worker = JobWorker(app.config['JOB_WORKERS'])
+
+def embedded_job_worker_enabled():
+    """Whether this process runs jobs itself: only web requests start it, so CLI commands never do"""
+    return app.config['JOB_WORKERS'] > 0 and has_request_context()
+
+@app.before_request
+def start_embedded_job_worker():
+    # Also picks up jobs queued by other processes and retries that come due
+    if embedded_job_worker_enabled():
+        job_worker.start()
+
+def job_snapshot(job):
+    return {
+        'id': job.id,
+        'name': job.name,
+        'status': job.status,
+        'priority': job.priority,
+        'created_by': job.created_by,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'last_error': job.last_error,
+        'result': json.loads(job.result) if job.result else None,
+        'run_at': job.run_at.isoformat(),
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
+
+@app.route('/api/jobs/<int:job_id>')
+@login_required
+@teacher_required
+def api_job_status(job_id):
+    """API endpoint returning the status of a background job the caller queued (any job for admins)"""
+    job = db.get_or_404(Job, job_id)
+    if current_user.role != 'admin' and job.created_by != current_user.id:
+        # Results and errors can describe other users' data, so other people's jobs look missing
+        abort(404)
+    return jsonify({'success': True, 'job': job_snapshot(job)})
+
+@app.route('/api/jobs')
+@admin_required
+def api_jobs():
+    """API endpoint listing recent background jobs and the number of jobs in each status"""
+    query = db.select(Job).order_by(Job.id.desc()).limit(min(max(request.args.get('limit', 50, type=int), 1), 200))
+    if request.args.get('status'):
+        query = query.where(Job.status == request.args['status'])
+    counts = dict(db.session.execute(db.select(Job.status, db.func.count(Job.id)).group_by(Job.status)).all())
+    return jsonify({
+        'success': True,
+        'counts': counts,
+        'jobs': [job_snapshot(job) for job in db.session.scalars(query)]
+    })
+
+@app.route('/api/jobs', methods=['POST'])
+@admin_required
+def api_enqueue_job():
+    """Queue a maintenance job"""
+    data = request.get_json(silent=True) or {}
+    if data.get('name') not in ADMIN_JOB_TASKS:
+        return jsonify({'success': False,
+                        'message': f'name must be one of {", ".join(sorted(ADMIN_JOB_TASKS))}'}), 400
+    try:
+        priority = int(data.get('priority', 0))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'priority must be an integer'}), 400
+    job = enqueue_job(data['name'], priority=priority, created_by=current_user.id)
+    db.session.commit()
+    return jsonify({'success': True, 'job': job_snapshot(job)}), 202
+
+@app.route('/api/jobs/<int:job_id>/retry', methods=['POST'])
+@admin_required
+def api_retry_job(job_id):
+    """Queue a failed job again with a fresh set of attempts"""
+    job = db.get_or_404(Job, job_id)
+    if job.status != 'failed':
+        return jsonify({'success': False, 'message': 'Only failed jobs can be retried'}), 400
+    job.status = 'queued'
+    job.attempts = 0
+    job.run_at = datetime.utcnow()
+    job.finished_at = None
+    db.session.info['jobs_enqueued'] = True
+    db.session.commit()
+    return jsonify({'success': True, 'job': job_snapshot(job)})
+
+@app.cli.command('run-jobs')
+@click.option('--workers', type=int, help='Threads running jobs (default JOB_WORKERS).')
+@click.option('--until-idle', is_flag=True, help='Exit once no due jobs are left.')
+def run_jobs_command(workers, until_idle):
+    """Run the background job worker."""
+    size = workers or app.config['JOB_WORKERS']
+    if size < 1:
+        raise click.UsageError('JOB_WORKERS is 0 here; pass --workers to choose how many threads run jobs')
+    click.echo(f"Running jobs with {size} threads")
+    JobWorker(size).run(until_idle=until_idle)
@@ -0,0 +1,147 @@
+"""Portfolio media uploads and image variants."""
+import os
+from flask import request, jsonify
+from flask_login import login_required, current_user
+from werkzeug.utils import secure_filename
+from PIL import Image, ImageOps
+import hashlib
+import tempfile
+
+from app import app, db, PortfolioItem, teacher_required
+from services.jobs import enqueue_job, job_task
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+def media_file_path(path):
+    """Absolute filesystem path for a media path stored relative to the static folder"""
+    return os.path.join(app.static_folder, path)
+
+@app.template_global()
+def image_variant_path(path, variant):
+    """Path of a generated WebP variant ('thumb' or 'display') of a stored image"""
+    return f'{os.path.splitext(path)[0]}_{variant}.webp'
+
+def store_upload(stream, extension):
+    """Stream an upload into content-addressed storage.
+
+    The file is hashed while it is copied, then moved to
+    uploads/<first two hash characters>/<sha256><extension>. Returns the path
+    relative to the static folder and whether identical content was already
+    stored, in which case the new copy is discarded.
+    """
+    upload_root = os.path.join(app.root_path, app.config['UPLOAD_FOLDER'])
+    os.makedirs(upload_root, exist_ok=True)
+    
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=upload_root, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in iter(lambda: stream.read(UPLOAD_CHUNK_SIZE), b''):
+                digest.update(chunk)
+                f.write(chunk)
+        
+        content_hash = digest.hexdigest()
+        directory = os.path.join(upload_root, content_hash[:2])
+        os.makedirs(directory, exist_ok=True)
+        destination = os.path.join(directory, content_hash + extension)
+        
+        deduplicated = os.path.exists(destination)
+        if deduplicated:
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, destination)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    
+    return os.path.relpath(destination, app.static_folder).replace(os.sep, '/'), deduplicated
+
+@job_task('generate_image_variants')
+def generate_image_variants(item_id, path):
+    """Create downscaled WebP thumbnail and display variants, then record the thumbnail"""
+    variants = {'thumb': app.config['THUMBNAIL_SIZE'], 'display': app.config['DISPLAY_IMAGE_SIZE']}
+    with Image.open(media_file_path(path)) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or 'A' in image.getbands() else 'RGB')
+        
+        for variant, size in variants.items():
+            destination = media_file_path(image_variant_path(path, variant))
+            if os.path.exists(destination):
+                continue
+            resized = image.copy()
+            resized.thumbnail(size, Image.LANCZOS)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(destination), suffix='.part')
+            with os.fdopen(fd, 'wb') as f:
+                resized.save(f, 'WEBP', quality=80, method=4)
+            os.replace(tmp_path, destination)
+    
+    # Only fill in the thumbnail if the item still points at this image
+    updated = PortfolioItem.query.filter_by(id=item_id, image_path=path).update(
+        {'thumbnail_path': image_variant_path(path, 'thumb')}
+    )
+    db.session.commit()
+    return {'thumbnail_path': image_variant_path(path, 'thumb') if updated else None}
+
+@app.route('/api/portfolio/item/<int:item_id>/upload', methods=['POST'])
+@login_required
+@teacher_required
+def upload_portfolio_media(item_id):
+    """Upload an image, video or file for a portfolio item.
+
+    Accepts a multipart form with a ``file`` field, or the raw file as the
+    request body with its name in the ``filename`` query parameter.
+    """
+    item = PortfolioItem.query.get_or_404(item_id)
+    
+    if request.files.get('file'):
+        upload = request.files['file']
+        stream, filename = upload.stream, upload.filename
+    else:
+        stream, filename = request.stream, request.args.get('filename', '')
+    
+    extension = os.path.splitext(secure_filename(filename))[1].lower()
+    if extension in app.config['IMAGE_EXTENSIONS']:
+        kind = 'image'
+    elif extension in app.config['VIDEO_EXTENSIONS']:
+        kind = 'video'
+    elif extension in app.config['FILE_EXTENSIONS']:
+        kind = 'file'
+    else:
+        return jsonify({'success': False, 'message': 'Unsupported file type'}), 400
+    
+    path, deduplicated = store_upload(stream, extension)
+    
+    if kind == 'image':
+        try:
+            with Image.open(media_file_path(path)) as image:
+                image.verify()
+        except (OSError, SyntaxError):
+            if not deduplicated:
+                os.remove(media_file_path(path))
+            return jsonify({'success': False, 'message': 'File is not a valid image'}), 400
+        
+        item.image_path = path
+        thumbnail_path = image_variant_path(path, 'thumb')
+        item.thumbnail_path = thumbnail_path if os.path.exists(media_file_path(thumbnail_path)) else None
+    elif kind == 'video':
+        item.video_path = path
+    else:
+        item.file_path = path
+    
+    thumbnail_pending = kind == 'image' and item.thumbnail_path is None
+    # Queued in the same transaction, so the job never sees an item without the new image
+    job = enqueue_job('generate_image_variants', {'item_id': item.id, 'path': path},
+                      priority=10, created_by=current_user.id) \
+        if thumbnail_pending else None
+    db.session.commit()
+    
+    return jsonify({
+        'success': True,
+        'path': path,
+        'deduplicated': deduplicated,
+        'thumbnail_pending': thumbnail_pending,
+        'job_id': job.id if job else None,
+        'message': 'File uploaded successfully'
+    })
@@ -0,0 +1,42 @@
+"""Keyset (cursor) pagination."""
+from datetime import datetime
+import base64
+
+from app import app, db
+
+def encode_cursor(row):
+    """Opaque cursor pointing just past row in (created_at, id) order"""
+    position = f'{row.created_at.isoformat()}|{row.id}'
+    return base64.urlsafe_b64encode(position.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """Return (created_at, id) from a cursor, or None if it is missing or malformed"""
+    if not cursor:
+        return None
+    try:
+        position = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        created_at, row_id = position.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def keyset_page(query, model, cursor=None, limit=None):
+    """Newest-first page of query ordered by (created_at, id) and the cursor for the next page.
+
+    Seeks past the cursor instead of using OFFSET, so every page costs the
+    same index range scan no matter how deep it is.
+    """
+    limit = limit or app.config['PAGE_SIZE']
+    if limit < 1:
+        raise ValueError(f'Page size must be at least 1, got {limit}')
+    position = decode_cursor(cursor)
+    if position:
+        created_at, row_id = position
+        query = query.filter(db.or_(
+            model.created_at < created_at,
+            db.and_(model.created_at == created_at, model.id < row_id)
+        ))
+    
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
@@ -0,0 +1,52 @@
+"""Password hashing on a bounded thread pool."""
+from werkzeug.security import generate_password_hash, check_password_hash
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import secrets
+
+from app import app
+
+# Passwords
+# Hashing is deliberately CPU-heavy; a small pool keeps a burst of sign-ins from taking every core
+# (hashlib releases the GIL), and everything else keeps being served while they queue
+password_hashing = ThreadPoolExecutor(max_workers=app.config['PASSWORD_HASH_WORKERS'], thread_name_prefix='password-hash')
+
+@lru_cache(maxsize=None)
+def password_hash_prefix(method):
+    """The method string werkzeug stores for method, with its default parameters filled in"""
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+@lru_cache(maxsize=None)
+def unusable_password_hash(method):
+    """Hash of a random password, checked for unknown usernames so they take as long as known ones"""
+    return generate_password_hash(secrets.token_urlsafe(32), method=method)
+
+def hash_password(password):
+    return generate_password_hash(password, method=app.config['PASSWORD_HASH_METHOD'])
+
+def password_needs_rehash(password_hash):
+    return password_hash.split('$', 1)[0] != password_hash_prefix(app.config['PASSWORD_HASH_METHOD'])
+
+def verify_password(user, password):
+    """Check password against user's hash (or a dummy one for no user) on the hashing pool.
+
+    A correct password stored with other hash parameters is rehashed with
+    PASSWORD_HASH_METHOD; the caller commits it. Raises FutureTimeoutError when
+    no hashing thread frees up within PASSWORD_HASH_TIMEOUT.
+    """
+    stored = user.password_hash if user else unusable_password_hash(app.config['PASSWORD_HASH_METHOD'])
+    future = password_hashing.submit(check_password_hash, stored, password)
+    try:
+        valid = future.result(timeout=app.config['PASSWORD_HASH_TIMEOUT'])
+    except FutureTimeoutError:
+        future.cancel()
+        raise
+    if not (valid and user):
+        return False
+    if password_needs_rehash(user.password_hash):
+        try:
+            user.password_hash = password_hashing.submit(hash_password, password).result(
+                timeout=app.config['PASSWORD_HASH_TIMEOUT'])
+        except FutureTimeoutError:
+            pass  # Upgraded at a later sign-in instead
+    return True
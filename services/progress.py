@@ -0,0 +1,416 @@
+"""Student progress roster queries, progress saves and the precomputed stats tables."""
+from datetime import datetime
+from collections import OrderedDict
+import click
+
+from app import (app, db, ClassStats, LessonPlan, STEMClass, StudentProgress, StudentStats, UPSERT_INSERTS,
+                 User, has_unique_key)
+from services.jobs import job_task
+
+PROGRESS_SORT_KEYS = ('name', 'grade', 'completed', 'total', 'avg_completion', 'recent_activity')
+
+def student_progress_query(class_id=None, grade_level=None, sort='name', direction='asc'):
+    """Build one query returning (student, completed, total, avg, last activity) rows.
+
+    Without a class filter the stats come from the precomputed StudentStats
+    rows and students without any progress are kept with zeroed stats. With a
+    class filter only that class's progress rows are aggregated, and only
+    students with progress in the class are returned.
+    """
+    if class_id:
+        completed = count_where(StudentProgress.status == 'completed')
+        total = db.func.count(StudentProgress.id)
+        avg_completion = db.func.coalesce(db.func.avg(StudentProgress.completion_percentage), 0)
+        recent_activity = db.func.max(StudentProgress.last_updated)
+    else:
+        completed = db.func.coalesce(StudentStats.completed_lessons, 0)
+        total = db.func.coalesce(StudentStats.total_lessons, 0)
+        avg_completion = db.func.coalesce(
+            db.cast(StudentStats.completion_sum, db.Float) / db.func.nullif(StudentStats.completion_count, 0), 0
+        )
+        recent_activity = StudentStats.last_activity
+
+    query = db.session.query(
+        User,
+        completed.label('completed_lessons'),
+        total.label('total_lessons'),
+        avg_completion.label('avg_completion'),
+        recent_activity.label('recent_activity')
+    ).filter(User.role == 'student')
+
+    if class_id:
+        query = query.join(StudentProgress, db.and_(StudentProgress.student_id == User.id,
+                                                    StudentProgress.class_id == class_id)).group_by(User.id)
+    else:
+        query = query.outerjoin(StudentStats, StudentStats.student_id == User.id)
+
+    if grade_level:
+        query = query.filter(User.grade_level == grade_level)
+
+    sort_columns = {
+        'name': (User.first_name, User.last_name),
+        'grade': (User.grade_level,),
+        'completed': (completed,),
+        'total': (total,),
+        'avg_completion': (avg_completion,),
+        'recent_activity': (recent_activity,),
+    }
+    columns = sort_columns.get(sort, sort_columns['name'])
+    if direction == 'desc':
+        columns = tuple(column.desc() for column in columns)
+
+    return query.order_by(*columns, User.id)
+
+def student_progress_row(row):
+    """Convert a row from student_progress_query into the dict the templates expect"""
+    student, completed, total, avg_completion, recent_activity = row
+    return {
+        'student': student,
+        'completed_lessons': int(completed or 0),
+        'total_lessons': int(total or 0),
+        'avg_completion': round(float(avg_completion or 0), 1),
+        'recent_activity': recent_activity
+    }
+
+def student_progress_totals(query):
+    """Roster-wide totals for a student_progress_query, computed in a single query"""
+    roster = query.order_by(None).subquery()
+    total_students, completed_lessons, avg_completion, active_students, need_support = db.session.query(
+        db.func.count(),
+        db.func.coalesce(db.func.sum(roster.c.completed_lessons), 0),
+        db.func.coalesce(db.func.avg(roster.c.avg_completion), 0),
+        db.func.count(roster.c.recent_activity),
+        db.func.coalesce(db.func.sum(db.case((roster.c.avg_completion < 60, 1), else_=0)), 0)
+    ).one()
+
+    return {
+        'total_students': total_students,
+        'completed_lessons': int(completed_lessons),
+        'avg_completion': round(float(avg_completion), 1),
+        'active_students': active_students,
+        'need_support': int(need_support)
+    }
+
+PROGRESS_STATUSES = ('not_started', 'in_progress', 'completed', 'needs_help')
+
+def class_performance_rollup(class_id=None):
+    """Per-class student count, average completion and status distribution from ClassStats.
+
+    Classes without any progress rows are included with zeroed stats.
+    """
+    query = db.session.query(STEMClass, ClassStats).outerjoin(ClassStats, ClassStats.class_id == STEMClass.id)
+
+    if class_id:
+        query = query.filter(STEMClass.id == class_id)
+
+    rollup = []
+    for cls, stats in query.order_by(STEMClass.id):
+        status_distribution = {status: getattr(stats, status) if stats else 0 for status in PROGRESS_STATUSES}
+        rollup.append({
+            'class': cls,
+            'student_count': stats.student_count if stats else 0,
+            'avg_completion': stats.avg_completion if stats else 0,
+            'status_distribution': status_distribution,
+            'needs_help': status_distribution['needs_help']
+        })
+    return rollup
+
+# Progress statistics
+STUDENT_STATS_COLUMNS = ('student_id', 'total_lessons', 'completed_lessons', 'needs_help',
+                         'completion_sum', 'completion_count', 'last_activity')
+CLASS_STATS_COLUMNS = ('class_id', 'student_count', 'progress_count') + PROGRESS_STATUSES + (
+    'completion_sum', 'completion_count')
+
+def count_where(condition):
+    return db.func.coalesce(db.func.sum(db.case((condition, 1), else_=0)), 0)
+
+def student_stats_aggregates():
+    """SELECT of STUDENT_STATS_COLUMNS computed from the raw StudentProgress rows"""
+    return db.select(
+        StudentProgress.student_id,
+        db.func.count(StudentProgress.id),
+        count_where(StudentProgress.status == 'completed'),
+        count_where(StudentProgress.status == 'needs_help'),
+        db.func.coalesce(db.func.sum(StudentProgress.completion_percentage), 0),
+        db.func.count(StudentProgress.completion_percentage),
+        db.func.max(StudentProgress.last_updated)
+    ).group_by(StudentProgress.student_id)
+
+def class_stats_aggregates():
+    """SELECT of CLASS_STATS_COLUMNS computed from the raw StudentProgress rows"""
+    return db.select(
+        StudentProgress.class_id,
+        db.func.count(db.distinct(StudentProgress.student_id)),
+        db.func.count(StudentProgress.id),
+        *[count_where(StudentProgress.status == status) for status in PROGRESS_STATUSES],
+        db.func.coalesce(db.func.sum(StudentProgress.completion_percentage), 0),
+        db.func.count(StudentProgress.completion_percentage)
+    ).group_by(StudentProgress.class_id)
+
+PROGRESS_STATS_TABLES = (
+    (StudentStats, STUDENT_STATS_COLUMNS, student_stats_aggregates, StudentProgress.student_id),
+    (ClassStats, CLASS_STATS_COLUMNS, class_stats_aggregates, StudentProgress.class_id),
+)
+
+def refresh_progress_stats(student_ids=None, class_ids=None):
+    """Recompute StudentStats and ClassStats rows from StudentProgress in the current transaction.
+    
+    Pass sets of ids to refresh only those rows, or None to rebuild the whole
+    table. Rows are deleted and re-inserted with INSERT ... SELECT, so a key
+    whose progress rows are all gone simply disappears.
+    """
+    insert = UPSERT_INSERTS.get(db.engine.dialect.name)
+    now = datetime.utcnow()
+    
+    for (model, columns, aggregates, source_key), ids in zip(PROGRESS_STATS_TABLES, (student_ids, class_ids)):
+        if ids is not None and not ids:
+            continue
+        
+        table = model.__table__
+        delete = db.delete(table)
+        select = aggregates().add_columns(db.literal(now, db.DateTime))
+        if ids is not None:
+            delete = delete.where(table.c[columns[0]].in_(ids))
+            select = select.where(source_key.in_(ids))
+        else:
+            # SQLite only parses ON CONFLICT after INSERT ... SELECT when the SELECT has a WHERE
+            select = select.where(db.true())
+        
+        target = columns + ('refreshed_at',)
+        if insert is None:
+            statement = db.insert(table).from_select(target, select)
+        else:
+            # Upsert so two transactions refreshing the same student cannot collide
+            statement = insert(table).from_select(target, select)
+            statement = statement.on_conflict_do_update(
+                index_elements=[columns[0]],
+                set_={column: statement.excluded[column] for column in target[1:]}
+            )
+        
+        db.session.execute(delete)
+        db.session.execute(statement)
+
+def mark_progress_stats_stale(student_ids=(), class_ids=(), session=None):
+    """Queue stats rows to be refreshed when the session commits"""
+    stale = (session or db.session).info.setdefault('stale_progress_stats', (set(), set()))
+    stale[0].update(student_ids)
+    stale[1].update(class_ids)
+
+def _queue_progress_stats(mapper, connection, target):
+    session = db.object_session(target)
+    if session is None:
+        return
+    # Both the old and new owner/class need refreshing when a row moves
+    state = db.inspect(target)
+    student_ids = {target.student_id, *state.attrs.student_id.history.deleted}
+    class_ids = {target.class_id, *state.attrs.class_id.history.deleted}
+    mark_progress_stats_stale(student_ids - {None}, class_ids - {None}, session=session)
+
+for _change in ('insert', 'update', 'delete'):
+    db.event.listen(StudentProgress, f'after_{_change}', _queue_progress_stats)
+
+@db.event.listens_for(db.session, 'before_commit')
+def refresh_stale_progress_stats(session):
+    # Flush first so changes still pending in the session are queued too
+    session.flush()
+    stale = session.info.pop('stale_progress_stats', None)
+    if stale and (stale[0] or stale[1]):
+        refresh_progress_stats(*stale)
+        session.info['progress_changed'] = True  # wakes the live progress feed after the commit
+
+@db.event.listens_for(db.session, 'after_rollback')
+def discard_stale_progress_stats(session):
+    session.info.pop('stale_progress_stats', None)
+
+def verify_progress_stats():
+    """Compare the stats tables with fresh aggregates; returns a list of mismatch descriptions"""
+    mismatches = []
+    for model, columns, aggregates, _ in PROGRESS_STATS_TABLES:
+        stored = {row[0]: tuple(row) for row in db.session.execute(
+            db.select(*[model.__table__.c[column] for column in columns]))}
+        for row in db.session.execute(aggregates()):
+            expected = tuple(row)
+            actual = stored.pop(expected[0], None)
+            if actual != expected:
+                mismatches.append(f'{model.__tablename__} {columns[0]}={expected[0]}: expected {expected}, found {actual}')
+        mismatches.extend(f'{model.__tablename__} {columns[0]}={key}: stale row {row}' for key, row in stored.items())
+    return mismatches
+
+@job_task('rebuild_progress_stats', admin=True)
+def rebuild_progress_stats_job():
+    refresh_progress_stats()
+    db.session.commit()
+    return {'students': StudentStats.query.count(), 'classes': ClassStats.query.count()}
+
+@job_task('verify_progress_stats', admin=True)
+def verify_progress_stats_job():
+    """Rebuild the stats tables if they have drifted from StudentProgress"""
+    mismatches = verify_progress_stats()
+    if mismatches:
+        refresh_progress_stats()
+        db.session.commit()
+    return {'mismatches': len(mismatches)}
+
+@app.cli.command('rebuild-progress-stats')
+def rebuild_progress_stats_command():
+    """Rebuild the student and class stats tables from StudentProgress."""
+    refresh_progress_stats()
+    db.session.commit()
+    click.echo(f"✅ Rebuilt stats for {StudentStats.query.count()} students and {ClassStats.query.count()} classes")
+
+@app.cli.command('verify-progress-stats')
+@click.option('--fix', is_flag=True, help='Rebuild the tables if they have drifted.')
+def verify_progress_stats_command(fix):
+    """Check the stats tables against StudentProgress (suitable for a periodic job)."""
+    mismatches = verify_progress_stats()
+    for mismatch in mismatches[:20]:
+        click.echo(f"⚠️ {mismatch}")
+    if not mismatches:
+        click.echo("✅ Progress stats match StudentProgress")
+    elif fix:
+        refresh_progress_stats()
+        db.session.commit()
+        click.echo(f"🔧 Rebuilt stats after {len(mismatches)} mismatches")
+    else:
+        raise SystemExit(1)
+
+# Progress updates
+def save_progress(data, commit=True):
+    """Create or update the StudentProgress row for a student/lesson pair"""
+    progress = StudentProgress.query.filter_by(
+        student_id=data['student_id'],
+        lesson_id=data['lesson_id']
+    ).first()
+    
+    if not progress:
+        progress = StudentProgress(
+            student_id=data['student_id'],
+            lesson_id=data['lesson_id'],
+            class_id=data['class_id']
+        )
+        db.session.add(progress)
+    
+    # Update fields
+    progress.status = data.get('status', progress.status)
+    progress.completion_percentage = data.get('completion_percentage', progress.completion_percentage)
+    progress.skill_demonstration = data.get('skill_demonstration', progress.skill_demonstration)
+    progress.notes = data.get('notes', progress.notes)
+    progress.teacher_feedback = data.get('teacher_feedback', progress.teacher_feedback)
+    progress.shared_publicly = data.get('shared_publicly', progress.shared_publicly)
+    
+    if data.get('status') == 'completed' and not progress.completed_at:
+        progress.completed_at = datetime.utcnow()
+    elif data.get('status') == 'in_progress' and not progress.started_at:
+        progress.started_at = datetime.utcnow()
+    
+    if commit:
+        db.session.commit()
+    return progress
+
+PROGRESS_UPDATE_FIELDS = ('status', 'completion_percentage', 'skill_demonstration',
+                          'notes', 'teacher_feedback', 'shared_publicly')
+
+def progress_update_error(data):
+    """Validation message for one bulk progress update, or None if it is usable"""
+    if not isinstance(data, dict):
+        return 'Each update must be an object'
+    for field in ('student_id', 'lesson_id', 'class_id'):
+        value = data.get(field)
+        if (field != 'class_id' or value is not None) and (not isinstance(value, int) or isinstance(value, bool)):
+            return f'{field} must be an integer'
+    if 'status' in data and data['status'] not in PROGRESS_STATUSES:
+        return f'status must be one of {", ".join(PROGRESS_STATUSES)}'
+    if 'completion_percentage' in data:
+        percentage = data['completion_percentage']
+        if not isinstance(percentage, int) or isinstance(percentage, bool) or not 0 <= percentage <= 100:
+            return 'completion_percentage must be an integer from 0 to 100'
+    return None
+
+def bulk_save_progress(updates):
+    """Upsert a batch of progress updates in one transaction and return a result per update
+    
+    Updates for the same student/lesson pair are merged in order, rows that share
+    the same set of fields go out as one executemany upsert, and started_at /
+    completed_at are only filled in where the stored value is still empty.
+    """
+    results = [None] * len(updates)
+    merged = OrderedDict()
+    
+    for index, data in enumerate(updates):
+        error = progress_update_error(data)
+        if error:
+            results[index] = {'index': index, 'result': 'error', 'message': error}
+            continue
+        indexes, values = merged.setdefault((data['student_id'], data['lesson_id']), ([], {}))
+        indexes.append(index)
+        values.update({field: data[field] for field in ('class_id',) + PROGRESS_UPDATE_FIELDS
+                       if data.get(field) is not None})
+    
+    def reject(pair, message):
+        for index in merged.pop(pair)[0]:
+            results[index] = {'index': index, 'student_id': pair[0], 'lesson_id': pair[1],
+                              'result': 'error', 'message': message}
+    
+    student_ids, lesson_ids, existing = set(), set(), {}
+    if merged:
+        student_ids = {row.id for row in db.session.query(User.id).filter(User.id.in_({pair[0] for pair in merged}))}
+        lesson_ids = {row.id for row in db.session.query(LessonPlan.id).filter(LessonPlan.id.in_({pair[1] for pair in merged}))}
+        existing = dict(
+            ((row.student_id, row.lesson_id), row.class_id)
+            for row in db.session.query(StudentProgress.student_id, StudentProgress.lesson_id, StudentProgress.class_id)
+            .filter(db.tuple_(StudentProgress.student_id, StudentProgress.lesson_id).in_(list(merged)))
+        )
+    
+    for pair in list(merged):
+        if pair[0] not in student_ids:
+            reject(pair, 'Unknown student')
+        elif pair[1] not in lesson_ids:
+            reject(pair, 'Unknown lesson')
+        elif pair not in existing and 'class_id' not in merged[pair][1]:
+            reject(pair, 'class_id is required for new progress rows')
+    
+    insert = UPSERT_INSERTS.get(db.engine.dialect.name)
+    if insert is not None and not has_unique_key('student_progress', ('student_id', 'lesson_id')):
+        insert = None
+    now = datetime.utcnow()
+    groups = {}
+    
+    for (student_id, lesson_id), (indexes, values) in merged.items():
+        if insert is None:
+            save_progress({'student_id': student_id, 'lesson_id': lesson_id, **values}, commit=False)
+            continue
+        
+        fields = tuple(sorted(field for field in values if field != 'class_id'))
+        groups.setdefault(fields, []).append({
+            **values,
+            'student_id': student_id,
+            'lesson_id': lesson_id,
+            'class_id': values.get('class_id', existing.get((student_id, lesson_id))),
+            'started_at': now if values.get('status') == 'in_progress' else None,
+            'completed_at': now if values.get('status') == 'completed' else None,
+            'last_updated': now
+        })
+    
+    table = StudentProgress.__table__
+    for fields, rows in groups.items():
+        statement = insert(table)
+        assignments = {field: statement.excluded[field] for field in fields}
+        assignments['last_updated'] = statement.excluded.last_updated
+        if 'status' in fields:
+            assignments['started_at'] = db.func.coalesce(table.c.started_at, statement.excluded.started_at)
+            assignments['completed_at'] = db.func.coalesce(table.c.completed_at, statement.excluded.completed_at)
+        db.session.execute(
+            statement.on_conflict_do_update(index_elements=['student_id', 'lesson_id'], set_=assignments),
+            rows
+        )
+    
+    # Core upserts bypass the ORM events that normally queue the stats refresh
+    class_ids = {values.get('class_id') for _, values in merged.values()} | set(existing.values())
+    mark_progress_stats_stale({pair[0] for pair in merged}, class_ids - {None})
+    db.session.commit()
+    
+    for pair, (indexes, _) in merged.items():
+        for index in indexes:
+            results[index] = {'index': index, 'student_id': pair[0], 'lesson_id': pair[1],
+                              'result': 'updated' if pair in existing else 'created'}
+    return results
@@ -0,0 +1,234 @@
+"""Live student progress over Server-Sent Events."""
+from flask import request, Response
+from flask_login import login_required
+from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime, timedelta
+import json
+import queue
+import threading
+import time
+
+from app import app, db, LessonPlan, STEMClass, StudentProgress, User, teacher_required
+from services.threads import BackgroundThread
+
+PROGRESS_STREAM_RETRY_MS = 3000  # how long browsers wait before reconnecting
+PROGRESS_STREAM_BUSY_RETRY_MS = 30000  # how long browsers turned away at PROGRESS_STREAM_MAX_CLIENTS wait
+
+def progress_changes(after, class_id=None, limit=None):
+    """Progress rows (with student and lesson names) changed after a (last_updated, id) cursor, oldest first.
+
+    With a limit only the most recent rows are returned.
+    """
+    last_updated, progress_id = after
+    query = db.select(
+        StudentProgress.id, StudentProgress.class_id, StudentProgress.student_id, StudentProgress.lesson_id,
+        StudentProgress.status, StudentProgress.completion_percentage, StudentProgress.last_updated,
+        User.first_name, User.last_name, LessonPlan.title
+    ).join(User, User.id == StudentProgress.student_id).join(
+        LessonPlan, LessonPlan.id == StudentProgress.lesson_id
+    ).where(db.or_(
+        StudentProgress.last_updated > last_updated,
+        db.and_(StudentProgress.last_updated == last_updated, StudentProgress.id > progress_id)
+    ))
+    if class_id is not None:
+        query = query.where(StudentProgress.class_id == class_id)
+    if limit is None:
+        return db.session.execute(query.order_by(StudentProgress.last_updated, StudentProgress.id)).all()
+    rows = db.session.execute(query.order_by(StudentProgress.last_updated.desc(),
+                                             StudentProgress.id.desc()).limit(limit)).all()
+    return rows[::-1]
+
+def progress_event_id(last_updated, progress_id):
+    """SSE event id; ids sort like the feed, so a reconnecting client can resume after one"""
+    return f'{last_updated.isoformat()}/{progress_id}'
+
+def parse_progress_event_id(value):
+    """The (last_updated, id) cursor in a progress event id, or None if value is not one"""
+    try:
+        last_updated, progress_id = (value or '').rsplit('/', 1)
+        return datetime.fromisoformat(last_updated), int(progress_id)
+    except ValueError:
+        return None
+
+def progress_event(row):
+    return {
+        'id': progress_event_id(row.last_updated, row.id),
+        'progress_id': row.id,
+        'class_id': row.class_id,
+        'student_id': row.student_id,
+        'student_name': f'{row.first_name} {row.last_name}',
+        'lesson_id': row.lesson_id,
+        'lesson_title': row.title,
+        'status': row.status,
+        'completion_percentage': row.completion_percentage,
+        'last_updated': row.last_updated.isoformat()
+    }
+
+class ProgressSubscriber:
+    """One connected stream: a bounded queue of events for a class, or for all classes"""
+
+    def __init__(self, class_id, size):
+        self.class_id = class_id
+        self.queue = queue.Queue(maxsize=size)
+        self.dropped = False
+
+class ProgressFeed:
+    """Fans StudentProgress changes out to the event streams connected to this process.
+
+    A single thread per worker process reads changed rows by last_updated and
+    copies each event to every subscriber watching its class, so connected
+    teachers add no queries of their own. Commits made in this process wake
+    it at once; changes from other processes are seen within
+    PROGRESS_FEED_POLL_INTERVAL seconds. Rows are re-read for
+    PROGRESS_FEED_LOOKBACK seconds so a transaction that commits after a
+    later timestamped one is not skipped. While nobody is subscribed it
+    does not query at all.
+    """
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = BackgroundThread(self.run, 'progress-feed')
+
+    def subscribe(self, class_id=None):
+        """Add a subscriber, or return None when PROGRESS_STREAM_MAX_CLIENTS are already connected"""
+        subscriber = ProgressSubscriber(class_id, app.config['PROGRESS_FEED_QUEUE_SIZE'])
+        with self._lock:
+            if len(self._subscribers) >= app.config['PROGRESS_STREAM_MAX_CLIENTS']:
+                return None
+            self._subscribers.add(subscriber)
+        self._thread.ensure()
+        self._wakeup.set()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def wake(self):
+        """Read changes now instead of at the next poll"""
+        self._wakeup.set()
+
+    def publish(self, events):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            for event in events:
+                if subscriber.class_id not in (None, event['class_id']):
+                    continue
+                try:
+                    subscriber.queue.put_nowait(event)
+                except queue.Full:
+                    # A client this far behind is disconnected; it reconnects and replays from the database
+                    subscriber.dropped = True
+                    self.unsubscribe(subscriber)
+                    break
+
+    def run(self):
+        cursor, seen = datetime.utcnow(), {}
+        while True:
+            self._wakeup.clear()
+            with self._lock:
+                listening = bool(self._subscribers)
+            if not listening:
+                self._wakeup.wait()
+                cursor, seen = datetime.utcnow(), {}
+                continue
+            
+            floor = cursor - timedelta(seconds=app.config['PROGRESS_FEED_LOOKBACK'])
+            try:
+                with app.app_context():
+                    rows = [row for row in progress_changes((floor, 0)) if seen.get(row.id) != row.last_updated]
+                    events = [progress_event(row) for row in rows]
+            except SQLAlchemyError as e:
+                app.logger.warning(f'Reading progress changes failed, will retry: {e}')
+                rows = events = []
+            
+            for row in rows:
+                seen[row.id] = row.last_updated
+                cursor = max(cursor, row.last_updated)
+            seen = {progress_id: last_updated for progress_id, last_updated in seen.items() if last_updated >= floor}
+            if events:
+                self.publish(events)
+            self._wakeup.wait(app.config['PROGRESS_FEED_POLL_INTERVAL'])
+
+progress_feed = ProgressFeed()
+
+@db.event.listens_for(db.session, 'after_commit')
+def wake_progress_feed_after_commit(session):
+    if session.info.pop('progress_changed', False):
+        progress_feed.wake()
+
+@db.event.listens_for(db.session, 'after_rollback')
+def discard_progress_changed(session):
+    session.info.pop('progress_changed', None)
+
+def sse_messages(event):
+    """Server-Sent Events messages for a progress event, plus a needs_help alert when it applies"""
+    data = json.dumps(event)
+    yield f"id: {event['id']}\nevent: progress\ndata: {data}\n\n"
+    if event['status'] == 'needs_help':
+        yield f"id: {event['id']}\nevent: needs_help\ndata: {data}\n\n"
+
+def progress_stream(class_id, replay):
+    """Subscribe to the feed and yield its events as SSE until dropped or PROGRESS_STREAM_SECONDS pass.
+
+    Every open stream holds a request thread, so past PROGRESS_STREAM_MAX_CLIENTS
+    the browser is told to reconnect later and the stream ends at once.
+    Subscribing only once streaming starts means a stream that never starts
+    cannot keep a slot.
+    """
+    subscriber = progress_feed.subscribe(class_id)
+    if subscriber is None:
+        yield f'retry: {PROGRESS_STREAM_BUSY_RETRY_MS}\n\n'
+        return
+    deadline = time.monotonic() + app.config['PROGRESS_STREAM_SECONDS']
+    sent = {}  # progress id -> last_updated already sent; the feed's lookback can repeat the replay
+
+    def unsent(event):
+        if sent.get(event['progress_id'], '') >= event['last_updated']:
+            return False
+        sent[event['progress_id']] = event['last_updated']
+        return True
+
+    try:
+        yield f'retry: {PROGRESS_STREAM_RETRY_MS}\n\n'
+        for event in filter(unsent, replay):
+            yield from sse_messages(event)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (subscriber.dropped and subscriber.queue.empty()):
+                return
+            try:
+                event = subscriber.queue.get(timeout=min(app.config['PROGRESS_STREAM_HEARTBEAT'], remaining))
+            except queue.Empty:
+                # Keeps proxies from closing an idle connection
+                yield ': keep-alive\n\n'
+                continue
+            if unsent(event):
+                yield from sse_messages(event)
+    finally:
+        progress_feed.unsubscribe(subscriber)
+
+@app.route('/api/progress/stream')
+@app.route('/api/classes/<int:class_id>/progress/stream')
+@login_required
+@teacher_required
+def api_progress_stream(class_id=None):
+    """Server-Sent Events stream of progress changes and needs_help alerts for one class or all classes"""
+    if class_id is not None:
+        db.get_or_404(STEMClass, class_id)
+    
+    # Browsers send Last-Event-ID when reconnecting; `since` lets a page resume from what it rendered
+    since = parse_progress_event_id(request.headers.get('Last-Event-ID') or request.args.get('since'))
+    replay = []
+    if since:
+        replay = [progress_event(row) for row in progress_changes(
+            since, class_id, limit=app.config['PROGRESS_STREAM_REPLAY_LIMIT'])]
+    
+    # The generator needs no request context, so the session and its connection are released before streaming
+    response = Response(progress_stream(class_id, replay), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,151 @@
+"""Token-bucket rate limits for routes."""
+from flask import render_template, request, jsonify, flash, session, make_response
+from flask_login import current_user
+from sqlalchemy.exc import IntegrityError
+from functools import lru_cache, wraps
+from collections import Counter, OrderedDict
+import click
+import math
+import secrets
+import threading
+import time
+
+from app import app, db, RateLimitBucket, UPSERT_INSERTS
+from services.jobs import job_task
+
+@lru_cache(maxsize=None)
+def parse_rate(limit):
+    """Parse a "requests/seconds" limit into a bucket capacity and a refill rate in tokens per second"""
+    capacity, seconds = limit.split('/')
+    return int(capacity), int(capacity) / float(seconds)
+
+class MemoryRateLimiter:
+    """Token buckets in this worker's memory; each worker enforces the limit on its own.
+
+    The least recently used buckets are dropped past max_keys, which only ever
+    lets a forgotten client start again with a full bucket.
+    """
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        """Take a token from the bucket; returns 0 if one was available, else seconds until one is"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens < 1:
+                return (1 - tokens) / rate
+            self._buckets[key] = (tokens - 1, now, now + (capacity - tokens + 1) / rate)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return 0
+
+    def prune(self):
+        now = time.monotonic()
+        with self._lock:
+            full = [key for key, (_, _, full_at) in self._buckets.items() if full_at <= now]
+            for key in full:
+                del self._buckets[key]
+        return len(full)
+
+class DatabaseRateLimiter:
+    """Token buckets in the rate_limit_bucket table, enforced across every worker and host.
+
+    A take is one conditional UPDATE that refills and decrements the bucket in
+    SQL, so concurrent requests cannot both spend the last token; the row is
+    only inserted on a client's first request.
+    """
+
+    def take(self, key, capacity, rate):
+        now = time.time()
+        table = RateLimitBucket.__table__
+        refilled = table.c.tokens + (now - table.c.updated_at) * rate
+        available = db.case((refilled > capacity, capacity), else_=refilled)
+        values = {'key': key, 'tokens': capacity - 1, 'updated_at': now, 'full_at': now + 1 / rate}
+        with db.engine.begin() as connection:
+            taken = connection.execute(db.update(table).where(table.c.key == key, available >= 1).values(
+                tokens=available - 1, updated_at=now, full_at=now + (capacity - available + 1) / rate)).rowcount
+            if taken:
+                return 0
+            insert = UPSERT_INSERTS.get(connection.dialect.name)
+            if insert is not None and connection.execute(
+                    insert(table).values(values).on_conflict_do_nothing(index_elements=['key'])).rowcount:
+                return 0
+            tokens = connection.scalar(db.select(available).where(table.c.key == key))
+        if tokens is not None:
+            return (1 - tokens) / rate
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(db.insert(table), values)
+        except IntegrityError:  # A concurrent first request created the bucket
+            return 1 / rate
+        return 0
+
+    def prune(self):
+        with db.engine.begin() as connection:
+            return connection.execute(db.delete(RateLimitBucket.__table__).where(
+                RateLimitBucket.full_at <= time.time())).rowcount
+
+def create_rate_limiter(config):
+    if config['RATE_LIMIT_STORAGE'] == 'database':
+        return DatabaseRateLimiter()
+    return MemoryRateLimiter(config['RATE_LIMIT_MAX_KEYS'])
+
+rate_limiter = create_rate_limiter(app.config)
+rate_limit_rejections = Counter()  # 429s per limit since this worker started, shown in /admin/metrics
+
+def client_address():
+    return request.remote_addr or 'unknown'
+
+def visitor_key():
+    """The signed-in user, or a random id kept in an anonymous visitor's session"""
+    if current_user.is_authenticated:
+        return f'user:{current_user.id}'
+    return session.setdefault('visitor_id', secrets.token_urlsafe(16))
+
+def take_rate_limit(name, bucket):
+    """Take a token from the RATE_LIMITS[name] bucket; 0 if allowed (or limits are off), else seconds to wait"""
+    if not app.config['RATE_LIMIT_ENABLED']:
+        return 0
+    capacity, rate = parse_rate(app.config['RATE_LIMITS'][name])
+    return rate_limiter.take(f'{name}:{bucket}', capacity, rate)
+
+def rate_limit(name, key, methods=None, message='Too many requests. Please try again later.', template=None):
+    """Answer 429 before the view runs once the RATE_LIMITS[name] bucket for key(**view_args) is empty.
+
+    key returns None to skip the limit. API clients get the usual JSON error;
+    pages pass a template to re-render with the message flashed.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if app.config['RATE_LIMIT_ENABLED'] and (methods is None or request.method in methods):
+                bucket = key(**kwargs)
+                if bucket is not None:
+                    retry_after = take_rate_limit(name, bucket)
+                    if retry_after:
+                        rate_limit_rejections[name] += 1
+                        if template:
+                            flash(message, 'error')
+                            response = make_response(render_template(template), 429)
+                        else:
+                            response = make_response(jsonify({'success': False, 'message': message}), 429)
+                        response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+                        return response
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+@job_task('prune_rate_limits', admin=True)
+def prune_rate_limits_job():
+    return {'removed': rate_limiter.prune()}
+
+@app.cli.command('prune-rate-limits')
+def prune_rate_limits_command():
+    """Delete rate-limit buckets that have refilled."""
+    click.echo(f"✅ Removed {rate_limiter.prune()} full rate-limit buckets")
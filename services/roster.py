@@ -0,0 +1,178 @@
+"""Streaming roster CSV import and export."""
+from flask import request, jsonify, Response, stream_with_context
+from flask_login import login_required
+import click
+import csv
+import io
+import itertools
+
+from app import app, db, PortfolioItem, Room, StudentCodenames, teacher_required
+from services.counters import portfolio_counters
+
+GREEK_LETTERS = ['Alpha', 'Beta', 'Gamma', 'Delta', 'Epsilon', 'Zeta', 'Eta', 'Theta',
+                 'Iota', 'Kappa', 'Lambda', 'Mu', 'Nu', 'Xi', 'Omicron', 'Pi', 'Rho',
+                 'Sigma', 'Tau', 'Upsilon', 'Phi', 'Chi', 'Psi', 'Omega']
+
+AVATAR_COLORS = ['#007bff', '#28a745', '#dc3545', '#ffc107', '#17a2b8',
+                 '#6f42c1', '#e83e8c', '#fd7e14', '#20c997', '#6c757d']
+
+ROSTER_EXPORT_COLUMNS = ['room_number', 'room_name', 'greek_code', 'display_name', 'first_name', 'last_name',
+                         'grade_level', 'is_public', 'portfolio_items', 'public_items', 'likes', 'views']
+
+def greek_code_for(index):
+    """Codename for the index-th student in a room: 0 -> Alpha_001, 1 -> Beta_002, ..."""
+    return f"{GREEK_LETTERS[index % len(GREEK_LETTERS)]}_{index + 1:03d}"
+
+def parse_bool(value, default=True):
+    """Read a CSV yes/no style cell"""
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'y')
+
+def import_roster(lines, max_errors=50):
+    """Stream roster CSV rows into StudentCodenames
+    
+    Expects columns room_number, first_name, last_name and optionally
+    room_name, grade_level, bio, avatar_color and is_public. Rooms that do
+    not exist yet are created. Each student is given the next greek_code in
+    their room and rows are inserted in chunks, so only one chunk is held in
+    memory. Everything is committed together at the end.
+    """
+    reader = csv.DictReader(lines)
+    missing = {'room_number', 'first_name', 'last_name'} - set(reader.fieldnames or [])
+    if missing:
+        raise ValueError(f'Missing columns: {", ".join(sorted(missing))}')
+    
+    rooms = {room.room_number: room for room in Room.query.all()}
+    next_index = {}
+    chunk = []
+    imported = rooms_created = 0
+    errors = []
+    
+    def room_next_index(room):
+        if room.id not in next_index:
+            numbers = [int(code.rsplit('_', 1)[-1]) for (code,) in
+                       db.session.query(StudentCodenames.greek_code).filter_by(room_id=room.id)
+                       if code.rsplit('_', 1)[-1].isdigit()]
+            next_index[room.id] = max(numbers, default=0)
+        index = next_index[room.id]
+        next_index[room.id] += 1
+        return index
+    
+    for line_number, row in enumerate(reader, start=2):
+        room_number = (row.get('room_number') or '').strip().upper()
+        first_name = (row.get('first_name') or '').strip()
+        last_name = (row.get('last_name') or '').strip()
+        if not room_number or not first_name or not last_name:
+            if len(errors) < max_errors:
+                errors.append({'line': line_number, 'message': 'room_number, first_name and last_name are required'})
+            continue
+        
+        room = rooms.get(room_number)
+        if room is None:
+            room = Room(room_number=room_number, room_name=(row.get('room_name') or '').strip() or room_number)
+            db.session.add(room)
+            db.session.flush()
+            rooms[room_number] = room
+            rooms_created += 1
+        
+        index = room_next_index(room)
+        greek_code = greek_code_for(index)
+        chunk.append({
+            'room_id': room.id,
+            'greek_code': greek_code,
+            'display_name': f"{greek_code} - {first_name} {last_name[0]}",
+            'first_name': first_name,
+            'last_name': last_name,
+            'grade_level': (row.get('grade_level') or '').strip() or None,
+            'bio': (row.get('bio') or '').strip() or None,
+            'avatar_color': (row.get('avatar_color') or '').strip() or AVATAR_COLORS[index % len(AVATAR_COLORS)],
+            'is_public': parse_bool(row.get('is_public'))
+        })
+        imported += 1
+        
+        if len(chunk) >= app.config['ROSTER_CHUNK_SIZE']:
+            db.session.bulk_insert_mappings(StudentCodenames, chunk)
+            chunk = []
+    
+    if chunk:
+        db.session.bulk_insert_mappings(StudentCodenames, chunk)
+    db.session.commit()
+    
+    return {'imported': imported, 'rooms_created': rooms_created, 'errors': errors}
+
+def roster_export_rows():
+    """Yield one row per codename with its room and portfolio stats, fetched in chunks"""
+    stats = db.session.query(
+        PortfolioItem.student_id,
+        db.func.count(PortfolioItem.id).label('portfolio_items'),
+        db.func.coalesce(db.func.sum(db.case((PortfolioItem.is_public == True, 1), else_=0)), 0).label('public_items'),
+        db.func.coalesce(db.func.sum(PortfolioItem.likes_count), 0).label('likes'),
+        db.func.coalesce(db.func.sum(PortfolioItem.views_count), 0).label('views')
+    ).group_by(PortfolioItem.student_id).subquery()
+    
+    query = db.session.query(
+        Room.room_number, Room.room_name, StudentCodenames.greek_code, StudentCodenames.display_name,
+        StudentCodenames.first_name, StudentCodenames.last_name, StudentCodenames.grade_level,
+        StudentCodenames.is_public,
+        db.func.coalesce(stats.c.portfolio_items, 0), db.func.coalesce(stats.c.public_items, 0),
+        db.func.coalesce(stats.c.likes, 0), db.func.coalesce(stats.c.views, 0)
+    ).join(Room, StudentCodenames.room_id == Room.id).outerjoin(
+        stats, stats.c.student_id == StudentCodenames.id
+    ).order_by(Room.room_number, StudentCodenames.greek_code)
+    
+    return query.yield_per(app.config['ROSTER_CHUNK_SIZE'])
+
+def csv_lines(header, rows):
+    """Encode rows as CSV text one line at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in itertools.chain([header], rows):
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+@app.route('/api/roster/import', methods=['POST'])
+@login_required
+@teacher_required
+def api_import_roster():
+    """Import a roster CSV uploaded as a multipart file or the raw request body"""
+    stream = request.files['file'].stream if request.files.get('file') else request.stream
+    
+    try:
+        result = import_roster(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    except (ValueError, UnicodeDecodeError) as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    return jsonify({'success': True, **result})
+
+@app.route('/api/roster/export')
+@login_required
+@teacher_required
+def api_export_roster():
+    """Stream every room's codenames and portfolio stats as CSV"""
+    portfolio_counters.flush()
+    rows = csv_lines(ROSTER_EXPORT_COLUMNS, roster_export_rows())
+    return Response(stream_with_context(rows), mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename=roster.csv'})
+
+@app.cli.command('import-roster')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+def import_roster_command(path):
+    """Import students from a roster CSV file."""
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        result = import_roster(f)
+    click.echo(f"✅ Imported {result['imported']} students ({result['rooms_created']} new rooms)")
+    for error in result['errors']:
+        click.echo(f"⚠️ Line {error['line']}: {error['message']}")
+
+@app.cli.command('export-roster')
+@click.argument('path', type=click.Path(dir_okay=False, writable=True))
+def export_roster_command(path):
+    """Write rooms, codenames and portfolio stats to a CSV file."""
+    portfolio_counters.flush()
+    with open(path, 'w', newline='') as f:
+        f.writelines(csv_lines(ROSTER_EXPORT_COLUMNS, roster_export_rows()))
+    click.echo(f"✅ Roster written to {path}")
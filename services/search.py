@@ -0,0 +1,230 @@
+"""Full-text search over projects, portfolio items and lesson plans."""
+from flask import render_template, request, jsonify, url_for
+from flask_login import current_user
+import click
+import re
+
+from app import app, db, LessonPlan, PortfolioItem, Project, STEMClass, SearchDocument, StudentCodenames
+from services.jobs import job_task
+
+SEARCH_COLUMNS = ('doc_type', 'doc_id', 'title', 'body', 'quarter', 'project_type', 'grade_level',
+                  'is_public', 'created_at')
+SEARCH_FACETS = ('doc_type', 'quarter', 'project_type', 'grade_level')
+SEARCH_MAX_TERMS = 10
+
+def search_text(*columns):
+    """Concatenate nullable text columns with spaces"""
+    text = db.func.coalesce(columns[0], '')
+    for column in columns[1:]:
+        text = text + ' ' + db.func.coalesce(column, '')
+    return text
+
+def search_sources():
+    """Per model: the SELECT producing its SEARCH_COLUMNS rows, the id column to filter it by, and its indexed fields"""
+    return {
+        Project: (db.select(
+            db.literal('project'), Project.id, Project.title,
+            search_text(Project.description, Project.skills_used),
+            Project.quarter, Project.project_type, Project.grade_level, Project.is_public, Project.created_at
+        ), Project.id, ('title', 'description', 'skills_used', 'quarter', 'project_type', 'grade_level', 'is_public')),
+        PortfolioItem: (db.select(
+            db.literal('portfolio_item'), PortfolioItem.id, PortfolioItem.title,
+            search_text(PortfolioItem.description, PortfolioItem.skills_used, PortfolioItem.subject_areas),
+            PortfolioItem.quarter, PortfolioItem.project_type, StudentCodenames.grade_level,
+            db.and_(PortfolioItem.is_public == True, StudentCodenames.is_public == True), PortfolioItem.created_at
+        ).join(StudentCodenames, PortfolioItem.student_id == StudentCodenames.id), PortfolioItem.id,
+            ('title', 'description', 'skills_used', 'subject_areas', 'quarter', 'project_type', 'is_public', 'student_id')),
+        LessonPlan: (db.select(
+            db.literal('lesson'), LessonPlan.id, LessonPlan.title,
+            search_text(LessonPlan.learning_objectives, LessonPlan.lesson_content),
+            LessonPlan.quarter, db.null(), STEMClass.grade_level, db.false(), LessonPlan.created_at
+        ).join(STEMClass, LessonPlan.class_id == STEMClass.id), LessonPlan.id,
+            ('title', 'learning_objectives', 'lesson_content', 'quarter', 'class_id')),
+    }
+
+SEARCH_DOC_TYPES = {Project: 'project', PortfolioItem: 'portfolio_item', LessonPlan: 'lesson'}
+
+def index_search_documents(executor, model, ids=None):
+    """Replace the SearchDocument rows of a model (all of them when ids is None)"""
+    select, id_column, _ = search_sources()[model]
+    delete = db.delete(SearchDocument).where(SearchDocument.doc_type == SEARCH_DOC_TYPES[model])
+    if ids is not None:
+        select = select.where(id_column.in_(ids))
+        delete = delete.where(SearchDocument.doc_id.in_(ids))
+    executor.execute(delete)
+    executor.execute(db.insert(SearchDocument).from_select(SEARCH_COLUMNS, select))
+
+def rebuild_search_index():
+    """Reindex every project, portfolio item and lesson plan in the current transaction"""
+    for model in SEARCH_DOC_TYPES:
+        index_search_documents(db.session, model)
+
+def _sync_search_document(change):
+    def listener(mapper, connection, target):
+        model = type(target)
+        if change == 'delete':
+            connection.execute(db.delete(SearchDocument).where(
+                SearchDocument.doc_type == SEARCH_DOC_TYPES[model], SearchDocument.doc_id == target.id))
+            return
+        if change == 'update':
+            state = db.inspect(target)
+            if not any(state.attrs[field].history.has_changes() for field in search_sources()[model][2]):
+                return
+        index_search_documents(connection, model, [target.id])
+    return listener
+
+for _model in SEARCH_DOC_TYPES:
+    for _change in ('insert', 'update', 'delete'):
+        db.event.listen(_model, f'after_{_change}', _sync_search_document(_change))
+
+@db.event.listens_for(StudentCodenames, 'after_update')
+def _sync_student_search_documents(mapper, connection, target):
+    """Reindex a student's portfolio items, whose documents copy the student's visibility and grade level"""
+    state = db.inspect(target)
+    if not any(state.attrs[field].history.has_changes() for field in ('is_public', 'grade_level')):
+        return
+    item_ids = connection.execute(
+        db.select(PortfolioItem.id).where(PortfolioItem.student_id == target.id)
+    ).scalars().all()
+    if item_ids:
+        index_search_documents(connection, PortfolioItem, item_ids)
+
+def search_vector():
+    """The weighted tsvector expression, written exactly as in ix_search_document_fts so the index is used"""
+    def weighted(column, weight):
+        return db.func.setweight(
+            db.func.to_tsvector(db.literal_column("'english'"), db.func.coalesce(column, db.literal_column("''"))),
+            db.literal_column(f"'{weight}'")
+        )
+    return weighted(SearchDocument.title, 'A').op('||')(weighted(SearchDocument.body, 'B'))
+
+def search_documents(query, include_private=False, filters=None, page=1, per_page=20):
+    """Ranked full-text search over SearchDocument with facet counts.
+    
+    Uses FTS5 bm25 ranking on SQLite and ts_rank over the weighted tsvector on
+    PostgreSQL (title matches rank above body matches), falling back to
+    LIKE on other databases. Every word in the query must match, as a prefix.
+    """
+    filters = {facet: value for facet, value in (filters or {}).items() if facet in SEARCH_FACETS and value}
+    terms = re.findall(r'\w+', query.lower())[:SEARCH_MAX_TERMS]
+    empty = {'results': [], 'total': 0, 'facets': {facet: {} for facet in SEARCH_FACETS}}
+    if not terms:
+        return empty
+    
+    dialect = db.engine.dialect.name
+    base = db.select(SearchDocument)
+    if dialect == 'sqlite':
+        fts = db.table('search_document_fts', db.column('rowid'))
+        match = db.text('search_document_fts MATCH :fts_query').bindparams(
+            fts_query=' '.join(f'"{term}"*' for term in terms))
+        # Counts and facets filter by rowid IN (...): joining instead lets SQLite
+        # drive from the facet index and re-run the MATCH for every candidate row
+        ranked = base.join(fts, fts.c.rowid == SearchDocument.id).where(match)
+        base = base.where(SearchDocument.id.in_(db.select(fts.c.rowid).where(match)))
+        rank = db.literal_column('bm25(search_document_fts, 10.0, 1.0)').asc()
+    elif dialect == 'postgresql':
+        vector = search_vector()
+        tsquery = db.func.to_tsquery(db.literal_column("'english'"), ' & '.join(f'{term}:*' for term in terms))
+        base = ranked = base.where(vector.op('@@')(tsquery))
+        rank = db.func.ts_rank(vector, tsquery).desc()
+    else:
+        for term in terms:
+            base = base.where(db.or_(SearchDocument.title.ilike(f'%{term}%'), SearchDocument.body.ilike(f'%{term}%')))
+        ranked = base
+        rank = SearchDocument.created_at.desc()
+    
+    if not include_private:
+        base = base.where(SearchDocument.is_public == True)
+        ranked = ranked.where(SearchDocument.is_public == True)
+    
+    def filtered(statement, skip=None):
+        for facet, value in filters.items():
+            if facet != skip:
+                statement = statement.where(getattr(SearchDocument, facet) == value)
+        return statement
+    
+    matches = filtered(base)
+    total = db.session.scalar(db.select(db.func.count()).select_from(matches.subquery()))
+    if not total:
+        return empty
+    
+    documents = db.session.scalars(
+        filtered(ranked).order_by(rank, SearchDocument.id).limit(per_page).offset((page - 1) * per_page)
+    ).all()
+    
+    # Each facet is counted with the other filters applied but not its own,
+    # so the counts show what choosing a different value would return
+    facets = {}
+    for facet in SEARCH_FACETS:
+        matched = filtered(base, skip=facet).subquery()
+        column = matched.c[facet]
+        facets[facet] = {value: count for value, count in db.session.execute(
+            db.select(column, db.func.count()).where(column.isnot(None)).group_by(column).order_by(column)
+        )}
+    
+    return {'results': documents, 'total': total, 'facets': facets}
+
+@app.template_global()
+def search_result_url(document):
+    """Page where a search hit can be viewed"""
+    if document.doc_type == 'portfolio_item':
+        return url_for('portfolio_item_detail', item_id=document.doc_id)
+    if document.doc_type == 'project':
+        return url_for('showcase', quarter=document.quarter) if document.quarter else url_for('showcase')
+    return url_for('manage_lessons')
+
+def search_request():
+    """Run search_documents for the current request's query string"""
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+    filters = {
+        'doc_type': request.args.get('type'),
+        'quarter': request.args.get('quarter'),
+        'project_type': request.args.get('project_type'),
+        'grade_level': request.args.get('grade')
+    }
+    include_private = current_user.is_authenticated and current_user.role in ['teacher', 'admin']
+    search = search_documents(request.args.get('q', ''), include_private, filters, page, per_page)
+    return search, filters, page, per_page
+
+@app.route('/search')
+def search():
+    """Search page for projects, portfolio items and (for teachers) lesson plans"""
+    search, filters, page, per_page = search_request()
+    return render_template('search.html', query=request.args.get('q', ''), filters=filters,
+                           page=page, per_page=per_page, **search)
+
+@app.route('/api/search')
+def api_search():
+    """API endpoint for ranked, faceted full-text search"""
+    search, filters, page, per_page = search_request()
+    return jsonify({
+        'success': True,
+        'total': search['total'],
+        'page': page,
+        'per_page': per_page,
+        'facets': search['facets'],
+        'results': [{
+            'type': document.doc_type,
+            'id': document.doc_id,
+            'title': document.title,
+            'snippet': (document.body or '')[:200],
+            'quarter': document.quarter,
+            'project_type': document.project_type,
+            'grade_level': document.grade_level,
+            'url': search_result_url(document)
+        } for document in search['results']]
+    })
+
+@job_task('rebuild_search_index', admin=True)
+def rebuild_search_index_job():
+    rebuild_search_index()
+    db.session.commit()
+    return {'documents': SearchDocument.query.count()}
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Reindex all projects, portfolio items and lesson plans."""
+    rebuild_search_index()
+    db.session.commit()
+    click.echo(f"✅ Indexed {SearchDocument.query.count()} documents")
@@ -0,0 +1,284 @@
+"""Server-side sessions and the per-worker cache of signed-in users."""
+import os
+from flask import session
+from flask_login import user_logged_in, user_logged_out
+from flask.sessions import SecureCookieSession, SessionInterface, session_json_serializer
+from itsdangerous import BadSignature, Signer
+from sqlalchemy.orm import make_transient_to_detached
+from datetime import datetime
+import click
+import hashlib
+import pickle
+import re
+import secrets
+import tempfile
+import time
+
+from app import app, db, UPSERT_INSERTS, User, UserSession, login_manager
+from services.caching import MemoryCache
+from services.jobs import job_task
+
+class ServerSideSession(SecureCookieSession):
+    """Session data loaded from a server-side store; sid is None until the first save"""
+
+    def __init__(self, initial=None, sid=None):
+        super().__init__(initial)
+        self.sid = sid
+
+class ServerSideSessionInterface(SessionInterface):
+    """Keeps session data on the server; the cookie only carries a signed, random session id.
+
+    Ids start with the signed-in user's id, so a user's sessions can be
+    revoked without reading them, and a new id is issued whenever that user
+    changes, so an id handed out before login is useless after it. Subclasses
+    implement load, store, delete, revoke_users and prune.
+    """
+    serializer = session_json_serializer
+    session_class = ServerSideSession
+    SID_PATTERN = re.compile(r'^\d+\.[A-Za-z0-9_-]{43}$')
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='server-side-session')
+
+    @staticmethod
+    def _sid_user(session):
+        return str(session.get('_user_id') or 0)
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode('ascii')
+            except BadSignature:
+                sid = None
+            data = self.load(sid) if sid and self.SID_PATTERN.match(sid) else None
+            if data is not None:
+                return self.session_class(self.serializer.loads(data), sid=sid)
+        return self.session_class()
+
+    def save_session(self, app, session, response):
+        name, domain, path = self.get_cookie_name(app), self.get_cookie_domain(app), self.get_cookie_path(app)
+        if session.accessed:
+            response.vary.add('Cookie')
+        
+        if not session:
+            if session.sid is not None:
+                self.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        
+        if session.sid is None or session.sid.split('.', 1)[0] != self._sid_user(session):
+            if session.sid is not None:
+                self.delete(session.sid)
+            session.sid = f'{self._sid_user(session)}.{secrets.token_urlsafe(32)}'
+            session.modified = True
+        if not self.should_set_cookie(app, session):
+            return
+        
+        self.store(session.sid, session.get('_user_id'), self.serializer.dumps(dict(session)),
+                   datetime.utcnow() + app.permanent_session_lifetime)
+        response.set_cookie(
+            name, self._signer(app).sign(session.sid).decode('ascii'),
+            expires=self.get_expiration_time(app, session), httponly=self.get_cookie_httponly(app),
+            domain=domain, path=path, secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app)
+        )
+
+class FileSessionStore(ServerSideSessionInterface):
+    """Sessions as files in a directory shared by every worker on the host; no database round trip"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, sid):
+        return os.path.join(self.directory, f'{sid}.session')
+
+    def load(self, sid):
+        try:
+            with open(self._path(sid), 'rb') as f:
+                expires_at, data = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return data if expires_at > datetime.utcnow() else None
+
+    def store(self, sid, user_id, data, expires_at):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump((expires_at, data), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(sid))
+
+    def delete(self, sid):
+        try:
+            os.remove(self._path(sid))
+        except FileNotFoundError:
+            pass
+
+    def _sids(self):
+        return [entry.name[:-len('.session')] for entry in os.scandir(self.directory) if entry.name.endswith('.session')]
+
+    def revoke_users(self, user_ids):
+        prefixes = {str(user_id) for user_id in user_ids}
+        for sid in self._sids():
+            if sid.split('.', 1)[0] in prefixes:
+                self.delete(sid)
+
+    def prune(self):
+        expired = [sid for sid in self._sids() if self.load(sid) is None]
+        for sid in expired:
+            self.delete(sid)
+        return len(expired)
+
+class DatabaseSessionStore(ServerSideSessionInterface):
+    """Sessions in the user_session table, shared by every host.
+
+    Reads go through the request's own session and connection; writes use a
+    separate short transaction so they never commit the request's pending work.
+    """
+
+    def load(self, sid):
+        return db.session.scalar(db.select(UserSession.data).where(
+            UserSession.id == sid, UserSession.expires_at > datetime.utcnow()))
+
+    def store(self, sid, user_id, data, expires_at):
+        table = UserSession.__table__
+        values = {'id': sid, 'user_id': user_id, 'data': data, 'expires_at': expires_at}
+        with db.engine.begin() as connection:
+            insert = UPSERT_INSERTS.get(connection.dialect.name)
+            if insert is None:
+                connection.execute(db.delete(table).where(table.c.id == sid))
+                connection.execute(db.insert(table), values)
+            else:
+                statement = insert(table).values(values)
+                connection.execute(statement.on_conflict_do_update(
+                    index_elements=['id'], set_={column: statement.excluded[column] for column in values}))
+
+    def delete(self, sid):
+        with db.engine.begin() as connection:
+            connection.execute(db.delete(UserSession.__table__).where(UserSession.id == sid))
+
+    def revoke_users(self, user_ids):
+        with db.engine.begin() as connection:
+            connection.execute(db.delete(UserSession.__table__).where(UserSession.user_id.in_(list(user_ids))))
+
+    def prune(self):
+        with db.engine.begin() as connection:
+            return connection.execute(db.delete(UserSession.__table__).where(
+                UserSession.expires_at <= datetime.utcnow())).rowcount
+
+def create_session_interface(config):
+    if config['SESSION_BACKEND'] == 'filesystem':
+        return FileSessionStore(config['SESSION_DIR'])
+    if config['SESSION_BACKEND'] == 'database':
+        return DatabaseSessionStore()
+    return app.session_interface
+
+app.session_interface = create_session_interface(app.config)
+
+# Signed-in users
+# The password hash is left out so it is never cached or written to a session store
+USER_IDENTITY_COLUMNS = tuple(column.key for column in User.__table__.columns if column.key != 'password_hash')
+USER_FINGERPRINT_COLUMNS = ('id', 'role', 'password_hash')
+
+user_cache = MemoryCache(app.config['USER_CACHE_SIZE'])
+
+def user_fingerprint(user):
+    """Digest of the columns that decide what a session may do; sessions signed in under another digest are signed out"""
+    return hashlib.sha256(repr(tuple(getattr(user, column) for column in USER_FINGERPRINT_COLUMNS)).encode('utf-8')).hexdigest()
+
+def user_identity(user):
+    """Plain snapshot of a user's columns that can rebuild the user without a query"""
+    identity = {column: getattr(user, column) for column in USER_IDENTITY_COLUMNS}
+    identity['fingerprint'] = user_fingerprint(user)
+    return identity
+
+def identity_user(identity):
+    """Attach a User built from an identity snapshot to the session without loading it.
+
+    Columns left out of the snapshot load on first access.
+    """
+    user = User(**{column: identity[column] for column in USER_IDENTITY_COLUMNS})
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+def uses_server_side_sessions():
+    return isinstance(app.session_interface, ServerSideSessionInterface)
+
+@user_logged_in.connect_via(app)
+def remember_user_fingerprint(sender, user, **extra):
+    session['_user_fingerprint'] = user_fingerprint(user)
+    if uses_server_side_sessions():
+        # Server-side data cannot be read or replayed by the client, so the session can carry the identity
+        session['_user_identity'] = {**user_identity(user), 'cached_at': time.time()}
+
+@user_logged_out.connect_via(app)
+def forget_user_fingerprint(sender, user, **extra):
+    session.pop('_user_fingerprint', None)
+    session.pop('_user_identity', None)
+
+def _queue_user_invalidation(change):
+    def listener(mapper, connection, target):
+        session = db.object_session(target)
+        if session is None:
+            return
+        state = db.inspect(target)
+        security_changed = change == 'delete' or any(
+            state.attrs[column].history.has_changes() for column in USER_FINGERPRINT_COLUMNS)
+        changed = session.info.setdefault('users_changed', {})
+        changed[target.id] = changed.get(target.id, False) or security_changed
+    return listener
+
+for _change in ('update', 'delete'):
+    db.event.listen(User, f'after_{_change}', _queue_user_invalidation(_change))
+
+@db.event.listens_for(db.session, 'after_commit')
+def invalidate_users_after_commit(session):
+    changed = session.info.pop('users_changed', None)
+    if not changed:
+        return
+    user_cache.delete_many([str(user_id) for user_id in changed])
+    revoked = [user_id for user_id, security_changed in changed.items() if security_changed]
+    if revoked and uses_server_side_sessions():
+        # A new role or password signs the user out everywhere, not just where the change was made
+        app.session_interface.revoke_users(revoked)
+
+@db.event.listens_for(db.session, 'after_rollback')
+def discard_user_invalidations(session):
+    session.info.pop('users_changed', None)
+
+@job_task('prune_sessions', admin=True)
+def prune_sessions_job():
+    return {'removed': app.session_interface.prune() if uses_server_side_sessions() else 0}
+
+@app.cli.command('prune-sessions')
+def prune_sessions_command():
+    """Delete expired server-side sessions."""
+    if not uses_server_side_sessions():
+        click.echo("Sessions are stored in cookies; nothing to prune")
+        return
+    click.echo(f"✅ Removed {app.session_interface.prune()} expired sessions")
+
+# Login manager
+@login_manager.user_loader
+def load_user(user_id):
+    """Rebuild the signed-in user from this worker's cache or the server-side session, querying only on a miss"""
+    identity = user_cache.get(user_id)
+    user = None
+    if identity is None and uses_server_side_sessions():
+        stored = session.get('_user_identity')
+        age = time.time() - stored['cached_at'] if stored else None
+        if stored and str(stored['id']) == user_id and age < app.config['USER_CACHE_TTL']:
+            identity = stored
+            user_cache.set(user_id, identity, app.config['USER_CACHE_TTL'] - age)
+    if identity is None:
+        user = db.session.get(User, int(user_id))
+        if user is None:
+            return None
+        identity = user_identity(user)
+        user_cache.set(user_id, identity, app.config['USER_CACHE_TTL'])
+        if uses_server_side_sessions():
+            session['_user_identity'] = {**identity, 'cached_at': time.time()}
+    
+    if session.get('_user_fingerprint') not in (None, identity['fingerprint']):
+        # The role or password changed after this session signed in
+        return None
+    return user or identity_user(identity)
@@ -0,0 +1,196 @@
+"""Skill and subject tags parsed from portfolio items and projects."""
+from flask import request, jsonify, url_for
+from flask_login import current_user
+import click
+
+from app import app, db, PortfolioItem, Project, Tag, UPSERT_INSERTS, portfolio_item_tag, project_tag
+from services.pagination import keyset_page
+from services.jobs import job_task
+
+TAG_FIELDS = {'subject': 'subject_areas', 'skill': 'skills_used'}
+TAGGED_MODELS = {
+    Project: (project_tag, project_tag.c.project_id),
+    PortfolioItem: (portfolio_item_tag, portfolio_item_tag.c.portfolio_item_id),
+}
+TAG_TYPES = {'project': Project, 'portfolio_item': PortfolioItem}
+TAG_BATCH_SIZE = 500
+
+def normalize_tag(name):
+    return ' '.join(name.split()).lower()
+
+def parse_tags(text):
+    """Distinct tags in a comma-separated string as {normalized name: name as written}"""
+    tags = {}
+    for name in (text or '').split(','):
+        name = ' '.join(name.split())[:Tag.name.type.length]
+        if name:
+            tags.setdefault(name.lower(), name)
+    return tags
+
+def resolve_tag_ids(executor, kind, names):
+    """Map normalized names to Tag ids for one kind, creating the tags that do not exist yet"""
+    normalized_names = list(names)
+    ids = {}
+    for start in range(0, len(normalized_names), TAG_BATCH_SIZE):
+        batch = normalized_names[start:start + TAG_BATCH_SIZE]
+        lookup = db.select(Tag.normalized_name, Tag.id).where(Tag.kind == kind, Tag.normalized_name.in_(batch))
+        ids.update(executor.execute(lookup).all())
+
+        missing = [{'kind': kind, 'name': names[name], 'normalized_name': name}
+                   for name in batch if name not in ids]
+        if not missing:
+            continue
+        insert = UPSERT_INSERTS.get(db.engine.dialect.name)
+        if insert is not None:
+            # Another worker may create the same tag between the lookup and the insert
+            executor.execute(insert(Tag).on_conflict_do_nothing(
+                index_elements=['normalized_name', 'kind']), missing)
+        else:
+            executor.execute(db.insert(Tag), missing)
+        ids.update(executor.execute(lookup).all())
+    return ids
+
+def index_item_tags(executor, model, ids=None):
+    """Rebuild the tag associations of a model's rows (all of them when ids is None)"""
+    association, item_column = TAGGED_MODELS[model]
+    select = db.select(model.id, *(getattr(model, field) for field in TAG_FIELDS.values()))
+    delete = db.delete(association)
+    if ids is not None:
+        select = select.where(model.id.in_(ids))
+        delete = delete.where(item_column.in_(ids))
+    executor.execute(delete)
+
+    item_tags = []
+    names = {kind: {} for kind in TAG_FIELDS}
+    for row in executor.execute(select):
+        for kind, text in zip(TAG_FIELDS, row[1:]):
+            tags = parse_tags(text)
+            names[kind].update(tags)
+            item_tags.extend((row[0], kind, name) for name in tags)
+
+    tag_ids = {kind: resolve_tag_ids(executor, kind, kind_names) for kind, kind_names in names.items()}
+    # A subject and a skill can share a name, but each is its own tag
+    rows = [{item_column.name: item_id, 'tag_id': tag_ids[kind][name]} for item_id, kind, name in item_tags]
+    for start in range(0, len(rows), TAG_BATCH_SIZE):
+        executor.execute(db.insert(association), rows[start:start + TAG_BATCH_SIZE])
+
+def rebuild_tag_index():
+    """Re-parse every project and portfolio item and drop tags nothing uses any more"""
+    for model in TAGGED_MODELS:
+        index_item_tags(db.session, model)
+    db.session.execute(db.delete(Tag).where(
+        *(~Tag.id.in_(db.select(association.c.tag_id)) for association, _ in TAGGED_MODELS.values())
+    ))
+
+def _sync_item_tags(change):
+    def listener(mapper, connection, target):
+        association, item_column = TAGGED_MODELS[type(target)]
+        if change == 'delete':
+            connection.execute(db.delete(association).where(item_column == target.id))
+            return
+        if change == 'update':
+            state = db.inspect(target)
+            if not any(state.attrs[field].history.has_changes() for field in TAG_FIELDS.values()):
+                return
+        index_item_tags(connection, type(target), [target.id])
+    return listener
+
+for _model in TAGGED_MODELS:
+    for _change in ('insert', 'update', 'delete'):
+        db.event.listen(_model, f'after_{_change}', _sync_item_tags(_change))
+
+def tagged_ids(model, name, kind=None):
+    """SELECT of the ids of a model's rows carrying a tag, for use in an IN filter"""
+    association, item_column = TAGGED_MODELS[model]
+    select = db.select(item_column).join(Tag, Tag.id == association.c.tag_id).where(
+        Tag.normalized_name == normalize_tag(name))
+    if kind:
+        select = select.where(Tag.kind == kind)
+    return select
+
+def tag_counts(kind=None, models=None, quarter=None, include_private=False, limit=20):
+    """Most used tags across the given models' rows as (kind, name, count), most used first"""
+    tagged = []
+    for model in models or TAGGED_MODELS:
+        association, item_column = TAGGED_MODELS[model]
+        select = db.select(association.c.tag_id).join(model, model.id == item_column)
+        if not include_private:
+            select = select.where(model.is_public == True)
+        if quarter:
+            select = select.where(model.quarter == quarter)
+        tagged.append(select)
+    tagged = db.union_all(*tagged).subquery() if len(tagged) > 1 else tagged[0].subquery()
+
+    count = db.func.count().label('count')
+    query = db.select(Tag.kind, Tag.name, count).join(tagged, tagged.c.tag_id == Tag.id)
+    if kind:
+        query = query.where(Tag.kind == kind)
+    return db.session.execute(
+        query.group_by(Tag.id, Tag.kind, Tag.name).order_by(count.desc(), Tag.name).limit(limit)
+    ).all()
+
+@app.route('/api/tags')
+def api_tags():
+    """API endpoint returning the most used subject areas and skills"""
+    kind = request.args.get('kind')
+    if kind and kind not in TAG_FIELDS:
+        return jsonify({'success': False, 'message': f'kind must be one of {", ".join(TAG_FIELDS)}'}), 400
+    item_type = request.args.get('type')
+    if item_type and item_type not in TAG_TYPES:
+        return jsonify({'success': False, 'message': f'type must be one of {", ".join(TAG_TYPES)}'}), 400
+
+    include_private = current_user.is_authenticated and current_user.role in ['teacher', 'admin']
+    counts = tag_counts(
+        kind=kind,
+        models=[TAG_TYPES[item_type]] if item_type else None,
+        quarter=request.args.get('quarter') or None,
+        include_private=include_private,
+        limit=min(max(request.args.get('limit', 20, type=int), 1), 100)
+    )
+    return jsonify({
+        'success': True,
+        'tags': [{'kind': tag_kind, 'name': name, 'count': tag_count} for tag_kind, name, tag_count in counts]
+    })
+
+@app.route('/api/portfolio/items')
+def api_portfolio_items():
+    """API endpoint returning one page of public portfolio items, optionally for one tag or quarter"""
+    query = PortfolioItem.query.filter_by(is_public=True)
+    if request.args.get('tag'):
+        query = query.filter(PortfolioItem.id.in_(
+            tagged_ids(PortfolioItem, request.args['tag'], request.args.get('tag_kind'))))
+    if request.args.get('quarter'):
+        query = query.filter_by(quarter=request.args['quarter'])
+    items, next_cursor = keyset_page(
+        query, PortfolioItem, request.args.get('cursor'),
+        min(max(request.args.get('limit', app.config['PAGE_SIZE'], type=int), 1), 100)
+    )
+    return jsonify({
+        'success': True,
+        'items': [{
+            'id': item.id,
+            'student_id': item.student_id,
+            'title': item.title,
+            'project_type': item.project_type,
+            'quarter': item.quarter,
+            'subject_areas': item.subject_areas,
+            'skills_used': item.skills_used,
+            'thumbnail_url': url_for('static', filename=item.thumbnail_path) if item.thumbnail_path else None,
+            'created_at': item.created_at.isoformat(),
+            'url': url_for('portfolio_item_detail', item_id=item.id)
+        } for item in items],
+        'next_cursor': next_cursor
+    })
+
+@job_task('rebuild_tag_index', admin=True)
+def rebuild_tag_index_job():
+    rebuild_tag_index()
+    db.session.commit()
+    return {'tags': Tag.query.count()}
+
+@app.cli.command('rebuild-tag-index')
+def rebuild_tag_index_command():
+    """Re-parse subject areas and skills of all projects and portfolio items."""
+    rebuild_tag_index()
+    db.session.commit()
+    click.echo(f"✅ Indexed {Tag.query.count()} tags")
@@ -0,0 +1,35 @@
+"""Daemon threads that start after gunicorn forks its workers."""
+import threading
+
+
+class BackgroundThread:
+    """A daemon thread that starts on first use instead of at import.
+
+    Threads do not survive fork(): one started while the module is imported
+    would be missing from every gunicorn worker forked afterwards (as with
+    --preload). Starting from ensure(), which callers invoke whenever they
+    need the thread, gives each worker process its own thread and replaces
+    one that died.
+    """
+
+    def __init__(self, target, name):
+        self.target = target
+        self.name = name
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def ensure(self):
+        """Start the thread unless it is already running"""
+        if self.is_alive():
+            return
+        with self._lock:
+            if not self.is_alive():
+                self._thread = threading.Thread(target=self.target, name=self.name, daemon=True)
+                self._thread.start()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
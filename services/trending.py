@@ -0,0 +1,195 @@
+"""Time-decayed trending scores for portfolio items."""
+from flask import request, jsonify, url_for
+from datetime import datetime
+import click
+import math
+
+from app import app, db, PortfolioItem, Room, StudentCodenames, TrendingScore, UPSERT_INSERTS
+from services.counters import portfolio_counters
+from services.conditional import version_columns
+from services.jobs import job_task
+
+TRENDING_EPOCH = datetime(2024, 1, 1)  # any fixed instant works; scores are relative to it
+TRENDING_WEIGHT_SETTINGS = {'likes_count': 'TRENDING_LIKE_WEIGHT', 'views_count': 'TRENDING_VIEW_WEIGHT'}
+
+def trending_exponent(at):
+    """Half-lives from TRENDING_EPOCH to at.
+
+    A weight w earned at time t is stored as log2(w) + trending_exponent(t).
+    Decay shrinks every item by the same factor, so ordering by the stored
+    score ranks items by their decayed weight at any later moment.
+    """
+    return (at - TRENDING_EPOCH).total_seconds() / (app.config['TRENDING_HALF_LIFE_HOURS'] * 3600)
+
+def add_log2(a, b):
+    """log2(2**a + 2**b) without overflowing; a may be None"""
+    if a is None:
+        return b
+    high, low = max(a, b), min(a, b)
+    return high + math.log2(1 + 2 ** (low - high))
+
+def engagement_weight(likes, views):
+    return (likes or 0) * app.config['TRENDING_LIKE_WEIGHT'] + (views or 0) * app.config['TRENDING_VIEW_WEIGHT']
+
+def trending_weight(score, now=None):
+    """Decayed engagement weight behind a stored score"""
+    return 2 ** (score - trending_exponent(now or datetime.utcnow()))
+
+def trending_floor(now):
+    """Stored score under which an item has decayed below TRENDING_MIN_WEIGHT"""
+    return math.log2(app.config['TRENDING_MIN_WEIGHT']) + trending_exponent(now)
+
+def write_trending_scores(connection, scores, now):
+    """Upsert {portfolio_item_id: (room_id, score)} and delete the rows that have decayed away"""
+    table = TrendingScore.__table__
+    rows = [{'portfolio_item_id': item_id, 'room_id': room_id, 'score': score, 'updated_at': now}
+            for item_id, (room_id, score) in scores.items()]
+    if rows:
+        insert = UPSERT_INSERTS.get(connection.dialect.name)
+        if insert is None:
+            connection.execute(db.delete(table).where(table.c.portfolio_item_id.in_(list(scores))))
+            connection.execute(db.insert(table), rows)
+        else:
+            statement = insert(table)
+            connection.execute(statement.on_conflict_do_update(
+                index_elements=['portfolio_item_id'],
+                set_={column: statement.excluded[column] for column in ('room_id', 'score', 'updated_at')}
+            ), rows)
+    # A range delete on the score index keeps the table down to recently engaged items
+    connection.execute(db.delete(table).where(table.c.score < trending_floor(now)))
+
+@portfolio_counters.on_flush
+def record_trending_engagement(connection, deltas):
+    """Add flushed likes and views to the items' trending scores"""
+    weights = {}
+    for (item_id, column), delta in deltas.items():
+        weights[item_id] = weights.get(item_id, 0) + delta * app.config[TRENDING_WEIGHT_SETTINGS[column]]
+    weights = {item_id: weight for item_id, weight in weights.items() if weight > 0}
+    if not weights:
+        return
+    
+    now = datetime.utcnow()
+    exponent = trending_exponent(now)
+    # The counter UPDATEs earlier in this transaction lock these items, so
+    # concurrent flushes of one item read each other's scores in turn
+    current = connection.execute(
+        db.select(PortfolioItem.id, StudentCodenames.room_id, TrendingScore.score)
+        .join(StudentCodenames, StudentCodenames.id == PortfolioItem.student_id)
+        .outerjoin(TrendingScore, TrendingScore.portfolio_item_id == PortfolioItem.id)
+        .where(PortfolioItem.id.in_(list(weights)))
+    )
+    scores = {item_id: (room_id, add_log2(score, math.log2(weights[item_id]) + exponent))
+              for item_id, room_id, score in current}
+    write_trending_scores(connection, scores, now)
+
+def rebuild_trending_scores():
+    """Recompute every trending score from the stored like and view totals in the current transaction.
+
+    Past engagement has no timestamps, so an item's totals count as of its
+    creation. Returns the number of items ranked.
+    """
+    now = datetime.utcnow()
+    scores = {}
+    rows = db.session.execute(db.select(
+        PortfolioItem.id, StudentCodenames.room_id, PortfolioItem.likes_count, PortfolioItem.views_count,
+        PortfolioItem.created_at
+    ).join(StudentCodenames, StudentCodenames.id == PortfolioItem.student_id))
+    for item_id, room_id, likes, views, created_at in rows:
+        weight = engagement_weight(likes, views)
+        if weight > 0:
+            scores[item_id] = (room_id, math.log2(weight) + trending_exponent(created_at or now))
+    
+    connection = db.session.connection()
+    connection.execute(db.delete(TrendingScore.__table__))
+    write_trending_scores(connection, scores, now)
+    return db.session.scalar(db.select(db.func.count()).select_from(TrendingScore))
+
+@db.event.listens_for(PortfolioItem, 'after_insert')
+def seed_trending_score(mapper, connection, target):
+    # Items created with counts already set (sample data, imports) start ranked as of their creation
+    weight = engagement_weight(target.likes_count, target.views_count)
+    if weight > 0:
+        now = datetime.utcnow()
+        room_id = connection.scalar(db.select(StudentCodenames.room_id).where(StudentCodenames.id == target.student_id))
+        write_trending_scores(connection, {
+            target.id: (room_id, math.log2(weight) + trending_exponent(target.created_at or now))
+        }, now)
+
+@db.event.listens_for(PortfolioItem, 'after_update')
+def move_trending_score_with_item(mapper, connection, target):
+    if db.inspect(target).attrs.student_id.history.has_changes():
+        connection.execute(db.update(TrendingScore.__table__).where(
+            TrendingScore.portfolio_item_id == target.id
+        ).values(room_id=db.select(StudentCodenames.room_id).where(
+            StudentCodenames.id == target.student_id).scalar_subquery()))
+
+@db.event.listens_for(StudentCodenames, 'after_update')
+def move_trending_scores_with_student(mapper, connection, target):
+    if db.inspect(target).attrs.room_id.history.has_changes():
+        connection.execute(db.update(TrendingScore.__table__).where(TrendingScore.portfolio_item_id.in_(
+            db.select(PortfolioItem.id).where(PortfolioItem.student_id == target.id)
+        )).values(room_id=target.room_id))
+
+@db.event.listens_for(PortfolioItem, 'after_delete')
+def delete_trending_score(mapper, connection, target):
+    connection.execute(db.delete(TrendingScore.__table__).where(TrendingScore.portfolio_item_id == target.id))
+
+def trending_items(room_id=None, limit=6):
+    """Public (item, current weight) pairs with the highest trending scores, school-wide or for one room.
+
+    Reads the top of a score index rather than sorting the portfolio table.
+    """
+    query = db.select(PortfolioItem, TrendingScore.score).join(
+        TrendingScore, TrendingScore.portfolio_item_id == PortfolioItem.id
+    ).join(StudentCodenames, StudentCodenames.id == PortfolioItem.student_id).options(
+        db.contains_eager(PortfolioItem.student)
+    ).where(PortfolioItem.is_public == True, StudentCodenames.is_public == True)
+    if room_id is not None:
+        query = query.where(TrendingScore.room_id == room_id)
+    now = datetime.utcnow()
+    return [(item, round(trending_weight(score, now), 2))
+            for item, score in db.session.execute(query.order_by(TrendingScore.score.desc()).limit(limit))]
+
+def trending_version(*criteria):
+    """Version columns covering the trending rows matching criteria and the items they point at"""
+    return version_columns(TrendingScore, *criteria) + version_columns(
+        PortfolioItem, PortfolioItem.id.in_(db.select(TrendingScore.portfolio_item_id).where(*criteria)))
+
+@app.route('/api/portfolio/trending')
+def api_trending_items():
+    """API endpoint returning the trending public portfolio items, school-wide or for one room"""
+    room = None
+    if request.args.get('room'):
+        room = Room.query.filter_by(room_number=request.args['room'], is_active=True).first_or_404()
+    items = trending_items(room.id if room else None, min(max(request.args.get('limit', 10, type=int), 1), 50))
+    return jsonify({
+        'success': True,
+        'room': room.room_number if room else None,
+        'items': [{
+            'id': item.id,
+            'title': item.title,
+            'student': item.student.greek_code,
+            'project_type': item.project_type,
+            'quarter': item.quarter,
+            'thumbnail_url': url_for('static', filename=item.thumbnail_path) if item.thumbnail_path else None,
+            'likes_count': item.current_likes_count,
+            'views_count': item.current_views_count,
+            'trending_weight': weight,
+            'url': url_for('portfolio_item_detail', item_id=item.id)
+        } for item, weight in items]
+    })
+
+@job_task('rebuild_trending_scores', admin=True)
+def rebuild_trending_scores_job():
+    portfolio_counters.flush()
+    ranked = rebuild_trending_scores()
+    db.session.commit()
+    return {'items': ranked}
+
+@app.cli.command('rebuild-trending')
+def rebuild_trending_command():
+    """Recompute trending scores from the stored like and view totals."""
+    portfolio_counters.flush()
+    ranked = rebuild_trending_scores()
+    db.session.commit()
+    click.echo(f"✅ Ranked {ranked} trending items")
@@ -141,6 +141,36 @@ async function updateProgress(studentId, lessonId, classId, data) {
     }
 }
 
+// Send many progress changes (e.g. grading a whole class) in one request
+async function updateProgressBatch(updates) {
+    try {
+        const response = await fetch('/api/update-progress/bulk', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ updates: updates })
+        });
+        
+        const result = await response.json();
+        
+        if (result.success && result.errors === 0) {
+            showNotification(`Updated progress for ${result.applied} students!`, 'success');
+            setTimeout(() => {
+                location.reload();
+            }, 1000);
+        } else if (result.success) {
+            showNotification(`Updated ${result.applied} rows, ${result.errors} could not be saved`, 'warning');
+        } else {
+            showNotification(result.message || 'Failed to update progress', 'error');
+        }
+        return result;
+    } catch (error) {
+        console.error('Error updating progress:', error);
+        showNotification('An error occurred while updating progress', 'error');
+    }
+}
+
 async function toggleFeaturedProject(projectId) {
     try {
         const response = await fetch(`/api/featured-project/${projectId}`, {
@@ -3,86 +3,1175 @@
 Simple test script to verify the Flask application works correctly.
 """
 
+import json
 import os
+import shutil
 import sys
 import tempfile
+import time
+
+import pytest
+
+# The app binds its engine at import time, so point it at a throwaway database first;
+# the suite must never touch instance/barnum_stem.db
+TEST_DATABASE = os.path.join(tempfile.mkdtemp(prefix='barnum_stem_tests_'), 'test.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{TEST_DATABASE}'
+os.environ['SQLITE_WAL'] = '0'  # keep the test database a single file with no -wal/-shm sidecars
+os.environ['JOB_WORKERS'] = '0'  # no embedded job threads; test_job_queue runs its jobs explicitly
+
 from app import app, db, create_sample_data
+from services.caching import cache
+from services.sessions import user_cache
+from services.counters import portfolio_counters
+
+# The suite signs in far more often than the sign-in limits allow; test_rate_limits turns them back on
+app.config['RATE_LIMIT_ENABLED'] = False
+
+@pytest.fixture(scope='session')
+def sample_database():
+    """Build the schema and sample data once; returns the database path and a copy of it to restore"""
+    from app import STEMClass, LessonPlan
+
+    with app.app_context():
+        # Under `python test_app.py` this module is imported twice, so ask the engine where its file is
+        path = db.engine.url.database
+        db.create_all()
+        create_sample_data()
+        class_id = STEMClass.query.order_by(STEMClass.id).first().id
+        db.session.add_all([
+            LessonPlan(title='Designing a Treehouse', class_id=class_id, quarter='Q1',
+                       learning_objectives='Sketch and model a treehouse in Tinkercad'),
+            LessonPlan(title='Printing the Treehouse', class_id=class_id, quarter='Q1',
+                       learning_objectives='Prepare a model for 3D printing'),
+        ])
+        db.session.commit()
+        db.session.remove()
+        db.engine.dispose()
+    shutil.copyfile(path, path + '.sample')
+    return path, path + '.sample'
+
+@pytest.fixture(autouse=True)
+def database(sample_database):
+    """Start every test from a fresh copy of the sample database with empty in-process caches"""
+    path, sample = sample_database
+    shutil.copyfile(sample, path)
+    cache.clear()
+    user_cache.clear()
+    yield
+    with app.app_context():
+        portfolio_counters.flush()  # Pending increments belong to this test's copy
+        db.session.remove()
+        db.engine.dispose()
 
 def test_app():
     """Test the Flask application."""
     print("🧪 Testing Barnum STEM Portfolio Application...")
     
-    # Set up test database
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
     app.config['TESTING'] = True
     
     with app.app_context():
-        try:
-            # Create database tables
-            print("📊 Creating database tables...")
-            db.create_all()
-            
-            # Create sample data
-            print("📝 Creating sample data...")
-            create_sample_data()
-            
-            # Test database queries
-            print("🔍 Testing database queries...")
-            from app import User, Project, STEMClass, LessonPlan
+        # Test database queries
+        print("🔍 Testing database queries...")
+        from app import User, Project, STEMClass, LessonPlan
+        
+        # Test user queries
+        users = User.query.all()
+        print(f"✅ Found {len(users)} users")
+        
+        # Test project queries
+        projects = Project.query.all()
+        print(f"✅ Found {len(projects)} projects")
+        
+        # Test class queries
+        classes = STEMClass.query.all()
+        print(f"✅ Found {len(classes)} classes")
+        
+        # Test lesson queries
+        lessons = LessonPlan.query.all()
+        print(f"✅ Found {len(lessons)} lesson plans")
+        
+        # Test Flask routes
+        print("🌐 Testing Flask routes...")
+        with app.test_client() as client:
+            # Test homepage
+            response = client.get('/')
+            assert response.status_code == 200
+            print("✅ Homepage loads successfully")
             
-            # Test user queries
-            users = User.query.all()
-            print(f"✅ Found {len(users)} users")
+            # Test showcase
+            response = client.get('/showcase')
+            assert response.status_code == 200
+            print("✅ Showcase page loads successfully")
             
-            # Test project queries
-            projects = Project.query.all()
-            print(f"✅ Found {len(projects)} projects")
+            # Test curriculum
+            response = client.get('/curriculum')
+            assert response.status_code == 200
+            print("✅ Curriculum page loads successfully")
             
-            # Test class queries
-            classes = STEMClass.query.all()
-            print(f"✅ Found {len(classes)} classes")
+            # Test about
+            response = client.get('/about')
+            assert response.status_code == 200
+            print("✅ About page loads successfully")
             
-            # Test lesson queries
-            lessons = LessonPlan.query.all()
-            print(f"✅ Found {len(lessons)} lesson plans")
-            
-            # Test Flask routes
-            print("🌐 Testing Flask routes...")
-            with app.test_client() as client:
-                # Test homepage
-                response = client.get('/')
-                assert response.status_code == 200
-                print("✅ Homepage loads successfully")
-                
-                # Test showcase
-                response = client.get('/showcase')
-                assert response.status_code == 200
-                print("✅ Showcase page loads successfully")
-                
-                # Test curriculum
-                response = client.get('/curriculum')
-                assert response.status_code == 200
-                print("✅ Curriculum page loads successfully")
-                
-                # Test about
-                response = client.get('/about')
-                assert response.status_code == 200
-                print("✅ About page loads successfully")
-                
-                # Test login
-                response = client.get('/login')
+            # Test login
+            response = client.get('/login')
+            assert response.status_code == 200
+            print("✅ Login page loads successfully")
+        
+        print("\n🎉 All tests passed! The application is working correctly.")
+
+def login_as_teacher(client):
+    """Log the test client in with the sample teacher account."""
+    response = client.post('/login', data={'username': 'teacher', 'password': 'password123'})
+    assert response.status_code == 302
+
+
+def test_student_progress_roster():
+    """Test the aggregated /student-progress roster."""
+    print("📈 Testing student progress roster...")
+
+    with app.app_context():
+
+        from app import STEMClass
+        from services.progress import student_progress_query, student_progress_totals
+
+        query = student_progress_query()
+        students = query.all()
+        totals = student_progress_totals(query)
+        assert totals['total_students'] == len(students)
+        print(f"✅ Aggregated {len(students)} students in one grouped query")
+
+        with app.test_client() as client:
+            login_as_teacher(client)
+            for args in ['', '?sort=avg_completion&dir=desc', '?class_id=1', '?grade=3rd+Grade&per_page=1&page=2']:
+                response = client.get('/student-progress' + args)
                 assert response.status_code == 200
-                print("✅ Login page loads successfully")
-            
-            print("\n🎉 All tests passed! The application is working correctly.")
-            return True
-            
-        except Exception as e:
-            print(f"\n❌ Test failed with error: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
+            print("✅ Student progress filters, sorting and pagination load successfully")
+
+            response = client.get('/api/class-performance')
+            assert response.status_code == 200
+            assert len(response.get_json()['classes']) == STEMClass.query.count()
+            print("✅ Class performance rollup API returns every class")
+
+
+def test_portfolio_counters():
+    """Test that views and likes are buffered and flushed as batched increments."""
+    print("👀 Testing write-behind portfolio counters...")
+
+    with app.app_context():
+
+        from app import PortfolioItem
+
+        item = PortfolioItem.query.filter_by(is_public=True).first()
+        views, likes = item.views_count, item.likes_count
+
+        with app.test_client() as client:
+            for _ in range(3):
+                assert client.get(f'/portfolio/item/{item.id}').status_code == 200
+            response = client.post(f'/api/portfolio/like/{item.id}')
+            assert response.get_json()['likes_count'] == likes + 1
+        assert portfolio_counters.pending(item.id, 'views_count') == 3
+        print("✅ Increments are visible before they reach the database")
+
+        portfolio_counters.flush()
+        db.session.expire_all()
+        item = db.session.get(PortfolioItem, item.id)
+        assert item.views_count == views + 3
+        assert item.likes_count == likes + 1
+        assert portfolio_counters.pending(item.id, 'views_count') == 0
+        print("✅ Flush applies the buffered increments")
+
+
+def test_public_page_cache():
+    """Test that homepage and showcase data is cached and invalidated by model changes."""
+    print("🗄️  Testing public page cache...")
+
+    with app.app_context():
+
+        from app import Project
+        from services.caching import cache
+
+        with app.test_client() as client:
+            assert client.get('/showcase').status_code == 200
+            assert client.get('/').status_code == 200
+            assert cache.get('home:stats') is not None
+            print("✅ Homepage and showcase results are cached")
+
+            project = Project.query.filter_by(is_public=True).first()
+            quarter = project.quarter
+            project.title = 'Cache Invalidation Check'
+            db.session.commit()
+            assert cache.get(f'showcase:{quarter}') is None
+            assert cache.get('home:stats') is not None
+            assert b'Cache Invalidation Check' in client.get('/showcase').data
+            print("✅ Updating a project invalidates only the affected keys")
+
+
+def test_conditional_public_pages():
+    """Test ETag/Last-Modified validators and 304 responses on public portfolio pages."""
+    print("🏷️  Testing conditional requests...")
+
+    with app.app_context():
+
+        from app import StudentCodenames, PortfolioItem
+
+        student = StudentCodenames.query.filter_by(is_public=True).first()
+        pages = ['/portfolio', f'/portfolio/room/{student.room.room_number}',
+                 f'/portfolio/student/{student.id}', '/showcase']
+
+        with app.test_client() as client:
+            etags = {}
+            for page in pages:
+                response = client.get(page)
+                assert response.status_code == 200 and response.headers['ETag']
+                assert 'public' in response.headers['Cache-Control']
+                etags[page] = response.headers['ETag']
+                revalidated = client.get(page, headers={'If-None-Match': etags[page]})
+                assert revalidated.status_code == 304 and not revalidated.data
+            last_modified = client.get(pages[0]).headers['Last-Modified']
+            assert client.get(pages[0], headers={'If-Modified-Since': last_modified}).status_code == 304
+            print("✅ Unchanged pages answer 304 to If-None-Match and If-Modified-Since")
+
+            student.bio = 'Updated bio for the conditional request check'
+            db.session.commit()
+            for page in pages[:3]:
+                assert client.get(page, headers={'If-None-Match': etags[page]}).status_code == 200
+
+            item = PortfolioItem.query.filter_by(student_id=student.id).first()
+            response = client.get(pages[2])
+            etag = response.headers['ETag']
+            # Totals are part of the version, so the page must not be revalidated by date alone
+            assert 'Last-Modified' not in response.headers
+            portfolio_counters.increment(item.id, 'likes_count')
+            portfolio_counters.flush()
+            assert client.get(pages[2], headers={'If-None-Match': etag}).status_code == 200
+            assert client.get(pages[2], headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'}).status_code == 200
+
+            login_as_teacher(client)
+            response = client.get(pages[0], headers={'If-None-Match': etags[pages[0]]})
+            assert response.status_code == 200 and 'private' in response.headers['Cache-Control']
+            print("✅ Edits, flushed counters and signing in change the ETag")
+
+
+def test_media_upload():
+    """Test content-addressed uploads and background thumbnail generation."""
+    print("🖼️  Testing media uploads...")
+
+    import io
+    import shutil
+    from PIL import Image
+
+    with app.app_context():
+
+        from app import PortfolioItem
+        from services.jobs import JobWorker
+        from services.media import media_file_path
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (1200, 900), (30, 120, 200)).save(buffer, 'PNG')
+        item = PortfolioItem.query.first()
+
+        with app.test_client() as client:
+            login_as_teacher(client)
+            response = client.post(f'/api/portfolio/item/{item.id}/upload',
+                                   data={'file': (io.BytesIO(buffer.getvalue()), 'design.png')})
+            assert response.status_code == 200
+            path = response.get_json()['path']
+            try:
+                response = client.post(f'/api/portfolio/item/{item.id}/upload?filename=again.png',
+                                       data=buffer.getvalue(), content_type='application/octet-stream')
+                assert response.get_json()['deduplicated']
+                print("✅ Identical uploads share one stored file")
+
+                JobWorker(1).run(until_idle=True)
+                db.session.expire_all()
+                item = db.session.get(PortfolioItem, item.id)
+                assert item.thumbnail_path
+                with Image.open(media_file_path(item.thumbnail_path)) as thumbnail:
+                    assert max(thumbnail.size) <= 400
+                print("✅ Thumbnail generated in the background")
+            finally:
+                shutil.rmtree(os.path.dirname(media_file_path(path)), ignore_errors=True)
+
+
+def test_static_assets():
+    """Test fingerprinted static URLs, precompressed variants and Range requests on uploads."""
+    print("📦 Testing static assets...")
+
+    import gzip
+    import io
+    import re
+    import shutil
+
+    with app.app_context():
+
+        from services.media import media_file_path, store_upload
+
+        with app.test_client() as client:
+            css_url = re.search(r'/static/css/custom\.[0-9a-f]{12}\.css', client.get('/').get_data(as_text=True)).group()
+            response = client.get(css_url, headers={'Accept-Encoding': 'gzip'})
+            assert response.headers['Content-Encoding'] == 'gzip'
+            assert 'immutable' in response.headers['Cache-Control'] and 'Accept-Encoding' in response.headers['Vary']
+            with open(os.path.join(app.static_folder, 'css', 'custom.css'), 'rb') as f:
+                assert gzip.decompress(response.data) == f.read()
+            os.remove(os.path.join(app.static_folder, 'css', 'custom.css.gz'))
+
+            outdated = client.get('/static/css/custom.000000000000.css')
+            assert outdated.status_code == 200 and 'immutable' not in outdated.headers['Cache-Control']
+            print("✅ Fingerprinted URLs are compressed and cached as immutable")
+
+            path, _ = store_upload(io.BytesIO(b'0123456789' * 1000), '.mp4')
+            try:
+                response = client.get(f'/static/{path}', headers={'Range': 'bytes=10-19'})
+                assert response.status_code == 206 and response.data == b'0123456789'
+                assert response.headers['Content-Range'] == 'bytes 10-19/10000'
+                assert 'immutable' in response.headers['Cache-Control']
+            finally:
+                shutil.rmtree(os.path.dirname(media_file_path(path)), ignore_errors=True)
+            print("✅ Uploaded videos answer Range requests")
+
+
+def test_keyset_pagination():
+    """Test that cursor pages cover every item exactly once."""
+    print("📄 Testing keyset pagination...")
+
+    with app.app_context():
+
+        from app import PortfolioItem
+        from services.pagination import keyset_page
+
+        student_id = PortfolioItem.query.first().student_id
+        query = PortfolioItem.query.filter_by(student_id=student_id, is_public=True)
+        expected = [item.id for item in query.order_by(PortfolioItem.created_at.desc(), PortfolioItem.id.desc())]
+
+        seen, cursor = [], None
+        while True:
+            items, cursor = keyset_page(query, PortfolioItem, cursor, limit=2)
+            seen.extend(item.id for item in items)
+            if not cursor:
+                break
+        assert seen == expected
+        print(f"✅ Walked {len(seen)} items in pages of 2")
+
+        with app.test_client() as client:
+            response = client.get(f'/api/portfolio/student/{student_id}/items?limit=1')
+            data = response.get_json()
+            assert len(data['items']) == 1 and data['next_cursor']
+            response = client.get(f'/api/portfolio/student/{student_id}/items?cursor={data["next_cursor"]}')
+            assert data['items'][0]['id'] not in [item['id'] for item in response.get_json()['items']]
+            assert client.get('/api/projects?quarter=Q1').status_code == 200
+            for url, key in (('/api/projects?limit=-1', 'projects'), ('/api/projects?quarter=Q1&limit=-50', 'projects'),
+                             (f'/api/portfolio/student/{student_id}/items?limit=0', 'items')):
+                response = client.get(url)
+                assert response.status_code == 200 and len(response.get_json()[key]) <= 1
+            print("✅ Portfolio and project page APIs return cursors")
+
+
+def test_no_lazy_loads_during_rendering():
+    """Test that no page lazy loads a relationship while its template renders."""
+    print("🐢 Testing for lazy loads during rendering...")
+
+    with app.app_context():
+
+        from app import User, LessonPlan, StudentProgress, StudentCodenames, PortfolioItem
+
+        lesson = LessonPlan.query.first()
+        for student in User.query.filter_by(role='student'):
+            if not StudentProgress.query.filter_by(student_id=student.id, lesson_id=lesson.id).first():
+                db.session.add(StudentProgress(student_id=student.id, lesson_id=lesson.id,
+                                               class_id=lesson.class_id, status='in_progress'))
+        db.session.commit()
+
+        public_pages = ['/', '/showcase', '/portfolio', '/portfolio/room/RM224',
+                        f'/portfolio/student/{StudentCodenames.query.first().id}',
+                        f'/portfolio/item/{PortfolioItem.query.filter_by(is_public=True).first().id}']
+        teacher_pages = ['/teacher-dashboard', '/teacher-toolkit', '/manage-classes',
+                         '/manage-lessons', '/student-progress']
+
+        app.config['ASSERT_NO_LAZY_LOADS'] = True
+        try:
+            db.session.expunge_all()
+            with app.test_client() as client:
+                for page in public_pages:
+                    assert client.get(page).status_code == 200, page
+                login_as_teacher(client)
+                for page in teacher_pages:
+                    assert client.get(page).status_code == 200, page
+            with app.test_client() as client:
+                client.post('/login', data={'username': 'emma_k', 'password': 'student123'})
+                assert client.get('/student-dashboard').status_code == 200
+        finally:
+            app.config['ASSERT_NO_LAZY_LOADS'] = False
+        print("✅ Every page preloads the relationships its template uses")
+
+
+def test_bulk_progress_update():
+    """Test batched progress upserts through /api/update-progress/bulk."""
+    print("📝 Testing bulk progress updates...")
+    from app import User, LessonPlan, StudentProgress
+
+    with app.app_context():
+        student = User.query.filter_by(username='emma_k').first()
+        lessons = LessonPlan.query.order_by(LessonPlan.id).limit(2).all()
+        StudentProgress.query.filter_by(student_id=student.id).delete()
+        db.session.commit()
+
+        updates = [
+            {'student_id': student.id, 'lesson_id': lessons[0].id, 'class_id': lessons[0].class_id, 'status': 'in_progress'},
+            {'student_id': student.id, 'lesson_id': lessons[1].id, 'class_id': lessons[1].class_id, 'status': 'completed',
+             'completion_percentage': 100},
+            {'student_id': student.id, 'lesson_id': lessons[1].id, 'notes': 'Great teamwork'},
+            {'student_id': student.id, 'lesson_id': 999999, 'class_id': lessons[0].class_id},
+            {'student_id': student.id, 'lesson_id': lessons[0].id, 'status': 'done'},
+        ]
+
+        with app.test_client() as client:
+            login_as_teacher(client)
+            result = client.post('/api/update-progress/bulk', json={'updates': updates}).get_json()
+            assert result['success'] and result['applied'] == 3 and result['errors'] == 2
+            assert [row['result'] for row in result['results']] == ['created', 'created', 'created', 'error', 'error']
+
+            started = StudentProgress.query.filter_by(student_id=student.id, lesson_id=lessons[0].id).one()
+            completed = StudentProgress.query.filter_by(student_id=student.id, lesson_id=lessons[1].id).one()
+            assert started.started_at and not started.completed_at
+            assert completed.completed_at and completed.completion_percentage == 100
+            assert completed.notes == 'Great teamwork'
+            completed_at = completed.completed_at
+            print("✅ New rows inserted with merged fields and transition timestamps")
+
+            result = client.post('/api/update-progress/bulk', json={'updates': [
+                {'student_id': student.id, 'lesson_id': lessons[1].id, 'status': 'completed', 'completion_percentage': 90},
+                {'student_id': student.id, 'lesson_id': lessons[0].id, 'completion_percentage': 40},
+            ]}).get_json()
+            assert [row['result'] for row in result['results']] == ['updated', 'updated']
+            db.session.expire_all()
+            assert completed.completed_at == completed_at and completed.completion_percentage == 90
+            assert completed.notes == 'Great teamwork'
+            assert started.status == 'in_progress' and started.completion_percentage == 40
+            print("✅ Existing rows upserted without touching fields or timestamps that were not sent")
+
+            assert client.post('/api/update-progress/bulk', json={'updates': []}).status_code == 400
+
+            # A database built before the unique constraint existed falls back to per-row saves
+            import services.progress
+            has_unique_key = services.progress.has_unique_key
+            services.progress.has_unique_key = lambda table_name, columns: False
+            try:
+                result = client.post('/api/update-progress/bulk', json={'updates': [
+                    {'student_id': student.id, 'lesson_id': lessons[0].id, 'completion_percentage': 55},
+                ]})
+                assert result.status_code == 200 and result.get_json()['applied'] == 1
+            finally:
+                services.progress.has_unique_key = has_unique_key
+            db.session.expire_all()
+            assert started.completion_percentage == 55
+            print("✅ Without the unique constraint rows are saved one at a time")
+
+
+def test_roster_import_export():
+    """Test streaming roster CSV import and export."""
+    print("🗂️ Testing roster import/export...")
+    import csv
+    import io
+    from app import Room, StudentCodenames
+    from services.roster import greek_code_for
+
+    roster = "room_number,room_name,first_name,last_name,grade_level\n" \
+             "RM224,,Olivia,Reyes,3rd Grade\n" \
+             "rm900,Maker Space,Ethan,Nguyen,5th Grade\n" \
+             "RM900,,Zoe,Park,\n" \
+             ",,Missing,Room,\n"
+
+    with app.app_context():
+        existing = StudentCodenames.query.join(Room).filter(Room.room_number == 'RM224').count()
+
+        with app.test_client() as client:
+            login_as_teacher(client)
+            result = client.post('/api/roster/import', data={'file': (io.BytesIO(roster.encode()), 'roster.csv')}).get_json()
+            assert result['success'] and result['imported'] == 3 and result['rooms_created'] == 1
+            assert result['errors'][0]['line'] == 5
+
+            olivia = StudentCodenames.query.filter_by(first_name='Olivia', last_name='Reyes').one()
+            assert olivia.greek_code == greek_code_for(existing)
+            assert olivia.display_name == f'{olivia.greek_code} - Olivia R'
+            codes = [s.greek_code for s in StudentCodenames.query.join(Room).filter(Room.room_number == 'RM900')
+                     .order_by(StudentCodenames.id)]
+            assert codes == ['Alpha_001', 'Beta_002']
+            print("✅ Roster rows get the next greek codes in their rooms")
+
+            bad = client.post('/api/roster/import', data=b'name\nnobody\n', content_type='text/csv')
+            assert bad.status_code == 400
+
+            response = client.get('/api/roster/export')
+            assert response.mimetype == 'text/csv'
+            rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+            assert len(rows) == StudentCodenames.query.count()
+            assert any(row['greek_code'] == 'Beta_002' and row['room_number'] == 'RM900' for row in rows)
+            print("✅ Roster export streams every codename with portfolio stats")
+
+
+def test_gradebook_export():
+    """Test the streaming gradebook CSV and JSON-lines export."""
+    print("📚 Testing gradebook export...")
+    import csv
+    import io
+    import json
+    from app import User, StudentProgress, LessonPlan
+
+    with app.app_context():
+        progress = StudentProgress.query.first()
+        if progress is None:
+            lesson = LessonPlan.query.first()
+            progress = StudentProgress(student_id=User.query.filter_by(username='emma_k').first().id,
+                                       lesson_id=lesson.id, class_id=lesson.class_id, status='completed')
+            db.session.add(progress)
+            db.session.commit()
+        quarter = progress.lesson_plan.quarter
+        expected = StudentProgress.query.join(LessonPlan).filter(
+            StudentProgress.class_id == progress.class_id, LessonPlan.quarter == quarter
+        ).count()
+
+        with app.test_client() as client:
+            login_as_teacher(client)
+            response = client.get(f'/api/gradebook/export?class_id={progress.class_id}&quarter={quarter}')
+            assert response.is_streamed and response.mimetype == 'text/csv'
+            rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+            assert len(rows) == expected
+            assert all(row['class_id'] == str(progress.class_id) and row['quarter'] == quarter for row in rows)
+
+            response = client.get(f'/api/gradebook/export?format=jsonl&class_id={progress.class_id}')
+            lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+            assert lines and {'username', 'lesson_title', 'status', 'last_updated'} <= set(lines[0])
+
+            assert client.get('/api/gradebook/export?format=xml').status_code == 400
+            print(f"✅ Streamed {len(rows)} gradebook rows as CSV and JSON lines")
+
+
+def test_progress_stats():
+    """Test that the student/class stats tables track StudentProgress writes."""
+    print("🧮 Testing precomputed progress stats...")
+    from app import User, LessonPlan, StudentProgress, StudentStats, ClassStats
+    from services.progress import verify_progress_stats
+
+    with app.app_context():
+        student = User.query.filter_by(username='emma_k').first()
+        lesson = LessonPlan.query.first()
+
+        with app.test_client() as client:
+            login_as_teacher(client)
+            client.post('/api/update-progress', json={'student_id': student.id, 'lesson_id': lesson.id,
+                                                      'class_id': lesson.class_id, 'status': 'needs_help',
+                                                      'completion_percentage': 30})
+            client.post('/api/update-progress/bulk', json={'updates': [
+                {'student_id': student.id, 'lesson_id': lesson.id, 'status': 'completed', 'completion_percentage': 100}
+            ]})
+        assert verify_progress_stats() == []
+
+        db.session.expire_all()
+        stats = db.session.get(StudentStats, student.id)
+        expected = StudentProgress.query.filter_by(student_id=student.id)
+        assert stats.total_lessons == expected.count()
+        assert stats.completed_lessons == expected.filter_by(status='completed').count()
+        print("✅ Single and bulk progress writes refresh the stats rows in the same transaction")
+
+        db.session.delete(expected.filter_by(lesson_id=lesson.id).one())
+        db.session.commit()
+        assert verify_progress_stats() == []
+        print("✅ Deleting progress keeps the stats in step")
+
+        runner = app.test_cli_runner()
+        class_stats = db.session.get(ClassStats, lesson.class_id)
+        if class_stats:
+            class_stats.completed += 5
+            db.session.commit()
+            result = runner.invoke(args=['verify-progress-stats'])
+            assert result.exit_code == 1 and 'class_stats' in result.output
+        result = runner.invoke(args=['verify-progress-stats', '--fix'])
+        assert result.exit_code == 0
+        assert runner.invoke(args=['verify-progress-stats']).exit_code == 0
+        assert runner.invoke(args=['rebuild-progress-stats']).exit_code == 0
+        print("✅ CLI detects drift and rebuilds the stats tables")
+
+
+def test_search():
+    """Test full-text search, facets and index sync through model events."""
+    print("🔎 Testing search...")
+    from app import PortfolioItem, StudentCodenames, LessonPlan, SearchDocument
+
+    with app.app_context():
+        student = StudentCodenames.query.first()
+        item = PortfolioItem(student_id=student.id, title='Solar Powered Rover', content_type='image',
+                             description='A rover that follows the sun', skills_used='Soldering, Circuits',
+                             subject_areas='Engineering', project_type='Robotics', quarter='Q4', is_public=True)
+        hidden = PortfolioItem(student_id=student.id, title='Secret Solar Oven', content_type='image',
+                               project_type='Tinkercad', quarter='Q1', is_public=False)
+        lesson = LessonPlan(title='Solar Energy Basics', class_id=LessonPlan.query.first().class_id,
+                            quarter='Q4', learning_objectives='Understand photovoltaic cells')
+        db.session.add_all([item, hidden, lesson])
+        db.session.commit()
+
+        with app.test_client() as client:
+            result = client.get('/api/search?q=solar').get_json()
+            ids = {(row['type'], row['id']) for row in result['results']}
+            assert ('portfolio_item', item.id) in ids
+            assert ('portfolio_item', hidden.id) not in ids and ('lesson', lesson.id) not in ids
+            assert result['facets']['project_type']['Robotics'] >= 1
+            print("✅ Public search ranks matching items and hides private ones")
+
+            assert client.get('/api/search?q=solder').get_json()['total'] >= 1
+            filtered = client.get('/api/search?q=solar&project_type=Tinkercad').get_json()
+            assert all(row['project_type'] == 'Tinkercad' for row in filtered['results'])
+            assert client.get('/search?q=solar&quarter=Q4').status_code == 200
+            assert client.get('/api/search?q=%22%29(').get_json()['total'] == 0
+
+            student.is_public = False
+            db.session.commit()
+            assert client.get('/api/search?q=rover').get_json()['total'] == 0
+            student.is_public = True
+            db.session.commit()
+            assert client.get('/api/search?q=rover').get_json()['total'] >= 1
+
+            login_as_teacher(client)
+            ids = {(row['type'], row['id']) for row in client.get('/api/search?q=photovoltaic').get_json()['results']}
+            assert ('lesson', lesson.id) in ids
+            print("✅ Prefix matching, facet filters, hidden students and teacher-only lessons work")
+
+            item.title = 'Wind Turbine Rover'
+            db.session.commit()
+            assert client.get('/api/search?q=turbine').get_json()['total'] >= 1
+            db.session.delete(item)
+            db.session.delete(hidden)
+            db.session.delete(lesson)
+            db.session.commit()
+            assert client.get('/api/search?q=turbine').get_json()['total'] == 0
+            assert SearchDocument.query.filter_by(doc_type='lesson', doc_id=lesson.id).count() == 0
+            print("✅ Updates and deletes keep the search index in sync")
+
+
+def test_tags():
+    """Test tag parsing, tag-filtered listings, tag counts and association sync."""
+    print("🏷️ Testing tags...")
+    from app import PortfolioItem, StudentCodenames, Tag, portfolio_item_tag
+
+    with app.app_context():
+        student = StudentCodenames.query.first()
+        item = PortfolioItem(student_id=student.id, title='Line Follower', content_type='image', quarter='Q4',
+                             subject_areas='Robotics,  Engineering', skills_used='Soldering, soldering , Coding',
+                             is_public=True)
+        db.session.add(item)
+        db.session.commit()
+        assert {tag.normalized_name for tag in Tag.query.filter_by(kind='skill')} >= {'soldering', 'coding'}
+
+        with app.test_client() as client:
+            items = client.get('/api/portfolio/items?tag=ROBOTICS').get_json()['items']
+            assert item.id in [row['id'] for row in items]
+            assert client.get('/api/portfolio/items?tag=robotics&tag_kind=skill').get_json()['items'] == []
+            projects = client.get('/api/projects?tag=3d%20design&tag_kind=skill').get_json()['projects']
+            assert projects and all('3D Design' in project['skills_used'] for project in projects)
+            print("✅ Tag-filtered listings match case-insensitively and by kind")
+
+            counts = client.get('/api/tags?kind=skill&type=portfolio_item&quarter=Q4').get_json()['tags']
+            assert {'kind': 'skill', 'name': 'Soldering', 'count': 1} in counts
+            assert client.get('/api/tags?kind=colour').status_code == 400
+            assert len(client.get('/api/tags?limit=-1').get_json()['tags']) == 1
+            assert len(client.get('/api/portfolio/items?limit=-5').get_json()['items']) == 1
+            print("✅ Tag counts group by tag and honour the filters")
+
+            item.skills_used = 'Coding'
+            db.session.commit()
+            counts = client.get('/api/tags?kind=skill&type=portfolio_item&quarter=Q4').get_json()['tags']
+            assert 'Soldering' not in [tag['name'] for tag in counts]
+            db.session.delete(item)
+            db.session.commit()
+            assert db.session.query(portfolio_item_tag).filter_by(portfolio_item_id=item.id).count() == 0
+            print("✅ Updates and deletes keep the tag associations in sync")
+
+
+def test_job_queue():
+    """Test job priorities, retries with backoff, lease recovery and the job endpoints."""
+    print("🧵 Testing background jobs...")
+    from datetime import datetime, timedelta
+    from werkzeug.security import generate_password_hash
+    from app import Job, User
+    from services.jobs import JobWorker, job_task, job_worker, enqueue_job, requeue_stale_jobs
+
+    calls = []
+
+    @job_task('test_record')
+    def record(value):
+        calls.append(value)
+        return value
+
+    @job_task('test_flaky')
+    def flaky():
+        calls.append('flaky')
+        if calls.count('flaky') < 3:
+            raise RuntimeError('temporary failure')
+        return 'recovered'
+
+    @job_task('test_broken')
+    def broken():
+        raise ValueError('permanent failure')
+
+    retry_delay = app.config['JOB_RETRY_DELAY']
+    app.config['JOB_RETRY_DELAY'] = 0
+    try:
+        with app.app_context():
+            db.session.add(User(username='jobs_admin', email='jobs_admin@barnum.edu',
+                                password_hash=generate_password_hash('admin123'), role='admin',
+                                first_name='Jobs', last_name='Admin'))
+
+            for priority in (0, 10, 5):
+                enqueue_job('test_record', {'value': priority}, priority=priority)
+            teacher = User.query.filter_by(username='teacher').first()
+            flaky_job = enqueue_job('test_flaky', created_by=teacher.id)
+            doomed = enqueue_job('test_broken', max_attempts=2)
+            db.session.commit()
+            JobWorker(1).run(until_idle=True)
+
+            assert [call for call in calls if call != 'flaky'] == [10, 5, 0]
+            db.session.expire_all()
+            assert (flaky_job.status, flaky_job.attempts, flaky_job.result) == ('succeeded', 3, '"recovered"')
+            assert (doomed.status, doomed.attempts, doomed.last_error) == ('failed', 2, 'ValueError: permanent failure')
+            print("✅ Jobs run by priority and failures are retried until max_attempts")
+
+            stale = enqueue_job('test_record', {'value': 'stale'})
+            db.session.commit()
+            stale.status, stale.attempts, stale.locked_at = 'running', 1, datetime.utcnow() - timedelta(hours=1)
+            db.session.commit()
+            requeue_stale_jobs()
+            db.session.expire_all()
+            assert stale.status == 'queued' and stale.last_error == 'Worker lease expired'
+            print("✅ Jobs of a worker that died are queued again")
+
+            with app.test_client() as client:
+                login_as_teacher(client)
+                status = client.get(f'/api/jobs/{flaky_job.id}').get_json()['job']
+                assert status['status'] == 'succeeded' and status['result'] == 'recovered'
+                assert client.get(f'/api/jobs/{doomed.id}').status_code == 404
+                assert client.get('/api/jobs').status_code == 302
+
+            with app.test_client() as client:
+                client.post('/login', data={'username': 'jobs_admin', 'password': 'admin123'})
+                assert client.post('/api/jobs', json={'name': 'test_record'}).status_code == 400
+                for priority in ('high', None, [1]):
+                    assert client.post('/api/jobs', json={'name': 'rebuild_tag_index', 'priority': priority}).status_code == 400
+                response = client.post('/api/jobs', json={'name': 'rebuild_tag_index', 'priority': 1})
+                assert response.status_code == 202
+                rebuild_id = response.get_json()['job']['id']
+                assert client.post(f'/api/jobs/{doomed.id}/retry').get_json()['job']['status'] == 'queued'
+                assert client.get(f'/api/jobs/{flaky_job.id}').get_json()['job']['created_by'] == teacher.id
+                JobWorker(2).run(until_idle=True)
+
+                listing = client.get('/api/jobs').get_json()
+                assert len(client.get('/api/jobs?limit=-1').get_json()['jobs']) == 1
+                assert listing['counts']['succeeded'] >= 4
+                rebuilt = next(job for job in listing['jobs'] if job['id'] == rebuild_id)
+                assert rebuilt['status'] == 'succeeded' and rebuilt['result']['tags'] >= 1
+            assert not job_worker._thread.is_alive()  # JOB_WORKERS=0: requests never start an embedded worker
+            print("✅ Status endpoints report jobs to whoever queued them and admins can queue maintenance jobs")
+    finally:
+        app.config['JOB_RETRY_DELAY'] = retry_delay
+
+
+def test_database_health():
+    """Test engine pool options, SQLite pragmas and the /healthz endpoint."""
+    print("🩺 Testing database health...")
+    from app import engine_options
+
+    options = engine_options('postgresql://user:secret@db/barnum')
+    assert options['pool_pre_ping'] and options['pool_size'] == app.config['DB_POOL_SIZE']
+    assert options['connect_args']['options'] == f"-c statement_timeout={app.config['DB_STATEMENT_TIMEOUT_MS']}"
+    assert engine_options('sqlite:///barnum_stem.db') == {}
+
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            assert db.session.execute(db.text('PRAGMA busy_timeout')).scalar() == app.config['SQLITE_BUSY_TIMEOUT_MS']
+            journal_mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+            assert (journal_mode == 'wal') == bool(app.config['SQLITE_WAL'] and db.engine.url.database)
+        print("✅ Pool options and SQLite pragmas follow the configuration")
+
+    with app.test_client() as client:
+        health = client.get('/healthz').get_json()
+        assert health['status'] == 'ok' and health['database']['latency_ms'] >= 0
+        assert {'class', 'timeouts'} <= set(health['pool'])
+        print("✅ /healthz reports database latency and pool usage")
+
+    from sqlalchemy.exc import OperationalError
+    def unreachable(conn, clauseelement, multiparams, params, execution_options):
+        raise OperationalError('SELECT 1', {}, Exception('could not connect to server "secret-db.internal"'))
+    with app.app_context():
+        engine = db.engine
+    db.event.listen(engine, 'before_execute', unreachable)
+    try:
+        with app.test_client() as client:
+            response = client.get('/healthz')
+            assert response.status_code == 503 and response.get_json()['message'] == 'database unavailable'
+            assert b'secret-db' not in response.data
+    finally:
+        db.event.remove(engine, 'before_execute', unreachable)
+    print("✅ /healthz answers 503 without exposing driver errors")
+
+
+def test_request_metrics():
+    """Test per-request query counting and the admin metrics endpoint."""
+    print("⏱️ Testing request metrics...")
+    from app import app, db, User
+    from werkzeug.security import generate_password_hash
+
+    with app.app_context():
+        db.session.add(User(username='metrics_admin', email='metrics_admin@barnum.edu',
+                            password_hash=generate_password_hash('admin123'), role='admin',
+                            first_name='Metrics', last_name='Admin'))
+        db.session.commit()
+
+    with app.test_client() as client:
+        response = client.get('/portfolio')
+        timings = response.headers.getlist('Server-Timing')
+        assert any(timing.startswith('db;dur=') and 'queries' in timing for timing in timings)
+        assert any(timing.startswith('app;dur=') for timing in timings)
+
+        login_as_teacher(client)
+        assert client.get('/admin/metrics').status_code == 302
+
+    with app.test_client() as client:
+        client.post('/login', data={'username': 'metrics_admin', 'password': 'admin123'})
+        routes = client.get('/admin/metrics').get_json()['routes']
+        portfolio = routes['portfolio_home']
+        assert portfolio['requests'] >= 1
+        assert portfolio['queries']['max'] >= 1
+        assert set(portfolio['duration_ms']) == {'p50', 'p95', 'p99'}
+        assert portfolio['slowest_statements'][0]['statement'].startswith('SELECT')
+    print("✅ Query counts, Server-Timing and route percentiles recorded")
+
+    from sqlalchemy.exc import OperationalError
+    with app.app_context():
+        with db.engine.connect() as connection:
+            try:
+                connection.execute(db.text('SELECT * FROM no_such_table'))
+            except OperationalError:
+                pass
+            assert not connection.info.get('query_start_times')
+            connection.rollback()
+            connection.execute(db.text('SELECT 1'))
+            assert not connection.info.get('query_start_times')
+    print("✅ Failed statements leave no query timer behind")
+
+
+def test_progress_stream():
+    """Test the live progress feed: replay after an event id, pushed changes and needs_help alerts."""
+    print("📡 Testing live progress stream...")
+    from app import User, LessonPlan, StudentProgress
+    from services.progress_feed import progress_event_id
+
+    def read_events(chunks, progress_id, count, timeout=10):
+        events, deadline = [], time.monotonic() + timeout
+        while len(events) < count and time.monotonic() < deadline:
+            fields = dict(line.split(': ', 1) for line in next(chunks).decode().splitlines() if ': ' in line)
+            if 'event' in fields and json.loads(fields['data'])['progress_id'] == progress_id:
+                events.append((fields['event'], json.loads(fields['data'])))
+        return events
+
+    settings = {key: app.config[key] for key in ('PROGRESS_FEED_POLL_INTERVAL', 'PROGRESS_STREAM_HEARTBEAT',
+                                                 'PROGRESS_STREAM_MAX_CLIENTS')}
+    app.config.update(PROGRESS_FEED_POLL_INTERVAL=0.1, PROGRESS_STREAM_HEARTBEAT=0.2)
+    try:
+        with app.app_context():
+            student = User.query.filter_by(username='emma_k').first()
+            lesson = LessonPlan.query.order_by(LessonPlan.id).first()
+            change = {'student_id': student.id, 'lesson_id': lesson.id, 'class_id': lesson.class_id}
+
+        with app.test_client() as client:
+            assert client.get('/api/progress/stream').status_code == 302
+            login_as_teacher(client)
+            assert client.get('/api/classes/999999/progress/stream').status_code == 404
+
+            client.post('/api/update-progress', json={**change, 'status': 'in_progress', 'completion_percentage': 40})
+            with app.app_context():
+                progress = StudentProgress.query.filter_by(student_id=student.id, lesson_id=lesson.id).one()
+                since, progress_id = progress_event_id(progress.last_updated, progress.id), progress.id
+            client.post('/api/update-progress', json={**change, 'completion_percentage': 60})
+
+            response = client.get(f'/api/classes/{lesson.class_id}/progress/stream',
+                                  headers={'Last-Event-ID': since}, buffered=False)
+            assert response.mimetype == 'text/event-stream'
+            chunks = iter(response.response)
+            try:
+                assert next(chunks).decode().startswith('retry: ')
+                [(name, replayed)] = read_events(chunks, progress_id, 1)
+                assert name == 'progress' and replayed['completion_percentage'] == 60
+                assert replayed['student_name'] == f'{student.first_name} {student.last_name}'
+                print("✅ Changes after Last-Event-ID are replayed on connect")
+
+                client.post('/api/update-progress', json={**change, 'status': 'needs_help'})
+                events = read_events(chunks, progress_id, 2)
+                assert [name for name, _ in events] == ['progress', 'needs_help']
+                assert events[0][1]['status'] == 'needs_help' and events[0][1]['id'] > replayed['id']
+                print("✅ New changes and needs_help alerts are pushed to connected clients")
+
+                # Past the per-process limit a stream only asks the browser to come back later
+                app.config['PROGRESS_STREAM_MAX_CLIENTS'] = 1
+                busy = client.get('/api/progress/stream', buffered=False)
+                assert busy.status_code == 200 and list(busy.response) == [b'retry: 30000\n\n']
+                busy.close()
+                print("✅ Streams past PROGRESS_STREAM_MAX_CLIENTS are turned away")
+            finally:
+                response.close()
+    finally:
+        app.config.update(settings)
+
+
+def test_trending():
+    """Test time-decayed trending scores, their incremental refresh and the trending endpoints."""
+    print("🔥 Testing trending items...")
+    from datetime import datetime, timedelta
+    from app import Room, StudentCodenames, PortfolioItem, TrendingScore
+    from services.trending import trending_items, trending_weight, rebuild_trending_scores
+
+    with app.app_context():
+        rooms = [Room(room_number=number, room_name='Trending Lab') for number in ('RM990', 'RM991')]
+        students = [StudentCodenames(room=rooms[0], greek_code=code, display_name=code, first_name='Trend',
+                                     last_name=code[0]) for code in ('Tau_001', 'Tau_002')]
+        items = {name: PortfolioItem(student=students[index], title=name, content_type='image', is_public=public)
+                 for name, index, public in (('viewed', 0, True), ('liked', 1, True), ('private', 0, False))}
+        db.session.add_all(rooms + students + list(items.values()))
+        db.session.commit()
+        ids = {name: item.id for name, item in items.items()}
+
+        with app.test_client() as client:
+            for _ in range(3):
+                client.post(f"/api/portfolio/like/{ids['liked']}")
+                client.post(f"/api/portfolio/like/{ids['private']}")
+            for _ in range(2):
+                client.get(f"/portfolio/item/{ids['viewed']}")
+            portfolio_counters.flush()
+
+            ranked = trending_items(rooms[0].id)
+            assert [(item.id, round(weight)) for item, weight in ranked] == [(ids['liked'], 9), (ids['viewed'], 2)]
+            score = db.session.get(TrendingScore, ids['liked']).score
+            half_life = timedelta(hours=app.config['TRENDING_HALF_LIFE_HOURS'])
+            assert round(trending_weight(score, datetime.utcnow() + half_life), 1) == 4.5
+            print("✅ Flushed likes and views update decayed scores; private items stay out")
+
+            client.get(f"/portfolio/item/{ids['viewed']}")
+            portfolio_counters.flush()
+            assert round(trending_items(rooms[0].id)[1][1]) == 3
+            db.session.expire_all()  # The flushed counters were written outside this session
+            data = client.get('/api/portfolio/trending?room=RM990&limit=1').get_json()
+            assert [item['id'] for item in data['items']] == [ids['liked']] and data['items'][0]['likes_count'] == 3
+            assert client.get('/api/portfolio/trending?room=RM000').status_code == 404
+            assert len(client.get('/api/portfolio/trending?limit=-1').get_json()['items']) == 1
+            assert b'Trending in RM990' in client.get('/portfolio/room/RM990').data
+            print("✅ Engagement adds to existing scores and serves the room ranking")
+
+            students[1].room = rooms[1]
+            db.session.commit()
+            assert [item.id for item, _ in trending_items(rooms[1].id)] == [ids['liked']]
+
+            # Old engagement decays out of the table when scores are rebuilt from the stored totals
+            items['viewed'].created_at = datetime.utcnow() - 20 * half_life
+            db.session.commit()
+            rebuild_trending_scores()
+            db.session.commit()
+            assert db.session.get(TrendingScore, ids['viewed']) is None
+            assert db.session.get(TrendingScore, ids['liked']) is not None
+            print("✅ Scores follow room moves and rebuilds drop decayed items")
+
+        for room in rooms:
+            db.session.delete(room)
+        db.session.commit()
+        assert db.session.get(TrendingScore, ids['liked']) is None
+
+
+def test_user_sessions():
+    """Test the cached user loader, fingerprint sign-out and the server-side session stores."""
+    print("🔐 Testing sessions and the user cache...")
+    import re
+    from werkzeug.security import generate_password_hash
+    from app import User, UserSession
+    from services.sessions import FileSessionStore, DatabaseSessionStore, user_cache
+
+    with app.app_context():
+        engine = db.engine
+        user = User(username='session_teacher', email='session_teacher@barnum.edu',
+                    password_hash=generate_password_hash('teach123'), role='teacher', first_name='Session')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    def update_user(**values):
+        with app.app_context():
+            user = db.session.get(User, user_id)
+            for key, value in values.items():
+                setattr(user, key, value)
+            db.session.commit()
+
+    def get(client, url):
+        """Response for url and the number of queries it made against the user table"""
+        statements = []
+        def record(connection, cursor, statement, *args):
+            statements.append(statement)
+        db.event.listen(engine, 'before_cursor_execute', record)
+        try:
+            response = client.get(url)
+        finally:
+            db.event.remove(engine, 'before_cursor_execute', record)
+        return response, sum(1 for statement in statements if re.search(r'FROM "?user"?(\s|$)', statement))
+
+    def sign_in(client):
+        assert client.post('/login', data={'username': 'session_teacher', 'password': 'teach123'}).status_code == 302
+
+    # Any teacher-only route that does not read users itself; the missing job is a 404
+    url = '/api/jobs/999999'
+    with app.test_client() as client:
+        sign_in(client)
+        user_cache.clear()
+        assert get(client, url)[1] == 1
+        response, queries = get(client, url)
+        assert response.status_code == 404 and queries == 0
+        update_user(first_name='Renamed')
+        response, queries = get(client, url)
+        assert response.status_code == 404 and queries == 1
+        print("✅ Signed-in users come from the per-worker cache, refreshed when the row changes")
+
+        update_user(password_hash=generate_password_hash('changed123'))
+        assert get(client, url)[0].status_code == 302
+        update_user(password_hash=generate_password_hash('teach123'))
+        print("✅ Sessions signed in before a password change are signed out")
+
+    default_interface = app.session_interface
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            for store in (FileSessionStore(directory), DatabaseSessionStore()):
+                app.session_interface = store
+                with app.test_client() as client:
+                    sign_in(client)
+                    sid = store._signer(app).unsign(client.get_cookie('session').value).decode()
+                    assert sid.startswith(f'{user_id}.') and store.load(sid) is not None
+                    user_cache.clear()
+                    response, queries = get(client, url)
+                    assert response.status_code == 404 and queries == 0
+
+                    update_user(role='student')
+                    assert store.load(sid) is None and get(client, url)[0].status_code == 302
+                    update_user(role='teacher')
+
+                    sign_in(client)
+                    sid = store._signer(app).unsign(client.get_cookie('session').value).decode()
+                    client.get('/logout')
+                    assert store.load(sid) is None
+            with app.app_context():
+                assert UserSession.query.filter_by(user_id=user_id).count() == 0
+        finally:
+            app.session_interface = default_interface
+    print("✅ File and database session stores serve the identity and revoke sessions on role changes")
+
+
+def test_rate_limits():
+    """Test token-bucket limits on likes and sign-ins with both limiter backends."""
+    print("🚦 Testing rate limits...")
+    import services.rate_limits
+    from app import PortfolioItem, RateLimitBucket
+    from services.rate_limits import MemoryRateLimiter, DatabaseRateLimiter, rate_limit_rejections
+
+    with app.app_context():
+        item_ids = [item.id for item in PortfolioItem.query.filter_by(is_public=True).order_by(PortfolioItem.id).limit(3)]
+    assert len(item_ids) == 3
+
+    default_limiter, default_limits = services.rate_limits.rate_limiter, app.config['RATE_LIMITS']
+    app.config['RATE_LIMITS'] = dict(default_limits, like='3/60', login='2/60')
+    app.config['RATE_LIMIT_ENABLED'] = True
+    try:
+        for limiter in (MemoryRateLimiter(100), DatabaseRateLimiter()):
+            services.rate_limits.rate_limiter = limiter
+            with app.app_context():
+                assert limiter.take('probe', 1, 10) == 0 and limiter.take('probe', 1, 10) > 0
+                time.sleep(0.11)
+                assert limiter.take('probe', 1, 10) == 0
+
+            with app.test_client() as client:
+                liked = client.post(f'/api/portfolio/like/{item_ids[0]}').get_json()
+                assert liked['success'] and not liked['already_liked']
+                response = client.post(f'/api/portfolio/like/{item_ids[0]}')
+                repeat = response.get_json()
+                assert response.status_code == 200 and repeat['success'] and repeat['already_liked']
+                assert repeat['likes_count'] == liked['likes_count']
+            rejected = rate_limit_rejections['like']
+            with app.test_client() as client:
+                # A new visitor from the same address still counts against the address
+                assert client.post(f'/api/portfolio/like/{item_ids[1]}').status_code == 200
+                response = client.post(f'/api/portfolio/like/{item_ids[2]}')
+                assert response.status_code == 429 and 0 < int(response.headers['Retry-After']) <= 20
+                assert response.get_json()['success'] is False and rate_limit_rejections['like'] == rejected + 1
+
+                for _ in range(2):
+                    response = client.post('/login', data={'username': 'teacher', 'password': 'wrong'})
+                    assert response.status_code == 200
+                response = client.post('/login', data={'username': 'teacher', 'password': 'wrong'})
+                assert response.status_code == 429 and b'Too many sign-in attempts' in response.data
+                assert client.post('/login', data={'username': 'someone_else', 'password': 'wrong'}).status_code == 200
+                assert client.get('/login').status_code == 200
+        with app.app_context():
+            assert RateLimitBucket.query.count() > 0
+            RateLimitBucket.query.update({'full_at': 0})
+            db.session.commit()
+            assert DatabaseRateLimiter().prune() > 0 and RateLimitBucket.query.count() == 0
+    finally:
+        services.rate_limits.rate_limiter, app.config['RATE_LIMITS'] = default_limiter, default_limits
+        app.config['RATE_LIMIT_ENABLED'] = False
+    print("✅ Repeat likes are not counted twice; like floods and sign-in guessing get 429s with Retry-After")
+
+
+def test_password_hashing():
+    """Test rehash-on-login when the hash parameters change, and the busy response."""
+    print("🔑 Testing password hashing...")
+    import threading
+    from werkzeug.security import generate_password_hash
+    from app import User
+    from services.passwords import password_hashing
+
+    with app.app_context():
+        db.session.add(User(username='hash_teacher', email='hash_teacher@barnum.edu', role='teacher', first_name='Hash',
+                            password_hash=generate_password_hash('teach123', method='pbkdf2:sha256:1000')))
+        db.session.commit()
+
+    def stored_hash():
+        with app.app_context():
+            return User.query.filter_by(username='hash_teacher').one().password_hash
+
+    default_method, default_timeout = app.config['PASSWORD_HASH_METHOD'], app.config['PASSWORD_HASH_TIMEOUT']
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:2000'
+    try:
+        with app.test_client() as client:
+            assert client.post('/login', data={'username': 'hash_teacher', 'password': 'wrong'}).status_code == 200
+            assert stored_hash().startswith('pbkdf2:sha256:1000$')
+            assert client.post('/login', data={'username': 'nobody', 'password': 'wrong'}).status_code == 200
+
+            assert client.post('/login', data={'username': 'hash_teacher', 'password': 'teach123'}).status_code == 302
+            upgraded = stored_hash()
+            assert upgraded.startswith('pbkdf2:sha256:2000$')
+            client.get('/logout')
+            assert client.post('/login', data={'username': 'hash_teacher', 'password': 'teach123'}).status_code == 302
+            assert stored_hash() == upgraded
+            client.get('/logout')
+        print("✅ Hashes made with old parameters are upgraded at the next successful sign-in")
+
+        # Occupy every hashing thread so the sign-in has to wait
+        release = threading.Event()
+        blockers = [password_hashing.submit(release.wait) for _ in range(app.config['PASSWORD_HASH_WORKERS'])]
+        app.config['PASSWORD_HASH_TIMEOUT'] = 0.05
+        try:
+            with app.test_client() as client:
+                response = client.post('/login', data={'username': 'hash_teacher', 'password': 'teach123'})
+                assert response.status_code == 503 and response.headers['Retry-After']
+        finally:
+            release.set()
+            for blocker in blockers:
+                blocker.result()
+        print("✅ Sign-ins waiting too long for a hashing thread get a 503")
+    finally:
+        app.config['PASSWORD_HASH_METHOD'], app.config['PASSWORD_HASH_TIMEOUT'] = default_method, default_timeout
+
 
 if __name__ == '__main__':
-    success = test_app()
-    sys.exit(0 if success else 1)
+    sys.exit(pytest.main([__file__, '-q']))